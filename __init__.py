@@ -39,10 +39,13 @@ __email__ = "amorano@gmail.com"
 import os
 import re
 import sys
+import copy
 import html
-import time
 import json
+import hashlib
 import inspect
+import tempfile
+import threading
 import importlib
 from pathlib import Path
 from string import Template
@@ -56,6 +59,11 @@ try:
 except:
     markdownify = None
 
+try:
+    import folder_paths
+except:
+    folder_paths = None
+
 from aiohttp import web, ClientSession
 from server import PromptServer
 
@@ -80,6 +88,11 @@ logger.add(sys.stdout, level=os.getenv("JOV_LOG_LEVEL", "INFO"),
 
 JOV_INTERNAL = os.getenv("JOV_INTERNAL", 'false').strip().lower() in ('true', '1', 't')
 
+# register nodes from a generated manifest and import their modules on first use
+JOV_LAZY = os.getenv("JOV_LAZY", 'false').strip().lower() in ('true', '1', 't')
+JOV_MANIFEST = ROOT / 'node_manifest.json'
+JOV_MANIFEST_SCHEMA = 1
+
 # direct the documentation output -- used to build jovimetrix-examples
 JOV_INTERNAL_DOC = os.getenv("JOV_INTERNAL_DOC", str(ROOT / "_doc"))
 
@@ -433,6 +446,9 @@ class JOVBaseNode:
     NOT_IDEMPOTENT = True
     RETURN_TYPES = ()
     FUNCTION = "run"
+    # False for nodes whose inputs depend on the machine (devices, fonts, ...)
+    # or whose module adds web routes; those modules are always imported
+    LAZY = True
 
     @classmethod
     def VALIDATE_INPUTS(cls, input_types) -> bool:
@@ -726,28 +742,46 @@ def update_nested_dict(d, path, value) -> None:
 class TimedOutException(Exception): pass
 
 class ComfyAPIMessage:
-    # STASH = {}
+    """Mailbox of the last message the web client posted for each node id.
+
+    Waiters block on a condition for their node id, the post route wakes them
+    directly instead of them polling MESSAGE.
+    """
     MESSAGE = {}
+    LOCK = threading.Lock()
+    # node ids are few and reused between runs, so their conditions are kept
+    WAIT: Dict[str, threading.Condition] = {}
 
-    #@classmethod
-    #def send(cls, ident, message) -> None:
-        #cls.MESSAGE[str(ident)] = message
+    @classmethod
+    def send(cls, ident, message) -> None:
+        sid = str(ident)
+        with cls.LOCK:
+            cls.MESSAGE[sid] = message
+            if (cond := cls.WAIT.get(sid, None)) is not None:
+                cond.notify_all()
 
     @classmethod
-    def poll(cls, ident, period=0.01, timeout=3) -> Any:
-        _t = time.perf_counter()
+    def poll(cls, ident, timeout=3) -> Any:
+        """Pop the message for ident, waiting up to timeout seconds for it.
+
+        A timeout of 0 only checks the mailbox.
+        """
         if isinstance(ident, (set, list, tuple, )):
             ident = ident[0]
         sid = str(ident)
-        logger.debug(f'sid {sid} -- {cls.MESSAGE}')
-        while not (sid in cls.MESSAGE) and time.perf_counter() - _t < timeout:
-            time.sleep(period)
+        with cls.LOCK:
+            if not (sid in cls.MESSAGE) and timeout > 0:
+                if (cond := cls.WAIT.get(sid, None)) is None:
+                    cond = cls.WAIT[sid] = threading.Condition(cls.LOCK)
+                cond.wait_for(lambda: sid in cls.MESSAGE, timeout)
+            if not (sid in cls.MESSAGE):
+                raise TimedOutException
+            return cls.MESSAGE.pop(sid)
 
-        if not (sid in cls.MESSAGE):
-            # logger.warning(f"message failed {sid}")
-            raise TimedOutException
-        dat = cls.MESSAGE.pop(sid)
-        return dat
+    @classmethod
+    def messages(cls) -> Dict[str, Any]:
+        with cls.LOCK:
+            return dict(cls.MESSAGE)
 
 def comfy_api_post(route:str, ident:str, data:dict) -> None:
     data['id'] = ident
@@ -760,14 +794,14 @@ async def jovimetrix_home(req) -> Any:
 
 @PromptServer.instance.routes.get("/jovimetrix/message")
 async def jovimetrix_message(req) -> Any:
-    return web.json_response(ComfyAPIMessage.MESSAGE)
+    return web.json_response(ComfyAPIMessage.messages())
 
 @PromptServer.instance.routes.post("/jovimetrix/message")
 async def jovimetrix_message_post(req) -> Any:
     json_data = await req.json()
     logger.info(json_data)
     if (did := json_data.get("id")) is not None:
-        ComfyAPIMessage.MESSAGE[str(did)] = json_data
+        ComfyAPIMessage.send(did, json_data)
         return web.json_response(json_data)
     return web.json_response({})
 
@@ -833,7 +867,8 @@ async def jovimetrix_doc_node_comfy(req) -> Any:
 
 def parse_reset(ident:str) -> int:
     try:
-        data = ComfyAPIMessage.poll(ident, timeout=0.05)
+        # a reset is posted before the run is queued, no need to wait for it
+        data = ComfyAPIMessage.poll(ident, timeout=0)
         ret = data.get('cmd', None)
         return ret == 'reset'
     except TimedOutException as e:
@@ -853,16 +888,41 @@ def configLoad(fname:Path, as_json:bool=True) -> Any | list[str] | None:
         logger.error(e)
     return []
 
+def module_nodes(module: ModuleType) -> List[Tuple[str, type]]:
+    """The node classes in a core module, with any its import_dynamic makes."""
+    # check if there is a dynamic register function....
+    try:
+        for class_name, class_def in module.import_dynamic():
+            setattr(module, class_name, class_def)
+    except Exception as e:
+        pass
+
+    ret = []
+    for class_name, class_object in inspect.getmembers(module, inspect.isclass):
+        # assume both attrs are good enough....
+        if not class_name.endswith('BaseNode') and hasattr(class_object, 'NAME') and hasattr(class_object, 'CATEGORY'):
+            ret.append((class_name, class_object))
+    return ret
+
+def module_name(route: str) -> str:
+    """Full import name of a pack module route such as core.calc.
+
+    load_module and the lazy nodes both go through here, so a module is only
+    ever imported under one name.
+    """
+    # the name ComfyUI gave this package; inspect.stack() walked every frame to find it
+    module = __name__.replace("\\", "/").split("/")[-1]
+    return f"{module}.{route}"
+
 def load_module(name: str) -> None|ModuleType:
-    module = inspect.getmodule(inspect.stack()[0][0]).__name__
-    module = module.replace("\\", "/")
+    module = __name__.replace("\\", "/")
     route = str(name).replace("\\", "/")
     try:
         module = module.split("/")[-1]
         route = route.split(f"{module}/")[1]
         route = route.split('.')[0]
         route = route.replace('/', '.')
-        module = f"{module}.{route}"
+        module = module_name(route)
         return importlib.import_module(module)
     except Exception as e:
         logger.warning(f"file failed {name}")
@@ -878,6 +938,24 @@ def loader():
     else:
         JOV_IGNORE_NODE = []
 
+    manifest = manifest_load() if JOV_LAZY else None
+    manifest_new = {}
+
+    def register(class_object: type) -> None:
+        if (name := class_object.NAME) in JOV_IGNORE_NODE:
+            logger.warning(f"😥 {name}")
+            return
+
+        NODE_DISPLAY_NAME_MAPPINGS[name] = name
+        NODE_CLASS_MAPPINGS[name] = class_object
+
+        if not name.endswith(Lexicon.GLSL_CUSTOM):
+            desc = class_object.DESCRIPTION if hasattr(class_object, 'DESCRIPTION') else name
+            NODE_LIST_MAP[name] = desc.split('.')[0].strip('\n')
+        else:
+            logger.debug(f"customs {name}")
+
+    lazy = 0
     for fname in ROOT.glob('core/**/*.py'):
         if fname.stem.startswith('_'):
             continue
@@ -886,33 +964,22 @@ def loader():
             logger.warning(f"💀 [IGNORED] .core.{fname.stem}")
             continue
 
-        if (module := load_module(fname)) is None:
+        route = fname.relative_to(ROOT).with_suffix('').as_posix().replace('/', '.')
+        if manifest is not None and (entry := manifest.get(route, None)) is not None and entry['lazy']:
+            for class_name, node in entry['nodes'].items():
+                register(node_proxy(route, class_name, node))
+                lazy += 1
             continue
 
-        # check if there is a dynamic register function....
-        try:
-            for class_name, class_def in module.import_dynamic():
-                setattr(module, class_name, class_def)
-        except Exception as e:
-            pass
-
-        classes = inspect.getmembers(module, inspect.isclass)
-        for class_name, class_object in classes:
-            # assume both attrs are good enough....
-            if not class_name.endswith('BaseNode') and hasattr(class_object, 'NAME') and hasattr(class_object, 'CATEGORY'):
-                if (name := class_object.NAME) in JOV_IGNORE_NODE:
-                    logger.warning(f"😥 {name}")
-                    continue
+        if (module := load_module(fname)) is None:
+            continue
 
-                name = class_object.NAME
-                NODE_DISPLAY_NAME_MAPPINGS[name] = name
-                NODE_CLASS_MAPPINGS[name] = class_object
+        nodes = module_nodes(module)
+        for class_name, class_object in nodes:
+            register(class_object)
 
-                if not name.endswith(Lexicon.GLSL_CUSTOM):
-                    desc = class_object.DESCRIPTION if hasattr(class_object, 'DESCRIPTION') else name
-                    NODE_LIST_MAP[name] = desc.split('.')[0].strip('\n')
-                else:
-                    logger.debug(f"customs {name}")
+        if JOV_LAZY and manifest is None:
+            manifest_new[route] = manifest_module(nodes)
 
     NODE_CLASS_MAPPINGS = {x[0] : x[1] for x in sorted(NODE_CLASS_MAPPINGS.items(),
                                                             key=lambda item: getattr(item[1], 'SORT', 0))}
@@ -920,13 +987,193 @@ def loader():
     keys = NODE_CLASS_MAPPINGS.keys()
     #for name in keys:
     #    logger.debug(f"✅ {name}")
-    logger.info(f"{len(keys)} nodes loaded")
+    logger.info(f"{len(keys)} nodes loaded ({lazy} deferred)")
+
+    if JOV_LAZY and manifest is None:
+        manifest_save(manifest_new)
 
     # only do the list on local runs...
     if JOV_INTERNAL:
         with open(str(ROOT) + "/node_list.json", "w", encoding="utf-8") as f:
             json.dump(NODE_LIST_MAP, f, sort_keys=True, indent=4 )
 
+# ==============================================================================
+# === LAZY NODES ===
+# ==============================================================================
+
+class JOVLazyNode(JOVBaseNode):
+    """Stand-in registered from the manifest for a node whose module is not
+    imported yet. The first instance ComfyUI asks for imports the module and
+    hands back an instance of the real node instead.
+    """
+    _jov_module: str = None
+    _jov_class: str = None
+    _jov_input: Dict[str, Any] = {}
+    _jov_real: type = None
+
+    @classmethod
+    def INPUT_TYPES(cls, *arg, **kw) -> InputType:
+        return copy.deepcopy(cls._jov_input)
+
+    @classmethod
+    def node_class(cls) -> type:
+        if cls._jov_real is None:
+            module = importlib.import_module(module_name(cls._jov_module))
+            if (real := dict(module_nodes(module)).get(cls._jov_class, None)) is None:
+                raise Exception(f"missing node {cls._jov_class} in {cls._jov_module}, rebuild {JOV_MANIFEST.name}")
+            logger.debug(f"lazy import {cls._jov_module}.{cls._jov_class}")
+            cls._jov_real = real
+        return cls._jov_real
+
+    def __new__(cls, *arg, **kw) -> Any:
+        return cls.node_class()(*arg, **kw)
+
+def manifest_encode(value: Any) -> Any:
+    """JSON safe copy of a class attribute, keeping tuples and AnyType apart
+    from lists and strings. Raises TypeError for anything else."""
+    if isinstance(value, AnyType):
+        return {"__jov_any__": str(value)}
+    if isinstance(value, tuple):
+        return {"__jov_tuple__": [manifest_encode(v) for v in value]}
+    if isinstance(value, list):
+        return [manifest_encode(v) for v in value]
+    if isinstance(value, dict):
+        if not all(isinstance(k, str) for k in value.keys()):
+            raise TypeError("dict keys must be strings")
+        return {str(k): manifest_encode(v) for k, v in value.items()}
+    if value is None or type(value) in (bool, int, float, str):
+        return value
+    raise TypeError(f"can not store {type(value)}")
+
+def manifest_decode(value: Any) -> Any:
+    if isinstance(value, list):
+        return [manifest_decode(v) for v in value]
+    if isinstance(value, dict):
+        if len(value) == 1:
+            if "__jov_any__" in value:
+                return AnyType(value["__jov_any__"])
+            if "__jov_tuple__" in value:
+                return tuple(manifest_decode(v) for v in value["__jov_tuple__"])
+        return {k: manifest_decode(v) for k, v in value.items()}
+    return value
+
+def manifest_module(nodes: List[Tuple[str, type]]) -> Dict[str, Any]:
+    """Manifest entry for one core module. The module is only deferred when
+    every node in it allows it and all it shows ComfyUI can be stored."""
+    ret = {"lazy": True, "nodes": {}}
+    for class_name, class_object in nodes:
+        if not getattr(class_object, 'LAZY', True):
+            ret["lazy"] = False
+            continue
+        try:
+            data = manifest_encode(class_object.INPUT_TYPES())
+        except Exception as e:
+            logger.debug(f"{class_name} stays eager: {e}")
+            ret["lazy"] = False
+            continue
+
+        attr = {}
+        for key in dir(class_object):
+            if not key.isupper() or key in ['INPUT_TYPES', 'LAZY']:
+                continue
+            if callable(value := getattr(class_object, key)):
+                continue
+            # only what ComfyUI reads off the class; the rest comes with the module
+            try:
+                attr[key] = manifest_encode(value)
+            except TypeError:
+                pass
+
+        ret["nodes"][class_name] = {
+            "attr": attr,
+            "input": data,
+            "changed": hasattr(class_object, 'IS_CHANGED')
+        }
+    if not ret["lazy"]:
+        ret["nodes"] = {}
+    return ret
+
+def manifest_signature() -> str:
+    """Changes whenever a python source of the pack or a JOV_ setting does."""
+    digest = hashlib.sha1()
+    for fname in sorted([ROOT / '__init__.py', ROOT / 'ignore.txt', *ROOT.glob('core/**/*.py'), *ROOT.glob('sup/**/*.py')]):
+        try:
+            stat = fname.stat()
+        except FileNotFoundError:
+            continue
+        digest.update(f"{fname.relative_to(ROOT).as_posix()}:{stat.st_mtime_ns}:{stat.st_size};".encode())
+    for key in sorted(os.environ.keys()):
+        if key.startswith("JOV_") and key not in ['JOV_LAZY', 'JOV_LOG_LEVEL']:
+            digest.update(f"{key}={os.environ[key]};".encode())
+    return digest.hexdigest()
+
+def manifest_paths() -> List[Path]:
+    """Where the manifest may live: the pack itself, then ComfyUI's user
+    directory and the temp directory for installs where the pack is read-only."""
+    paths = [JOV_MANIFEST]
+    try:
+        paths.append(Path(folder_paths.get_user_directory()) / 'jovimetrix' / JOV_MANIFEST.name)
+    except Exception:
+        pass
+    paths.append(Path(tempfile.gettempdir()) / 'jovimetrix' / JOV_MANIFEST.name)
+    return paths
+
+def manifest_load() -> Dict[str, Any] | None:
+    """The module entries of the manifest, None when missing or out of date."""
+    signature = manifest_signature()
+    for fname in manifest_paths():
+        try:
+            with open(fname, 'r', encoding='utf-8') as fn:
+                data = json.load(fn)
+        except FileNotFoundError:
+            continue
+        except Exception as e:
+            logger.warning(f"bad node manifest {fname}: {e}")
+            continue
+
+        if data.get('schema', None) == JOV_MANIFEST_SCHEMA and data.get('signature', None) == signature:
+            return data.get('modules', {})
+    logger.info("no current node manifest, importing everything")
+    return None
+
+def manifest_save(modules: Dict[str, Any]) -> None:
+    """Write the manifest to the first of `manifest_paths` that takes it. When
+    none does the nodes stay eager, which is only slower to start."""
+    data = {
+        "schema": JOV_MANIFEST_SCHEMA,
+        "signature": manifest_signature(),
+        "modules": modules
+    }
+    for fname in manifest_paths():
+        temp = fname.with_suffix('.tmp')
+        try:
+            fname.parent.mkdir(parents=True, exist_ok=True)
+            with open(temp, 'w', encoding='utf-8') as fn:
+                json.dump(data, fn, indent=1)
+            os.replace(temp, fname)
+            logger.info(f"wrote node manifest {fname}")
+            return
+        except Exception as e:
+            logger.debug(f"could not write node manifest {fname}: {e}")
+            try:
+                temp.unlink(missing_ok=True)
+            except Exception:
+                pass
+    logger.warning("could not write the node manifest anywhere, nodes stay eager")
+
+def node_proxy(route: str, class_name: str, node: Dict[str, Any]) -> type:
+    """Proxy node class for a manifest entry."""
+    attr = {k: manifest_decode(v) for k, v in node["attr"].items()}
+    attr.update({
+        "_jov_module": route,
+        "_jov_class": class_name,
+        "_jov_input": manifest_decode(node["input"]),
+        "_jov_real": None,
+    })
+    if node.get("changed", False):
+        attr["IS_CHANGED"] = classmethod(lambda cls, *arg, **kw: cls.node_class().IS_CHANGED(*arg, **kw))
+    return type(class_name, (JOVLazyNode,), attr)
+
 # ==============================================================================
 # === BOOTSTRAP ===
 # ==============================================================================
@@ -0,0 +1,133 @@
+"""
+Jovimetrix - Benchmarks
+
+Run from the node pack folder inside a ComfyUI install:
+
+    cd ComfyUI/custom_nodes/Jovimetrix
+    python -m benchmarks.image --output base.json
+    python -m benchmarks.compare base.json head.json
+    python -m benchmarks.stream --clients 1 4 8
+    python -m benchmarks.startup
+    python -m benchmarks.memory --batch 8
+    python -m benchmarks.params
+    python -m benchmarks.frames --workers 1 2 4 8
+    python -m benchmarks.export --count 1000
+    python -m benchmarks.lut --nodes 33 256
+    python -m benchmarks.colorblind --severity 0.5 1 --output cb.json
+    python -m benchmarks.palette --colors 8 32
+    python -m benchmarks.gradient --width 256 4096
+    python -m benchmarks.normals --size 2048
+    python -m benchmarks.anim --count 10000
+    python -m benchmarks.nodes --size 512x512 --batch 8
+    python -m benchmarks.stereo --size 256x256 --shift 1 4
+    python -m benchmarks.blend --size 512x512 1024x1024 3840x2160
+
+Everything runs on the CPU against synthetic images. The pack has no test
+suite. Where a benchmark times a new path next to the one it replaced, it
+also reports how far the results differ as `mismatch` or `error`.
+"""
+
+import os
+import sys
+import json
+import time
+import asyncio
+import platform
+import statistics
+import importlib
+import importlib.util
+from pathlib import Path
+from types import ModuleType
+from typing import Any, Callable, Dict
+
+PACK = Path(__file__).resolve().parent.parent
+
+# bump when the layout of the JSON report changes
+SCHEMA = 1
+
+def host_comfy() -> None:
+    """Put the ComfyUI root (two folders above the pack) on the path and start
+    a PromptServer, since the pack registers routes on import."""
+    comfy_root = PACK.parent.parent
+    if str(comfy_root) not in sys.path:
+        sys.path.insert(0, str(comfy_root))
+
+    import server
+    if getattr(server.PromptServer, "instance", None) is None:
+        loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(loop)
+        server.PromptServer(loop)
+
+def bootstrap() -> ModuleType:
+    """Import the node pack the same way ComfyUI does when it loads custom nodes."""
+    if (module := sys.modules.get(PACK.name, None)) is not None:
+        return module
+
+    host_comfy()
+    spec = importlib.util.spec_from_file_location(PACK.name, PACK / "__init__.py",
+                                                  submodule_search_locations=[str(PACK)])
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[PACK.name] = module
+    spec.loader.exec_module(module)
+    return module
+
+def load(name: str) -> ModuleType:
+    """Import a module of the node pack, i.e. `load("sup.stream")`."""
+    return importlib.import_module(f"{bootstrap().__name__}.{name}")
+
+def measure(func: Callable[[], Any], repeat: int=5, warmup: int=1) -> Dict[str, float]:
+    """Time func() in milliseconds, after a few untimed warmup calls."""
+    for _ in range(warmup):
+        func()
+    runs = []
+    for _ in range(max(1, repeat)):
+        start = time.perf_counter()
+        func()
+        runs.append(1000. * (time.perf_counter() - start))
+    return {
+        "ms": round(statistics.median(runs), 4),
+        "min": round(min(runs), 4),
+        "max": round(max(runs), 4),
+        "runs": len(runs)
+    }
+
+def host() -> Dict[str, Any]:
+    """Versions and machine details stored next to the timings."""
+    info = {
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "machine": platform.machine(),
+        "cpu_count": os.cpu_count()
+    }
+    for name in ["numpy", "cv2", "torch"]:
+        try:
+            info[name] = importlib.import_module(name).__version__
+        except Exception:
+            info[name] = None
+    return info
+
+def report(suite: str, results: Dict[str, Dict[str, float]], **meta) -> Dict[str, Any]:
+    return {
+        "schema": SCHEMA,
+        "suite": suite,
+        "created": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "host": host(),
+        "meta": meta,
+        "results": dict(sorted(results.items()))
+    }
+
+def report_save(data: Dict[str, Any], fname: str=None) -> None:
+    """Write the report to fname or stdout."""
+    text = json.dumps(data, indent=4)
+    if fname is None:
+        print(text)
+        return
+    with open(fname, "w", encoding="utf-8") as fd:
+        fd.write(text)
+
+def report_load(fname: str) -> Dict[str, Any]:
+    with open(fname, "r", encoding="utf-8") as fd:
+        data = json.load(fd)
+    if data.get("schema", None) != SCHEMA:
+        raise ValueError(f"{fname} is schema {data.get('schema', None)}, expected {SCHEMA}")
+    return data
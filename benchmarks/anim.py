@@ -0,0 +1,89 @@
+"""
+Jovimetrix - Benchmark easing and wave schedules
+
+Times ease_op and wave_op called once per element, the way the nodes used to
+walk a schedule, against one call over the whole schedule. Each batched case
+also counts the elements that differ from the per element calls as
+`mismatch`. NOISE is random and only timed. calc.WaveGeneratorNode runs
+WAVE GEN over a schedule of mixed waves with INVERT and ABSOLUTE set on
+some rows, against one wave_op per row.
+
+    python -m benchmarks.anim --count 10000
+"""
+
+import sys
+import argparse
+from types import ModuleType
+from typing import Any, Dict
+
+import numpy as np
+
+from . import bootstrap, load, measure, report, report_save
+
+# ==============================================================================
+
+def run(anim: ModuleType, count: int=10000, repeat: int=3) -> Dict[str, Any]:
+
+    rng = np.random.default_rng(0)
+    alpha = rng.random(count)
+    start, end = rng.random(count) * 10, rng.random(count) * 10
+    wave = rng.random((5, count))
+    wave[1] *= 4
+    wave[4] *= 10
+
+    results = {}
+    with np.errstate(all="ignore"):
+        for op in anim.EnumEase:
+            single = lambda: np.array([anim.ease_op(op, start[i], end[i], alpha=alpha[i]) for i in range(count)])
+            batch = lambda: anim.ease_op(op, start, end, alpha=alpha)
+            results[f"anim.ease.{op.name}.single/{count}"] = measure(single, 1)
+            results[f"anim.ease.{op.name}.batch/{count}"] = timing = measure(batch, repeat)
+            timing["mismatch"] = int(np.count_nonzero(single() != batch()))
+
+        for op in anim.WAVE:
+            single = lambda: np.array([anim.wave_op(op, *wave[:, i]) for i in range(count)])
+            batch = lambda: anim.wave_op(op, *wave)
+            results[f"anim.wave.{op.name}.single/{count}"] = measure(single, 1)
+            results[f"anim.wave.{op.name}.batch/{count}"] = timing = measure(batch, repeat)
+            if op != anim.EnumWave.NOISE:
+                timing["mismatch"] = int(np.count_nonzero(single() != batch()))
+
+        Lexicon = bootstrap().Lexicon
+        node = load("core.calc").WaveGeneratorNode
+        waves = [op for op in anim.WAVE if op != anim.EnumWave.NOISE]
+        # parse_param rounds floats to 16 places, feed both sides the rounded schedule
+        wave = np.array([[round(float(x), 16) for x in row] for row in wave])
+        kw = {
+            Lexicon.WAVE: [waves[i % len(waves)].name for i in range(count)],
+            Lexicon.FREQ: wave[1].tolist(),
+            Lexicon.AMP: wave[2].tolist(),
+            Lexicon.PHASE: wave[0].tolist(),
+            Lexicon.TIME: wave[4].tolist(),
+            Lexicon.INVERT: [i % 3 == 0 for i in range(count)],
+            Lexicon.ABSOLUTE: [i % 5 == 0 for i in range(count)],
+        }
+
+        def single() -> np.ndarray:
+            # INVERT uses the reciprocal of the amplitude
+            val = [anim.wave_op(waves[i % len(waves)], wave[0, i], wave[1, i],
+                                1. / wave[2, i] if i % 3 == 0 and wave[2, i] != 0 else wave[2, i], 0, wave[4, i])
+                   for i in range(count)]
+            return np.array([abs(v) if i % 5 == 0 else v for i, v in enumerate(val)])
+
+        results[f"calc.WaveGeneratorNode/{count}"] = timing = measure(lambda: node().run(**kw), repeat)
+        timing["mismatch"] = int(np.count_nonzero(np.array(node().run(**kw)[0]) !=
+                                                  np.clip(single(), -sys.maxsize, sys.maxsize)))
+
+    return report("anim", results, count=count, repeat=repeat)
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--count", type=int, default=10000, help="elements in the schedule")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--output", default=None, help="JSON file, stdout if not given")
+    args = parser.parse_args()
+    result = run(load("sup.anim"), args.count, args.repeat)
+    report_save(result, args.output)
+
+if __name__ == "__main__":
+    main()
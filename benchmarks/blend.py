@@ -0,0 +1,80 @@
+"""
+Jovimetrix - Benchmark blend modes
+
+Times image_blend for every EnumBlendType at each size, with a BGR
+background and a BGRA foreground of random pixels and alpha. At the first
+size every mode also runs at alpha 1 and 0.5, with and without a mask,
+against image_blend_pil, the blendmodes/PIL path it replaced. The largest
+difference over those four runs is `error` in uint8 steps, the runs one by
+one are `errors` and the PIL time is under `reference`. `mpx` is the
+megapixels blended per second.
+
+blendmodes never wires ADDITIVE and GLOW into its lookup and renders them
+as NORMAL. image_blend does what the names say, so those two are marked
+`expected` and their error is the change, not a bug.
+
+    python -m benchmarks.blend --size 512x512 1024x1024 3840x2160
+    python -m benchmarks.blend --mode NORMAL HUE GLOW --size 256x256
+"""
+
+import argparse
+from types import ModuleType
+from typing import Any, Dict, List
+
+import numpy as np
+
+from . import load, measure, report, report_save
+from .image import size_parse
+
+# ==============================================================================
+
+SIZES = ["512x512", "1024x1024", "3840x2160"]
+# blendmodes renders these as NORMAL
+EXPECTED = ["ADDITIVE", "GLOW"]
+
+def run(compose: ModuleType, sizes: List[str]=SIZES, modes: List[str]=None,
+        repeat: int=3) -> Dict[str, Any]:
+
+    modes = modes or compose.EnumBlendType._member_names_
+    rng = np.random.default_rng(0)
+    results = {}
+    for idx, size in enumerate(sizes):
+        width, height = size_parse(size)
+        imageA = rng.integers(0, 256, (height, width, 3), dtype=np.uint8)
+        imageB = rng.integers(0, 256, (height, width, 4), dtype=np.uint8)
+        mask = rng.integers(0, 256, (height, width), dtype=np.uint8)
+        for name in modes:
+            op = compose.EnumBlendType[name]
+            key = f"compose.image_blend.{name}/{width}x{height}"
+            results[key] = timing = measure(lambda: compose.image_blend(imageA, imageB, None, op, 1), repeat)
+            timing["mpx"] = round(width * height / 1000. / timing["ms"], 2)
+            if idx > 0:
+                continue
+
+            # the PIL path is far too slow to check every size
+            errors = {}
+            for alpha in [1, 0.5]:
+                for m in [None, mask]:
+                    new = compose.image_blend(imageA, imageB, m, op, alpha)
+                    old = compose.image_blend_pil(imageA, imageB, m, op, alpha)
+                    label = f"a{alpha:g}" + ("" if m is None else ".mask")
+                    errors[label] = int(np.abs(new.astype(np.int16) - old.astype(np.int16)).max())
+            timing["error"] = max(errors.values())
+            timing["errors"] = errors
+            timing["expected"] = name in EXPECTED
+            results[f"reference.image_blend_pil.{name}/{width}x{height}"] = measure(
+                lambda: compose.image_blend_pil(imageA, imageB, None, op, 1), 1, 0)
+
+    return report("blend", results, sizes=sizes, modes=modes, expected=EXPECTED, repeat=repeat)
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--size", nargs="+", default=SIZES, help="WIDTHxHEIGHT, the first one is checked against PIL")
+    parser.add_argument("--mode", nargs="+", default=None, help="EnumBlendType names, all if not given")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--output", default=None, help="JSON file, stdout if not given")
+    args = parser.parse_args()
+    report_save(run(load("sup.image.compose"), args.size, args.mode, args.repeat), args.output)
+
+if __name__ == "__main__":
+    main()
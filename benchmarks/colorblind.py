@@ -0,0 +1,82 @@
+"""
+Jovimetrix - Benchmark color blind simulation
+
+Per-frame cost of a fresh daltonlens simulator against color_blind and
+color_blind_batch over the same frames, at each severity. Each fast case
+also counts the channel values that differ from daltonlens as `mismatch`.
+`matrix` is 1 when the simulation ran as one matrix pass and 0 when it fell
+back to daltonlens, as it does for Brettel or when the pinned daltonlens
+internals move. daltonlens prints the algorithm AUTOSELECT picks, so write
+the report with --output.
+
+    python -m benchmarks.colorblind --frames 16 --width 1280 --height 720 --severity 0.5 1 --output cb.json
+"""
+
+import argparse
+from types import ModuleType
+from typing import Any, Dict, List
+
+import cv2
+import numpy as np
+
+from . import load, measure, report, report_save
+
+# ==============================================================================
+
+SIMULATORS = ["AUTOSELECT", "VIENOT1999", "MACHADO2009", "COBLISV1", "BRETTEL1997"]
+
+SEVERITIES = [0.5, 1.]
+
+def run(color: ModuleType, frames: int=16, width: int=1280, height: int=720,
+        severities: List[float]=SEVERITIES, simulators: List[str]=SIMULATORS,
+        repeat: int=3) -> Dict[str, Any]:
+
+    rng = np.random.default_rng(0)
+    batch = rng.integers(0, 256, (frames, height, width, 3), dtype=np.uint8)
+
+    def daltonlens(image: np.ndarray, deficiency, simulator, severity) -> np.ndarray:
+        """What color_blind did before the registry, a new simulator per frame."""
+        image = cv2.cvtColor(image, cv2.COLOR_BGR2RGB)
+        image = color.CB_SIMULATOR[simulator]().simulate_cvd(image, deficiency.value, severity=severity)
+        return cv2.cvtColor(image, cv2.COLOR_RGB2BGR)
+
+    results = {}
+    for severity in severities:
+        for name in simulators:
+            simulator = color.EnumCBSimulator[name]
+            for deficiency in color.EnumCBDeficiency:
+                reference = np.stack([daltonlens(img, deficiency, simulator, severity) for img in batch])
+                matrix = color.color_blind_matrix(simulator, deficiency, severity) is not None
+                cases = {
+                    "daltonlens": lambda: [daltonlens(img, deficiency, simulator, severity) for img in batch],
+                    "color_blind": lambda: np.stack([color.color_blind(img, deficiency, simulator, severity) for img in batch]),
+                }
+                if matrix:
+                    cases["color_blind_batch"] = lambda: color.color_blind_batch(batch, deficiency, simulator, severity)
+
+                for case, func in cases.items():
+                    timing = measure(func, repeat, 1)
+                    timing = {k: round(v / frames, 4) if k != "runs" else v for k, v in timing.items()}
+                    if case != "daltonlens":
+                        timing["mismatch"] = int(np.count_nonzero(func() != reference))
+                        timing["matrix"] = int(matrix)
+                    results[f"color.{case}.{name}.{deficiency.name}.s{severity:g}/{width}x{height}/frame"] = timing
+
+    return report("colorblind", results, frames=frames, severities=severities, repeat=repeat)
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--frames", type=int, default=16)
+    parser.add_argument("--width", type=int, default=1280)
+    parser.add_argument("--height", type=int, default=720)
+    parser.add_argument("--severity", type=float, nargs="+", default=SEVERITIES)
+    parser.add_argument("--simulator", nargs="+", default=SIMULATORS)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--output", default=None, help="JSON file, stdout if not given")
+    args = parser.parse_args()
+    result = run(load("sup.image.color"), args.frames, args.width, args.height,
+                 args.severity, args.simulator, args.repeat)
+    report_save(result, args.output)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,66 @@
+"""
+Jovimetrix - Compare two benchmark reports
+
+Prints the change for every case both reports share and exits with 1 when
+any case is slower than the threshold.
+
+    python -m benchmarks.compare base.json head.json --threshold 10
+"""
+
+import sys
+import argparse
+from typing import Any, Dict, List
+
+from . import report_load
+
+# ==============================================================================
+
+def compare(base: Dict[str, Any], head: Dict[str, Any], threshold: float=10.,
+            floor: float=0.05) -> List[Dict[str, Any]]:
+    """Per case change in percent of the median time.
+
+    Cases faster than floor milliseconds in both runs are never flagged, they
+    are mostly timer noise.
+    """
+    rows = []
+    for key, old in base["results"].items():
+        if (new := head["results"].get(key, None)) is None:
+            continue
+        a, b = old["ms"], new["ms"]
+        change = 100. * (b - a) / a if a > 0 else 0.
+        rows.append({
+            "case": key,
+            "base": a,
+            "head": b,
+            "change": round(change, 2),
+            "regression": change > threshold and max(a, b) >= floor
+        })
+    return rows
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("base")
+    parser.add_argument("head")
+    parser.add_argument("--threshold", type=float, default=10., help="percent slower that counts as a regression")
+    parser.add_argument("--floor", type=float, default=0.05, help="ignore cases under this many ms")
+    args = parser.parse_args()
+
+    base = report_load(args.base)
+    head = report_load(args.head)
+    rows = compare(base, head, args.threshold, args.floor)
+    width = max([len(r["case"]) for r in rows] + [4])
+    print(f"{'case':<{width}}  {'base ms':>10}  {'head ms':>10}  {'change':>8}")
+    for r in rows:
+        flag = "  REGRESSION" if r["regression"] else ""
+        print(f"{r['case']:<{width}}  {r['base']:>10.3f}  {r['head']:>10.3f}  {r['change']:>+7.1f}%{flag}")
+
+    missing = set(base["results"]) ^ set(head["results"])
+    if len(missing):
+        print(f"{len(missing)} case(s) only in one report")
+
+    regressions = sum(r["regression"] for r in rows)
+    print(f"{regressions} regression(s) over {args.threshold}%")
+    sys.exit(1 if regressions else 0)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,141 @@
+"""
+Jovimetrix - Benchmark the export node
+
+Runs EXPORT (JOV) once per format in a fresh interpreter and reports the
+wall time and how far the peak RSS of the process grew while writing.
+The `save.*` cases run SAVE OUTPUT (JOV) instead, `return_ms` is when the
+node handed back and `ms` when the queue had written every frame, `fps`
+follows from `ms`. There is one PNG case per compress_level. They read up to
+32 of the files back and count the ones missing or not byte for byte the same
+as a synchronous Image.save of the same frame and metadata as `mismatch`, and
+the saves the queue reported as `failed`. The frames are views of a few
+blocky random images so the input batch itself costs next to nothing and the
+growth is what the export holds on to. Files go to /dev/shm when it exists,
+a tmpfs leaves the disk out of it, --target picks another folder.
+
+    python -m benchmarks.export --count 1000 --size 1024x1024 --target /tmp/export
+    python -m benchmarks.export --format save.png save.png0 save.png9 save.tiff
+"""
+
+import os
+import sys
+import json
+import shutil
+import argparse
+import tempfile
+import subprocess
+from typing import Any, Dict, List
+
+from . import PACK, report, report_save
+from .image import size_parse
+
+# ==============================================================================
+
+FORMATS = ["png", "jpg", "gif", "webp"]
+
+# SAVE OUTPUT (JOV) settings
+SAVE = {
+    "save.png": {"format": "png"},
+    "save.png0": {"format": "png", "compress_level": 0},
+    "save.png1": {"format": "png", "compress_level": 1},
+    "save.png9": {"format": "png", "compress_level": 9},
+    "save.tiff": {"format": "tiff"},
+}
+COUNT = 1000
+SIZE = "1024x1024"
+# tmpfs on most linux boxes
+TARGET = "/dev/shm" if os.path.isdir("/dev/shm") else None
+
+CHILD = """
+import io as bytes_io, sys, json, time, resource
+from pathlib import Path
+import numpy as np
+import torch
+from PIL import Image
+from PIL.PngImagePlugin import PngInfo
+from benchmarks import bootstrap, load
+from benchmarks.export import SAVE
+Lexicon = bootstrap().Lexicon
+io = load("core.utility.io")
+fmt, count, width, height, target = sys.argv[1], int(sys.argv[2]), int(sys.argv[3]), int(sys.argv[4]), sys.argv[5]
+torch.manual_seed(0)
+# blocks of flat color, noise would make every format, GIF most of all, far slower than real footage
+pool = torch.rand((8, 3, max(1, height // 16), max(1, width // 16)))
+pool = torch.nn.functional.interpolate(pool, size=(height, width), mode="nearest").permute(0, 2, 3, 1)
+frames = [pool[i % len(pool)] for i in range(count)]
+rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+result = {}
+start = time.perf_counter()
+if fmt in SAVE:
+    io.SaveOutput().run(image=frames, path=[target], fname=[f"bench_{i}" for i in range(count)],
+                        prompt="bench", **SAVE[fmt])
+    result["return_ms"] = round(1000. * (time.perf_counter() - start), 2)
+    export = load("sup.export")
+    queue = export.export_queue()
+    result["failed"] = queue.failed
+    try:
+        queue.flush()
+    except export.ExportException:
+        pass
+else:
+    io.ExportNode().run(**{Lexicon.PIXEL: frames, Lexicon.FORMAT: fmt, Lexicon.PASS_OUT: target,
+                           Lexicon.PREFIX: "bench", Lexicon.OVERWRITE: False})
+ms = 1000. * (time.perf_counter() - start)
+rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss - rss
+# ru_maxrss is in KiB on linux
+result.update(ms=round(ms, 2), fps=round(1000. * count / ms, 2), rss_mb=round(rss / 1024, 2))
+if fmt in SAVE:
+    image = load("sup.image")
+    # the metadata SaveOutput builds, in the same key order
+    metadata = {"prompt": "bench", "workflow": json.dumps({})}
+    if SAVE[fmt]["format"] == "tiff":
+        save = {"tiffinfo": {270: json.dumps(metadata)}}
+    else:
+        pnginfo = PngInfo()
+        for k, v in metadata.items():
+            pnginfo.add_text(k, json.dumps(v))
+        save = {"pnginfo": pnginfo, "compress_level": SAVE[fmt].get("compress_level", 6)}
+    mismatch = 0
+    for i in range(0, count, max(1, count // 32)):
+        fname = Path(target) / f"bench_{i}.{SAVE[fmt]['format']}"
+        expect = bytes_io.BytesIO()
+        Image.fromarray(np.clip(image.tensor2cv(frames[i]), 0, 255).astype(np.uint8)).save(
+            expect, format=SAVE[fmt]["format"], **save)
+        try:
+            mismatch += int(fname.read_bytes() != expect.getvalue())
+        except Exception:
+            mismatch += 1
+    result["mismatch"] = mismatch
+print(json.dumps(result))
+"""
+
+def child(fmt: str, count: int, width: int, height: int, target: str) -> Dict[str, float]:
+    result = subprocess.run([sys.executable, "-c", CHILD, fmt, str(count), str(width), str(height), target],
+                            cwd=str(PACK), capture_output=True, text=True)
+    if result.returncode != 0:
+        raise RuntimeError(result.stderr[-2000:])
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+def run(formats: List[str]=FORMATS, count: int=COUNT, size: str=SIZE, target: str=TARGET) -> Dict[str, Any]:
+    width, height = size_parse(size)
+    results = {}
+    for fmt in formats:
+        root = tempfile.mkdtemp(prefix="jov_export_", dir=target)
+        try:
+            results[f"export.{fmt}/{width}x{height}/n{count}"] = child(fmt, count, width, height, root)
+        finally:
+            shutil.rmtree(root, ignore_errors=True)
+    return report("export", results, formats=formats, count=count, size=size, target=target)
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--format", nargs="+", default=FORMATS)
+    parser.add_argument("--count", type=int, default=COUNT, help="frames to export")
+    parser.add_argument("--size", default=SIZE, help="WIDTHxHEIGHT")
+    parser.add_argument("--target", default=TARGET, help="folder to write into, /dev/shm or the system temp folder if not given")
+    parser.add_argument("--output", default=None, help="JSON file, stdout if not given")
+    args = parser.parse_args()
+    report_save(run(args.format, args.count, args.size, args.target), args.output)
+
+if __name__ == "__main__":
+    main()
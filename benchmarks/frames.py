@@ -0,0 +1,81 @@
+"""
+Jovimetrix - Benchmark the frame executor
+
+Runs a few image nodes over one batch with 1, 2, 4 and 8 frame workers
+(JOV_FRAME_WORKERS) to show how the per frame loops scale with the cores.
+`speedup` is against the single worker run of the same case.
+
+    python -m benchmarks.frames --size 1280x720 --batch 16 --output frames.json
+"""
+
+import argparse
+from typing import Any, Callable, Dict, List
+
+import torch
+
+from . import bootstrap, load, measure, report, report_save
+from .image import size_parse
+
+# ==============================================================================
+
+SIZES = ["1280x720"]
+BATCHES = [16]
+WORKERS = [1, 2, 4, 8]
+
+def cases(width: int, height: int, batch: int) -> Dict[str, Callable[[], Any]]:
+    """Name -> callable running one node over the whole batch."""
+
+    Lexicon = bootstrap().Lexicon
+    compose = load("core.compose")
+    create = load("core.create")
+    torch.manual_seed(0)
+    image = torch.rand((batch, height, width, 4))
+    depth = torch.rand((batch, height, width, 3))
+
+    def node(cls: Any, **kw) -> Callable[[], Any]:
+        return lambda: cls().run(**kw)
+
+    return {
+        "adjust.blur": node(compose.AdjustNode, **{Lexicon.PIXEL: image, Lexicon.FUNC: "BLUR", Lexicon.RADIUS: 9}),
+        "adjust.sharpen": node(compose.AdjustNode, **{Lexicon.PIXEL: image, Lexicon.FUNC: "SHARPEN"}),
+        "transform.rotate": node(compose.TransformNode, **{Lexicon.PIXEL: image, Lexicon.ANGLE: 30}),
+        "colormatch.reinhard": node(compose.ColorMatchNode, **{Lexicon.PIXEL_A: image, Lexicon.PIXEL_B: depth}),
+        "stereogram": node(create.StereogramNode, **{Lexicon.PIXEL: image, Lexicon.DEPTH: depth}),
+    }
+
+def run(sizes: List[str]=SIZES, batches: List[int]=BATCHES, workers: List[int]=WORKERS,
+        repeat: int=3, match: str=None) -> Dict[str, Any]:
+    util = load("sup.util")
+    default = util.JOV_FRAME_WORKERS
+    results = {}
+    try:
+        for size in sizes:
+            width, height = size_parse(size)
+            for batch in batches:
+                for name, func in cases(width, height, batch).items():
+                    if match is not None and match not in name:
+                        continue
+                    serial = None
+                    for count in workers:
+                        util.JOV_FRAME_WORKERS = count
+                        timing = measure(func, repeat, 1)
+                        serial = serial or timing["ms"]
+                        timing["speedup"] = round(serial / timing["ms"], 2)
+                        results[f"{name}/{width}x{height}/b{batch}/w{count}"] = timing
+    finally:
+        util.JOV_FRAME_WORKERS = default
+    return report("frames", results, sizes=sizes, batches=batches, workers=workers)
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--size", nargs="+", default=SIZES, help="WIDTHxHEIGHT")
+    parser.add_argument("--batch", type=int, nargs="+", default=BATCHES)
+    parser.add_argument("--workers", type=int, nargs="+", default=WORKERS)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--match", default=None, help="only run cases whose name contains this")
+    parser.add_argument("--output", default=None, help="JSON file, stdout if not given")
+    args = parser.parse_args()
+    report_save(run(args.size, args.batch, args.workers, args.repeat, args.match), args.output)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,85 @@
+"""
+Jovimetrix - Benchmark gradients
+
+Times image_gradient with its ramp cache cleared before every call and with
+the ramp already cached, and image_gradient_map over a batch, at a few widths.
+The gradient is compared with the per column loop it replaced and the batch
+map with applyColorMap run frame by frame, the values that differ are
+counted as `mismatch`.
+
+    python -m benchmarks.gradient --width 256 4096 --height 256 --batch 8
+"""
+
+import math
+import argparse
+from types import ModuleType
+from typing import Any, Dict, List
+
+import cv2
+import numpy as np
+
+from . import load, measure, report, report_save
+
+# ==============================================================================
+
+WIDTHS = [256, 4096]
+STOPS = {0: (255, 0, 0), 0.25: (255, 255, 0), 0.5: (0, 255, 0), 0.75: (0, 255, 255), 1: (0, 0, 255)}
+
+def gradient_reference(width: int, height: int, color_map: dict) -> np.ndarray:
+    color_map = {np.clip(float(k), 0, 1): [np.clip(int(c), 0, 255) for c in v] for k, v in color_map.items()}
+    color_map = dict(sorted(color_map.items()))
+    widthf = float(width)
+    ws = widthf / len(color_map)
+    row = np.zeros((width, 4), dtype=np.uint8)
+    for x in range(width):
+        for c in range(3):
+            value = sum([p[c] * math.exp(-(x - k * widthf)**2 / (2 * ws**2)) for k, p in color_map.items()])
+            row[x, 2 - c] = min(255, int(value))
+    # PIL RGBA images start opaque black
+    row[:, 3] = 255
+    return np.ascontiguousarray(np.broadcast_to(row, (height, width, 4)))
+
+def run(color: ModuleType, zend: ModuleType, widths: List[int]=WIDTHS, height: int=256,
+        batch: int=8, repeat: int=5) -> Dict[str, Any]:
+
+    rng = np.random.default_rng(0)
+    results = {}
+    for width in widths:
+        def uncached() -> None:
+            zend.image_gradient_ramp.cache_clear()
+            zend.image_gradient(width, height, STOPS)
+
+        frames = rng.integers(0, 256, (batch, height, width, 3), dtype=np.uint8)
+        strip = zend.image_gradient(width, 1, STOPS)
+        cases = {
+            "zend.image_gradient.uncached": uncached,
+            "zend.image_gradient.cached": lambda: zend.image_gradient(width, height, STOPS),
+            "color.image_gradient_map.frame": lambda: [color.image_gradient_map(f, strip) for f in frames],
+            "color.image_gradient_map.batch": lambda: color.image_gradient_map(frames, strip),
+        }
+        for name, func in cases.items():
+            results[f"{name}/{width}x{height}"] = measure(func, repeat)
+
+        reference = gradient_reference(width, height, STOPS)
+        results[f"zend.image_gradient.uncached/{width}x{height}"]["mismatch"] = \
+            int(np.count_nonzero(zend.image_gradient(width, height, STOPS) != reference))
+        table = color.image_gradient_expand(strip)
+        frame = np.stack([cv2.applyColorMap(color.image_grayscale(f), table) for f in frames])
+        results[f"color.image_gradient_map.batch/{width}x{height}"]["mismatch"] = \
+            int(np.count_nonzero(color.image_gradient_map(frames, strip) != frame))
+    return report("gradient", results, widths=widths, height=height, batch=batch, repeat=repeat)
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--width", type=int, nargs="+", default=WIDTHS)
+    parser.add_argument("--height", type=int, default=256)
+    parser.add_argument("--batch", type=int, default=8, help="frames for image_gradient_map")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--output", default=None, help="JSON file, stdout if not given")
+    args = parser.parse_args()
+    result = run(load("sup.image.color"), load("sup.image.zend"), args.width, args.height,
+                 args.batch, args.repeat)
+    report_save(result, args.output)
+
+if __name__ == "__main__":
+    main()
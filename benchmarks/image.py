@@ -0,0 +1,119 @@
+"""
+Jovimetrix - Benchmark sup.image primitives
+
+Times the core image helpers over synthetic frames at a few resolutions and
+batch sizes. Each result is the time for the whole batch.
+
+    python -m benchmarks.image --size 512x512 1920x1080 --batch 1 16 --output head.json
+"""
+
+import argparse
+from types import ModuleType
+from typing import Any, Callable, Dict, List, Tuple
+
+import numpy as np
+import torch
+
+from . import load, measure, report, report_save
+
+# ==============================================================================
+
+SIZES = ["256x256", "1280x720", "1920x1080"]
+BATCHES = [1, 8]
+
+def size_parse(size: str) -> Tuple[int, int]:
+    w, h = size.lower().split("x")
+    return int(w), int(h)
+
+def cases(image: ModuleType, adjust: ModuleType, compose: ModuleType,
+          mapping: ModuleType, zend: ModuleType, width: int, height: int,
+          batch: int) -> Dict[str, Callable[[], Any]]:
+    """Name -> callable, each runs the primitive once per frame of the batch."""
+
+    rng = np.random.default_rng(0)
+    bgr = [rng.integers(0, 256, (height, width, 3), dtype=np.uint8) for _ in range(batch)]
+    bgra = [rng.integers(0, 256, (height, width, 4), dtype=np.uint8) for _ in range(batch)]
+    mask = [rng.integers(0, 256, (height, width), dtype=np.uint8) for _ in range(batch)]
+    maskf = [m.astype(np.float64) for m in mask]
+    tensor = torch.rand((batch, height, width, 4), dtype=torch.float32)
+    half = (max(1, width // 2), max(1, height // 2))
+
+    def each(func: Callable, *data: List[Any]) -> Callable[[], None]:
+        return lambda: [func(*frame) for frame in zip(*data)]
+
+    def chain(dtype: np.dtype) -> Callable[[], None]:
+        """Five nodes in a row, each going tensor -> numpy -> tensor per frame."""
+        other = image.image_dtype(bgra[0], dtype)
+        nodes = [
+            lambda i: image.image_convert(i, 4, dtype=dtype),
+            lambda i: compose.image_blend(i, other, dtype=dtype),
+            lambda i: adjust.image_scalefit(i, width, height, adjust.EnumScaleMode.FIT,
+                                            adjust.EnumInterpolation.LINEAR, dtype=dtype),
+            lambda i: image.image_matte(i, (0, 0, 0, 255), dtype=dtype),
+            lambda i: compose.image_blend(i, other, None, compose.EnumBlendType.MULTIPLY, 0.5, dtype=dtype),
+        ]
+        def func() -> None:
+            data = tensor
+            for node in nodes:
+                frames = [image.cv2tensor_full(node(image.tensor2cv(t, dtype=dtype)), dtype=dtype) for t in data]
+                data = torch.stack([f[0] for f in frames])
+        return func
+
+    return {
+        "image.tensor2cv": lambda: [image.tensor2cv(t) for t in tensor],
+        "image.cv2tensor_full": each(image.cv2tensor_full, bgra),
+        "image.image_matte": each(lambda i: image.image_matte(i, (0, 0, 0, 255), width + 64, height + 64), bgra),
+        "image.image_convert.3to4": each(lambda i: image.image_convert(i, 4), bgr),
+        "image.image_convert.4to1": each(lambda i: image.image_convert(i, 1), bgra),
+        "adjust.image_scalefit.fit": each(lambda i: adjust.image_scalefit(i, *half, adjust.EnumScaleMode.FIT,
+                                                                          adjust.EnumInterpolation.LANCZOS4), bgra),
+        "adjust.image_scalefit.matte": each(lambda i: adjust.image_scalefit(i, width + 64, height + 64), bgra),
+        "adjust.image_quantize": each(lambda i: adjust.image_quantize(i, 8, 5), bgr),
+        "adjust.image_pixelate": each(lambda i: adjust.image_pixelate(i, 0.5), bgr),
+        "compose.image_blend.normal": each(lambda a, b: compose.image_blend(a, b), bgra, bgra[::-1]),
+        "compose.image_blend.multiply_mask": each(lambda a, b, m: compose.image_blend(a, b, m, compose.EnumBlendType.MULTIPLY, 0.5),
+                                                  bgra, bgra[::-1], mask),
+        "compose.image_crop": each(lambda i: compose.image_crop(i, *half, (0.25, 0.25)), bgra),
+        "mapping.remap_fisheye": each(lambda i: mapping.remap_fisheye(i, 0.5), bgr),
+        "mapping.remap_sphere": each(lambda i: mapping.remap_sphere(i, 0.5), bgr),
+        "mapping.remap_polar": each(mapping.remap_polar, bgr),
+        "mapping.remap_perspective": each(lambda i: mapping.remap_perspective(i, [[0, 0], [width, height * 0.1],
+                                                                                   [width * 0.9, height], [width * 0.1, height * 0.9]]), bgr),
+        "chain.uint8": chain(np.uint8),
+        "chain.float32": chain(np.float32),
+        "zend.image_stereo_shift": each(lambda i, m: zend.image_stereo_shift(i, m, 20), bgra, mask),
+        "zend.MEDIAN3x3.cv2": each(zend.MEDIAN3x3, mask),
+        "zend.MEDIAN3x3.numba": each(zend.MEDIAN3x3, maskf),
+    }
+
+def run(sizes: List[str]=SIZES, batches: List[int]=BATCHES, repeat: int=5,
+        match: str=None) -> Dict[str, Any]:
+
+    image = load("sup.image")
+    adjust = load("sup.image.adjust")
+    compose = load("sup.image.compose")
+    mapping = load("sup.image.mapping")
+    zend = load("sup.image.zend")
+
+    results = {}
+    for size in sizes:
+        width, height = size_parse(size)
+        for batch in batches:
+            for name, func in cases(image, adjust, compose, mapping, zend, width, height, batch).items():
+                if match is not None and match not in name:
+                    continue
+                results[f"{name}/{width}x{height}/b{batch}"] = measure(func, repeat)
+    return report("image", results, sizes=sizes, batches=batches, repeat=repeat)
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--size", nargs="+", default=SIZES, help="WIDTHxHEIGHT")
+    parser.add_argument("--batch", type=int, nargs="+", default=BATCHES)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--match", default=None, help="only run cases whose name contains this")
+    parser.add_argument("--output", default=None, help="JSON file, stdout if not given")
+    args = parser.parse_args()
+    report_save(run(args.size, args.batch, args.repeat, args.match), args.output)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,72 @@
+"""
+Jovimetrix - Benchmark palette LUTs
+
+Per-frame cost of color_lut_full over a batch that shares one palette. The
+`kdtree` cases clear the cache before every frame and so rebuild the LUT with
+a KDTree query each time, the way it used to run. The `lut` cases compile it
+on the first frame and reuse it after.
+
+    python -m benchmarks.lut --frames 30 --nodes 33 64 256
+"""
+
+import argparse
+from types import ModuleType
+from typing import Any, Dict, List
+
+import numpy as np
+
+from . import load, measure, report, report_save
+
+# ==============================================================================
+
+NODES = [33, 64, 256]
+
+def run(color: ModuleType, frames: int=30, colors: int=12, nodes: List[int]=NODES,
+        repeat: int=3) -> Dict[str, Any]:
+
+    rng = np.random.default_rng(0)
+    palette = [tuple(int(c) for c in rng.integers(0, 256, 3)) for _ in range(colors)]
+
+    def kdtree(count: int) -> None:
+        def func() -> None:
+            for _ in range(frames):
+                color.lut_cache_clear()
+                color.color_lut_full(palette, count)
+        return func
+
+    def lut(count: int) -> None:
+        def func() -> None:
+            color.lut_cache_clear()
+            for _ in range(frames):
+                color.color_lut_full(palette, count)
+        return func
+
+    cases = {}
+    for count in nodes:
+        cases[f"kdtree{count}"] = kdtree(count)
+        cases[f"lut{count}"] = lut(count)
+
+    results = {}
+    try:
+        for name, func in cases.items():
+            timing = measure(func, repeat, 1)
+            timing = {k: round(v / frames, 4) if k != "runs" else v for k, v in timing.items()}
+            results[f"color.{name}/frame"] = timing
+    finally:
+        color.lut_cache_clear()
+
+    return report("lut", results, frames=frames, colors=colors, nodes=nodes, repeat=repeat)
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--frames", type=int, default=30)
+    parser.add_argument("--colors", type=int, default=12, help="palette size")
+    parser.add_argument("--nodes", type=int, nargs="+", default=NODES, help="LUT grid points per axis")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--output", default=None, help="JSON file, stdout if not given")
+    args = parser.parse_args()
+    result = run(load("sup.image.color"), args.frames, args.colors, args.nodes, args.repeat)
+    report_save(result, args.output)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,103 @@
+"""
+Jovimetrix - Benchmark memory of the tensor conversions
+
+Runs each case once in a fresh interpreter and reports the peak numpy
+allocation seen by tracemalloc and how far the peak RSS of the process grew
+during the call. torch does not report to tracemalloc, so its buffers only
+show up in the RSS. The median time of a few further runs is kept as `ms`
+so the report works with benchmarks.compare.
+
+    python -m benchmarks.memory --size 1920x1080 --batch 8 --output mem.json
+"""
+
+import sys
+import json
+import argparse
+import subprocess
+from types import ModuleType
+from typing import Any, Callable, Dict, List
+
+import numpy as np
+import torch
+
+from . import PACK, report, report_save
+from .image import size_parse
+
+# ==============================================================================
+
+SIZES = ["1280x720", "1920x1080"]
+BATCHES = [8]
+
+CHILD = """
+import sys, json, time, resource, tracemalloc
+from benchmarks import load, measure
+from benchmarks.memory import cases
+func = cases(load("sup.image"), int(sys.argv[2]), int(sys.argv[3]), int(sys.argv[4]))[sys.argv[1]]
+rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+tracemalloc.start()
+func()
+_, traced = tracemalloc.get_traced_memory()
+tracemalloc.stop()
+rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss - rss
+timing = measure(func, 3, 0)
+# ru_maxrss is in KiB on linux
+print(json.dumps(dict(timing, traced_mb=round(traced / 2**20, 2), rss_mb=round(rss / 1024, 2))))
+"""
+
+def cases(image: ModuleType, width: int, height: int,
+          batch: int) -> Dict[str, Callable[[], Any]]:
+    """Name -> callable, each converts the whole batch the way a node would."""
+
+    rng = np.random.default_rng(0)
+    bgr = [rng.integers(0, 256, (height, width, 3), dtype=np.uint8) for _ in range(batch)]
+    bgra = [rng.integers(0, 256, (height, width, 4), dtype=np.uint8) for _ in range(batch)]
+
+    def stack(frames: List[np.ndarray]) -> Callable[[], Any]:
+        return lambda: [torch.stack(i) for i in zip(*[image.cv2tensor_full(f) for f in frames])]
+
+    def fill(frames: List[np.ndarray]) -> Callable[[], Any]:
+        def func() -> Any:
+            out = image.cv2tensor_full_alloc(len(frames), width, height)
+            for idx, frame in enumerate(frames):
+                image.cv2tensor_full(frame, out=[o[idx] for o in out])
+            return out
+        return func
+
+    return {
+        "cv2tensor_full.stack.bgr": stack(bgr),
+        "cv2tensor_full.stack.bgra": stack(bgra),
+        "cv2tensor_full.alloc.bgr": fill(bgr),
+        "cv2tensor_full.alloc.bgra": fill(bgra),
+        "cv2tensor_full_batch.bgra": lambda: image.cv2tensor_full_batch(np.stack(bgra)),
+    }
+
+def child(name: str, width: int, height: int, batch: int) -> Dict[str, float]:
+    result = subprocess.run([sys.executable, "-c", CHILD, name, str(width), str(height), str(batch)],
+                            cwd=str(PACK), capture_output=True, text=True)
+    if result.returncode != 0:
+        raise RuntimeError(result.stderr[-2000:])
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+def run(sizes: List[str]=SIZES, batches: List[int]=BATCHES, match: str=None) -> Dict[str, Any]:
+    results = {}
+    for size in sizes:
+        width, height = size_parse(size)
+        for batch in batches:
+            # names only, the frames are built again in each child
+            for name in cases(None, 1, 1, 1):
+                if match is not None and match not in name:
+                    continue
+                results[f"{name}/{width}x{height}/b{batch}"] = child(name, width, height, batch)
+    return report("memory", results, sizes=sizes, batches=batches)
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--size", nargs="+", default=SIZES, help="WIDTHxHEIGHT")
+    parser.add_argument("--batch", type=int, nargs="+", default=BATCHES)
+    parser.add_argument("--match", default=None, help="only run cases whose name contains this")
+    parser.add_argument("--output", default=None, help="JSON file, stdout if not given")
+    args = parser.parse_args()
+    report_save(run(args.size, args.batch, args.match), args.output)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+"""
+Jovimetrix - Benchmark batched compose nodes
+
+Runs ADJUST, THRESHOLD and PIXEL SWAP over a whole batch with constant
+settings, which takes the batched path, against the same frames sent one
+at a time and stacked, which takes the per frame loop. Each batch case also
+counts the output values that differ from the per frame run as `mismatch`.
+
+    python -m benchmarks.nodes --size 512x512 --batch 8 --channels 3 4
+"""
+
+import argparse
+from types import ModuleType
+from typing import Any, Callable, Dict, List, Tuple
+
+import torch
+
+from . import bootstrap, load, measure, report, report_save
+from .image import size_parse
+
+# ==============================================================================
+
+CHANNELS = [1, 3, 4]
+
+def cases(compose: ModuleType, Lexicon: type, frames: torch.Tensor,
+          swap: torch.Tensor) -> Dict[str, Tuple[type, Dict[str, Any]]]:
+    """Name -> node class and its inputs."""
+    ret = {}
+    for op in ["INVERT", "LEVELS", "POSTERIZE", "HSV"]:
+        ret[f"adjust.{op.lower()}"] = (compose.AdjustNode, {
+            Lexicon.PIXEL: frames, Lexicon.FUNC: op, Lexicon.CONTRAST: 0,
+            Lexicon.VALUE: 0.7 if op == "INVERT" else 4})
+    for op in ["BINARY", "TRUNC"]:
+        ret[f"threshold.{op.lower()}"] = (compose.ThresholdNode, {
+            Lexicon.PIXEL: frames, Lexicon.FUNC: op, Lexicon.INVERT: True})
+    ret["swap"] = (compose.PixelSwapNode, {
+        Lexicon.PIXEL_A: frames, Lexicon.PIXEL_B: swap,
+        Lexicon.SWAP_R: "BLUE_B", Lexicon.SWAP_A: "CONSTANT"})
+    return ret
+
+def run(size: str="512x512", batch: int=8, channels: List[int]=CHANNELS,
+        repeat: int=3) -> Dict[str, Any]:
+
+    Lexicon = bootstrap().Lexicon
+    compose = load("core.compose")
+    width, height = size_parse(size)
+    torch.manual_seed(0)
+    swap = torch.rand((batch, height, width, 4))
+
+    results = {}
+    for cc in channels:
+        shape = (batch, height, width) + ((cc,) if cc > 1 else ())
+        frames = torch.rand(shape)
+        for name, (node, kw) in cases(compose, Lexicon, frames, swap).items():
+            def single(node=node, kw=kw) -> List[torch.Tensor]:
+                # one frame per call never counts as constant, so this is the per frame loop
+                out = []
+                for idx in range(batch):
+                    one = {k: v[idx:idx+1] if isinstance(v, torch.Tensor) else v for k, v in kw.items()}
+                    out.append(node().run(**one))
+                return [torch.cat(i) for i in zip(*out)]
+
+            whole: Callable[[], Any] = lambda node=node, kw=kw: node().run(**kw)
+            key = f"{name}.c{cc}/{size}x{batch}"
+            results[f"{key}.single"] = measure(single, repeat)
+            results[f"{key}.batch"] = timing = measure(whole, repeat)
+            timing["mismatch"] = int(sum(torch.count_nonzero(a != b).item()
+                                         for a, b in zip(single(), whole())))
+
+    return report("nodes", results, size=size, batch=batch, channels=channels, repeat=repeat)
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--size", default="512x512", help="WxH of each frame")
+    parser.add_argument("--batch", type=int, default=8, help="frames in the batch")
+    parser.add_argument("--channels", type=int, nargs="+", default=CHANNELS)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--output", default=None, help="JSON file, stdout if not given")
+    args = parser.parse_args()
+    report_save(run(args.size, args.batch, args.channels, args.repeat), args.output)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,113 @@
+"""
+Jovimetrix - Benchmark normal map derivations
+
+Times curvature_from_normal, height_from_normal and the roughness helpers on
+a smooth synthetic normal map. Every case also runs the float64 code it
+replaced (the row loop, the full complex FFT, np.dot and a CV_64F
+Laplacian) and reports the largest difference to it as `error`: uint8
+steps for curvature and roughness, 0..1 for height.
+
+    python -m benchmarks.normals --size 1024 2048 --blur 2 5
+"""
+
+import argparse
+from types import ModuleType
+from typing import Any, Dict, List
+
+import cv2
+import numpy as np
+
+from . import load, measure, report, report_save
+
+# ==============================================================================
+
+SIZES = [1024, 2048]
+BLURS = [2, 5]
+
+def normal_map(size: int, rng: np.random.Generator) -> np.ndarray:
+    field = rng.random((size // 32 + 2, size // 32 + 2, 3)).astype(np.float32)
+    field = cv2.resize(field, (size, size), interpolation=cv2.INTER_CUBIC)
+    return np.clip(field + rng.normal(0, .02, field.shape).astype(np.float32), 0, 1)
+
+def depth_reference(grad_x: np.ndarray, grad_y: np.ndarray) -> np.ndarray:
+    rows, cols = grad_x.shape
+    u_grid, v_grid = np.meshgrid(np.fft.fftfreq(cols), np.fft.fftfreq(rows))
+    denominator = u_grid**2 + v_grid**2
+    denominator[0, 0] = 1.0
+    Z_F = (-1j * u_grid * np.fft.fft2(grad_x) - 1j * v_grid * np.fft.fft2(grad_y)) / denominator
+    Z_F[0, 0] = 0.0
+    Z = np.fft.ifft2(Z_F).real
+    Z -= np.min(Z)
+    return Z / np.max(Z)
+
+def curvature_reference(image: np.ndarray, blur_radius: int) -> np.ndarray:
+    image = image.astype(np.float64)
+    blur_factor = 1 / 2 ** min(8, max(2, blur_radius))
+
+    def conv(rows: np.ndarray, kernel: np.ndarray) -> np.ndarray:
+        pad = len(kernel) // 2
+        rows = np.pad(rows, ((0, 0), (pad, pad)), mode="wrap")
+        return np.array([np.convolve(row, kernel, mode="valid") for row in rows])
+
+    diff = np.array([-1, 0, 1])
+    edges = conv(image[..., 0], diff) + conv(-image[..., 1].T, diff).T
+    size = int(np.mean(edges.shape) * blur_factor)
+    if size >= 2:
+        size += size % 2 == 0
+        x = np.linspace(-(size - 1) / 2, (size - 1) / 2, size)
+        kernel = np.exp(-0.5 * np.square(x) / np.square(max(1, size // 8)))
+        kernel /= np.sum(kernel)
+        edges = conv(conv(edges, kernel).T, kernel).T
+    edges = (edges - np.min(edges)) / (np.ptp(edges) + 1e-10)
+    return ((edges - edges.min()) / (edges.max() - edges.min()) * 255).astype(np.uint8)
+
+def roughness_reference(image: np.ndarray, grayscale: Any) -> np.ndarray:
+    image = 1 - np.dot(image, np.array([0, 0, 1]))
+    image = (image - image.min()) / (image.max() - image.min())
+    return grayscale((255 * image).astype(np.uint8))
+
+def albedo_reference(image: np.ndarray, grayscale: Any) -> np.ndarray:
+    image = cv2.Laplacian(image, cv2.CV_64F, ksize=3)
+    image = (image - image.min()) / (image.max() - image.min())
+    return grayscale((255 * image).astype(np.uint8))
+
+def run(mapping: ModuleType, sizes: List[int]=SIZES, blurs: List[int]=BLURS,
+        reference: bool=True, repeat: int=3) -> Dict[str, Any]:
+
+    rng = np.random.default_rng(0)
+    results = {}
+    for size in sizes:
+        image = normal_map(size, rng)
+        albedo = (image * 255).astype(np.uint8)
+        cases = {f"curvature_from_normal.b{blur}": (
+                    lambda blur=blur: mapping.curvature_from_normal(image, blur),
+                    lambda blur=blur: curvature_reference(image, blur)) for blur in blurs}
+        cases["height_from_normal"] = (
+            lambda: mapping.height_from_normal(image)[..., 0],
+            lambda: depth_reference(-(image[..., 0] - .5) * 2., (image[..., 1] - .5) * 2.))
+        cases["roughness_from_normal"] = (lambda: mapping.roughness_from_normal(image),
+                                          lambda: roughness_reference(image, mapping.image_grayscale))
+        cases["roughness_from_albedo"] = (lambda: mapping.roughness_from_albedo(albedo),
+                                          lambda: albedo_reference(albedo, mapping.image_grayscale))
+
+        for name, (func, old) in cases.items():
+            results[f"mapping.{name}/{size}x{size}"] = timing = measure(func, repeat)
+            if reference and old is not None:
+                results[f"reference.{name}/{size}x{size}"] = measure(old, 1, 0)
+                timing["error"] = float(np.max(np.abs(func().astype(np.float64) - old())))
+
+    return report("normals", results, sizes=sizes, blurs=blurs, repeat=repeat)
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--size", type=int, nargs="+", default=SIZES, help="square map edge")
+    parser.add_argument("--blur", type=int, nargs="+", default=BLURS, help="curvature blur radius")
+    parser.add_argument("--skip-reference", action="store_true", help="do not run the old float64 paths")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--output", default=None, help="JSON file, stdout if not given")
+    args = parser.parse_args()
+    result = run(load("sup.image.mapping"), args.size, args.blur, not args.skip_reference, args.repeat)
+    report_save(result, args.output)
+
+if __name__ == "__main__":
+    main()
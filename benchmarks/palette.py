@@ -0,0 +1,116 @@
+"""
+Jovimetrix - Benchmark palette extraction
+
+Times color_top_used over a synthetic photo-like frame (smooth color fields
+plus grain) at a few sample counts and palette sizes. Each case also checks
+the palette is stable:
+
+- `repeat` is 1 when two calls return the same palette;
+- `inertia` is the mean squared distance from a pixel to its palette color;
+- `spread` is how far that moves across three seeds, in percent;
+- `share` is the largest difference between the share color_palette gives
+  each color and the share of sampled pixels nearest to it. It also checks
+  the palette is sorted, -1 when it is not.
+
+The color_image2lut cases cluster every pixel with the CPU K-means backend.
+They report the same `inertia`, and as `mismatch` the pixels the compiled
+assignment step puts on a different centroid than a numpy argmin does.
+
+--sklearn adds the KMeans(n_init=10) over every pixel that color_top_used
+used to run. It takes minutes at 4K.
+
+    python -m benchmarks.palette --size 1920x1080 3840x2160 --colors 8 32
+"""
+
+import argparse
+from types import ModuleType
+from typing import Any, Dict, List
+
+import cv2
+import numpy as np
+from scipy.spatial import KDTree
+
+from . import load, measure, report, report_save
+from .image import size_parse
+
+# ==============================================================================
+
+SIZES = ["1920x1080", "3840x2160"]
+COLORS = [8, 32]
+SAMPLES = [16384, 65536, 262144]
+
+def scene(width: int, height: int, rng: np.random.Generator) -> np.ndarray:
+    field = cv2.resize(rng.integers(0, 256, (9, 16, 3), dtype=np.uint8), (width, height),
+                       interpolation=cv2.INTER_CUBIC)
+    grain = rng.integers(-12, 13, field.shape)
+    return np.clip(field.astype(np.int32) + grain, 0, 255).astype(np.uint8)
+
+def inertia(image: np.ndarray, palette: Any) -> float:
+    # every 7th pixel is plenty for the average
+    dist, _ = KDTree(np.asarray(palette, dtype=np.float64)).query(image.reshape(-1, 3)[::7].astype(np.float64))
+    return float(np.mean(dist ** 2))
+
+def share_error(image: np.ndarray, colors: np.ndarray, share: np.ndarray, sample: int) -> float:
+    if np.any(np.diff(share) > 0):
+        return -1.
+    pixels = image.reshape(-1, 3)
+    if 0 < sample < pixels.shape[0]:
+        # the same seeded draw color_palette makes
+        pixels = pixels[np.random.default_rng(0).integers(0, pixels.shape[0], size=sample)]
+    _, index = KDTree(colors.astype(np.float64)).query(pixels.astype(np.float64))
+    nearest = np.bincount(index, minlength=len(colors)) / len(pixels)
+    return float(np.max(np.abs(nearest - share)))
+
+def run(color: ModuleType, sizes: List[str]=SIZES, colors: List[int]=COLORS,
+        samples: List[int]=SAMPLES, sklearn: bool=False, repeat: int=3) -> Dict[str, Any]:
+
+    rng = np.random.default_rng(0)
+    results = {}
+    for size in sizes:
+        width, height = size_parse(size)
+        image = scene(width, height, rng)
+        for count in colors:
+            for sample in samples:
+                palette = color.color_top_used(image, count, sample)
+                timing = measure(lambda: color.color_top_used(image, count, sample), repeat, 0)
+                seeds = [inertia(image, color.color_palette(image, count, sample, seed)[0]) for seed in range(3)]
+                timing.update(repeat=int(palette == color.color_top_used(image, count, sample)),
+                              inertia=round(inertia(image, palette), 2),
+                              spread=round(100. * (max(seeds) - min(seeds)) / min(seeds), 2),
+                              share=round(share_error(image, *color.color_palette(image, count, sample), sample), 6))
+                results[f"color.color_top_used.s{sample}.k{count}/{width}x{height}"] = timing
+
+            pixels = image.reshape(-1, 3).astype(np.float32)
+            lut = lambda: color.color_image2lut(image, count, color.EnumClusterBackend.CPU)
+            timing = measure(lut, repeat, 1)
+            centroids = lut()[:count, 0].astype(np.float32)
+            assignments = np.zeros(pixels.shape[0], dtype=np.int32)
+            color.kmeans_assign_cpu(pixels, centroids, assignments)
+            reference = np.argmin(((pixels[:, None, :] - centroids[None]) ** 2).sum(axis=-1), axis=-1)
+            timing.update(inertia=round(inertia(image, centroids), 2),
+                          mismatch=int(np.count_nonzero(assignments != reference)))
+            results[f"color.color_image2lut.k{count}/{width}x{height}"] = timing
+
+            if sklearn:
+                from sklearn.cluster import KMeans
+                fit = lambda: KMeans(n_clusters=count, n_init=10).fit(image.reshape(-1, 3))
+                timing = measure(fit, 1, 0)
+                timing["inertia"] = round(inertia(image, fit().cluster_centers_), 2)
+                results[f"sklearn.KMeans.k{count}/{width}x{height}"] = timing
+
+    return report("palette", results, sizes=sizes, colors=colors, samples=samples, repeat=repeat)
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--size", nargs="+", default=SIZES, help="WIDTHxHEIGHT")
+    parser.add_argument("--colors", type=int, nargs="+", default=COLORS)
+    parser.add_argument("--samples", type=int, nargs="+", default=SAMPLES, help="0 clusters every pixel")
+    parser.add_argument("--sklearn", action="store_true", help="also time the old sklearn KMeans")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--output", default=None, help="JSON file, stdout if not given")
+    args = parser.parse_args()
+    result = run(load("sup.image.color"), args.size, args.colors, args.samples, args.sklearn, args.repeat)
+    report_save(result, args.output)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,109 @@
+"""
+Jovimetrix - Benchmark parse_param
+
+Times parse_param over the inputs a node sees on every execution: plain
+widget numbers, vectors, strings, enums and image batches. `ms` is the time
+for a block of calls, `calls_s` the calls per second that works out to.
+`mismatch` is 1 when the result differs from sending every value through
+parse_value, which is what parse_param did before it cached a converter.
+
+    python -m benchmarks.params --calls 10000 --output params.json
+"""
+
+import argparse
+import math
+from types import ModuleType
+from typing import Any, Callable, Dict
+
+import torch
+
+from . import load, measure, report, report_save
+
+# ==============================================================================
+
+CALLS = 10000
+
+def cases(util: ModuleType, batch: int=16) -> Dict[str, Callable[[], Any]]:
+    """Name -> callable doing one parse_param the way a node would."""
+
+    EnumConvertType = util.EnumConvertType
+    image = torch.rand((batch, 512, 512, 4))
+    mask = torch.rand((batch, 512, 512))
+    data = {
+        "int": 512,
+        "float": 0.5,
+        "bool": True,
+        "vec2": (512, 512),
+        "vec4": [0.5, 0.25, 0.125, 1.],
+        "string": "a string widget",
+        "number": "12.5",
+        "enum": "NORMAL",
+        "image": image,
+        "mask": mask,
+    }
+
+    def call(key: str, typ: Any, default: Any, *arg: Any) -> Callable[[], Any]:
+        return lambda: util.parse_param(data, key, typ, default, *arg)
+
+    return {
+        "int": call("int", EnumConvertType.INT, 512, 1, 8192),
+        "float": call("float", EnumConvertType.FLOAT, 1, 0, 1),
+        "bool": call("bool", EnumConvertType.BOOLEAN, False),
+        "vec2int": call("vec2", EnumConvertType.VEC2INT, [(512, 512)], 1),
+        "vec4": call("vec4", EnumConvertType.VEC4, [(0, 0, 0, 1)], 0, 1),
+        "vec3.pad": call("vec2", EnumConvertType.VEC3INT, [(1, 2, 3)], 0, 255),
+        "float.clip": call("int", EnumConvertType.FLOAT, 1, 0, 1),
+        "int.string": call("number", EnumConvertType.INT, 0),
+        "string": call("string", EnumConvertType.STRING, ""),
+        "enum": call("enum", EnumConvertType.STRING, "NORMAL"),
+        "image": call("image", EnumConvertType.IMAGE, None),
+        "mask": call("mask", EnumConvertType.MASK, None),
+        "missing": call("none", EnumConvertType.VEC3, [(0, 0, 0)]),
+    }
+
+def same(a: Any, b: Any) -> bool:
+    if isinstance(a, torch.Tensor) or isinstance(b, torch.Tensor):
+        return type(a) is type(b) and a.shape == b.shape and bool(torch.equal(a, b))
+    if isinstance(a, (list, tuple)):
+        return type(a) is type(b) and len(a) == len(b) and all(same(x, y) for x, y in zip(a, b))
+    if isinstance(a, dict):
+        return type(a) is type(b) and a.keys() == b.keys() and all(same(a[k], b[k]) for k in a)
+    if isinstance(a, float) and isinstance(b, float) and math.isnan(a) and math.isnan(b):
+        return True
+    return type(a) is type(b) and a == b
+
+def reference(util: ModuleType, func: Callable[[], Any]) -> Any:
+    """func() with every value converted by parse_value."""
+    cached = util.parse_converter
+    util.parse_converter = lambda typ, default, clip_min=None, clip_max=None, zero=0: \
+        lambda val: util.parse_value(val, typ, default, clip_min, clip_max, zero)
+    try:
+        return func()
+    finally:
+        util.parse_converter = cached
+
+def run(calls: int=CALLS, match: str=None) -> Dict[str, Any]:
+    util = load("sup.util")
+    results = {}
+    for name, func in cases(util).items():
+        if match is not None and match not in name:
+            continue
+        def block() -> None:
+            for _ in range(calls):
+                func()
+        timing = measure(block, 5, 1)
+        timing["calls_s"] = round(1000. * calls / timing["ms"])
+        timing["mismatch"] = int(not same(func(), reference(util, func)))
+        results[f"parse_param.{name}"] = timing
+    return report("params", results, calls=calls)
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--calls", type=int, default=CALLS, help="calls timed as one block")
+    parser.add_argument("--match", default=None, help="only run cases whose name contains this")
+    parser.add_argument("--output", default=None, help="JSON file, stdout if not given")
+    args = parser.parse_args()
+    report_save(run(args.calls, args.match), args.output)
+
+if __name__ == "__main__":
+    main()
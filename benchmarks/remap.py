@@ -0,0 +1,64 @@
+"""
+Jovimetrix - Benchmark projection remaps
+
+Per-frame cost of remap_fisheye, remap_sphere and remap_polar over a batch
+with the remap table cache on and off.
+
+    python -m benchmarks.remap --frames 60 --width 1920 --height 1080
+"""
+
+import argparse
+from types import ModuleType
+from typing import Any, Dict
+
+import numpy as np
+
+from . import load, measure, report, report_save
+
+# ==============================================================================
+
+def run(mapping: ModuleType, frames: int=30, width: int=1280, height: int=720,
+        strength: float=1., repeat: int=3) -> Dict[str, Any]:
+
+    rng = np.random.default_rng(0)
+    batch = [rng.integers(0, 256, (height, width, 3), dtype=np.uint8) for _ in range(frames)]
+    remaps = {
+        "fisheye": lambda img: mapping.remap_fisheye(img, strength),
+        "sphere": lambda img: mapping.remap_sphere(img, strength),
+        "polar": lambda img: mapping.remap_polar(img)
+    }
+
+    cap = mapping.JOV_REMAP_CACHE
+    results = {}
+    try:
+        for name, func in remaps.items():
+            for label, size in (("uncached", 0), ("cached", max(1, cap))):
+                mapping.JOV_REMAP_CACHE = size
+                def frame() -> None:
+                    # a fresh cache each batch, the first frame pays for the tables
+                    mapping.remap_cache_clear()
+                    for img in batch:
+                        func(img)
+                timing = measure(frame, repeat, 0)
+                timing = {k: round(v / frames, 4) if k != "runs" else v for k, v in timing.items()}
+                results[f"mapping.remap_{name}.{label}/{width}x{height}/frame"] = timing
+    finally:
+        mapping.JOV_REMAP_CACHE = cap
+        mapping.remap_cache_clear()
+
+    return report("remap", results, frames=frames, strength=strength, repeat=repeat)
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--frames", type=int, default=30)
+    parser.add_argument("--width", type=int, default=1280)
+    parser.add_argument("--height", type=int, default=720)
+    parser.add_argument("--strength", type=float, default=1.)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--output", default=None, help="JSON file, stdout if not given")
+    args = parser.parse_args()
+    result = run(load("sup.image.mapping"), args.frames, args.width, args.height, args.strength, args.repeat)
+    report_save(result, args.output)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+"""
+Jovimetrix - Benchmark startup
+
+Imports the pack in a fresh interpreter under `python -X importtime`, once
+importing every node module and once deferred from the node manifest
+(JOV_LAZY). ComfyUI and torch are imported first, as ComfyUI would have
+them loaded already, so only the cost of the pack itself is counted.
+
+    python -m benchmarks.startup --repeat 3 --output startup.json
+"""
+
+import os
+import sys
+import argparse
+import statistics
+import subprocess
+from typing import Any, Dict, List, Tuple
+
+from . import PACK, report, report_save
+
+# ==============================================================================
+
+MARK = "--- jovimetrix ---"
+
+CHILD = f"""
+import sys, time
+import torch, aiohttp, numpy
+from benchmarks import host_comfy, bootstrap
+host_comfy()
+sys.stderr.write("{MARK}\\n")
+start = time.perf_counter()
+bootstrap()
+print(1000. * (time.perf_counter() - start))
+"""
+
+def importtime(stderr: str) -> List[Tuple[int, int, str]]:
+    """(cumulative us, self us, module) rows of a -X importtime log made
+    after the pack started to import."""
+    rows = []
+    lines = stderr.splitlines()
+    if MARK in lines:
+        lines = lines[lines.index(MARK) + 1:]
+    for line in lines:
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        _, data = line.split(":", 1)
+        us_self, us_total, name = data.split("|")
+        rows.append((int(us_total), int(us_self), name.rstrip()))
+    return rows
+
+def child(lazy: bool) -> Tuple[float, List[Tuple[int, int, str]]]:
+    env = os.environ.copy()
+    env["JOV_LAZY"] = "true" if lazy else "false"
+    result = subprocess.run([sys.executable, "-X", "importtime", "-c", CHILD],
+                            cwd=str(PACK), env=env, capture_output=True, text=True)
+    if result.returncode != 0:
+        raise RuntimeError(result.stderr[-2000:])
+    elapsed = float(result.stdout.strip().splitlines()[-1])
+    return elapsed, importtime(result.stderr)
+
+def run(repeat: int=3, top: int=25) -> Dict[str, Any]:
+    results = {}
+    tree = {}
+    # a first lazy pass writes the manifest if there is none or it is stale
+    child(True)
+    for label, lazy in (("eager", False), ("lazy", True)):
+        runs = []
+        for _ in range(max(1, repeat)):
+            elapsed, rows = child(lazy)
+            runs.append(elapsed)
+        results[f"startup.{label}"] = {
+            "ms": round(statistics.median(runs), 3),
+            "min": round(min(runs), 3),
+            "max": round(max(runs), 3),
+            "runs": len(runs)
+        }
+        # heaviest imports of the last run, indented as importtime shows them
+        tree[label] = [f"{total // 1000:>6} ms  {name}" for total, _, name in
+                       sorted(rows, key=lambda r: r[0], reverse=True)[:top]]
+    return report("startup", results, repeat=repeat, importtime=tree)
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--top", type=int, default=25, help="heaviest imports to list")
+    parser.add_argument("--output", default=None, help="JSON file, stdout if not given")
+    args = parser.parse_args()
+    report_save(run(args.repeat, args.top), args.output)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,132 @@
+"""
+Jovimetrix - Benchmark stereo helpers
+
+Times the compiled stereo helpers against the python loops they replaced,
+on a smooth synthetic depth map: image_stereogram, image_stereo_shift and
+MEDIAN3x3, for a uint8 map (cv2) and a float64 one (numba). The stereo
+shift also runs with a half size depth map, which it resizes first. Each
+case counts the values that differ from the old loop as `mismatch`. The
+old loops visit every pixel in python, so keep the sizes small.
+
+    python -m benchmarks.stereo --size 256x256 512x512 --shift 1 4
+"""
+
+import argparse
+from types import ModuleType
+from typing import Any, Dict, List
+
+import cv2
+import numpy as np
+from PIL import Image, ImageChops
+from scipy import ndimage
+
+from . import load, measure, report, report_save
+from .image import size_parse
+
+# ==============================================================================
+
+SIZES = ["256x256", "512x512"]
+SHIFTS = [1., 4.]
+
+def depth_map(width: int, height: int, rng: np.random.Generator) -> np.ndarray:
+    field = rng.integers(0, 256, (height // 32 + 2, width // 32 + 2), dtype=np.uint8)
+    return cv2.resize(field, (width, height), interpolation=cv2.INTER_CUBIC)
+
+def stereogram_reference(image: np.ndarray, depth: np.ndarray, noise: np.ndarray,
+                         divisions: int, mix: float, shift: float) -> np.ndarray:
+    height, width = depth.shape[:2]
+    out = np.zeros((height, width, 3), dtype=np.uint8)
+    image = cv2.addWeighted(cv2.resize(image, (width, height)), 1. - mix, noise, mix, 0)
+    pattern_width = width // divisions
+    for y in range(height):
+        for x in range(width):
+            if x < pattern_width:
+                out[y, x] = image[y, x]
+            else:
+                offset = depth[y, x] // divisions
+                # the old loop raised past the right end, wrap like the kernel does
+                pos = (x - pattern_width + int(shift * offset)) % width
+                out[y, x] = out[y, pos]
+    return out
+
+def stereo_shift_reference(image: np.ndarray, depth: np.ndarray, shift: float) -> np.ndarray:
+    deltas = np.array((depth / 255.0) * float(shift), dtype=int)
+    shifted = np.zeros(image.shape, dtype=np.uint8)
+    width = image.shape[1]
+    for y, row in enumerate(deltas):
+        for x, dx in enumerate(row):
+            x2 = x + dx
+            if (x2 >= width) or (x2 < 0):
+                continue
+            shifted[y][x2] = image[y][x]
+    # the alpha fill is shared with the kernel version
+    shifted = Image.fromarray(cv2.cvtColor(shifted, cv2.COLOR_BGRA2RGBA))
+    holes = Image.fromarray(ndimage.binary_fill_holes(ImageChops.invert(shifted.getchannel("A")))).convert("1")
+    shifted.putalpha(ImageChops.invert(holes))
+    return cv2.cvtColor(np.array(shifted), cv2.COLOR_RGBA2BGRA)
+
+def median_reference(image: np.ndarray) -> np.ndarray:
+    height, width = image.shape[:2]
+    out = np.zeros([height, width])
+    for i in range(1, height-1):
+        for j in range(1, width-1):
+            out[i, j] = sorted(image[i-1:i+2, j-1:j+2].ravel().tolist())[4]
+    return out
+
+def run(mapping: ModuleType, zend: ModuleType, sizes: List[str]=SIZES, shifts: List[float]=SHIFTS,
+        divisions: int=8, repeat: int=3) -> Dict[str, Any]:
+
+    rng = np.random.default_rng(0)
+    results = {}
+    for size in sizes:
+        width, height = size_parse(size)
+        image = rng.integers(0, 256, (height, width, 3), dtype=np.uint8)
+        depth = depth_map(width, height, rng)
+        noise = mapping.image_stereogram_noise(width, height)
+        for shift in shifts:
+            key = f"mapping.image_stereogram.s{shift:g}/{width}x{height}"
+            func = lambda: mapping.image_stereogram(image, depth, divisions, shift=shift, noise=noise)
+            old = lambda: stereogram_reference(image, depth, noise, divisions, 0.33, shift)
+            results[key] = timing = measure(func, repeat)
+            results[f"reference.{key[8:]}"] = measure(old, 1, 0)
+            timing["mismatch"] = int(np.count_nonzero(func() != old()))
+
+        bgra = rng.integers(0, 256, (height, width, 4), dtype=np.uint8)
+        for shift in shifts:
+            # the shift is in pixels for a full depth, the stereogram scale is far too small
+            shift *= 10
+            key = f"zend.image_stereo_shift.s{shift:g}/{width}x{height}"
+            func = lambda: zend.image_stereo_shift(bgra, depth, shift)
+            old = lambda: stereo_shift_reference(bgra, depth, shift)
+            results[key] = timing = measure(func, repeat)
+            results[f"reference.{key[5:]}"] = measure(old, 1, 0)
+            timing["mismatch"] = int(np.count_nonzero(func() != old()))
+
+        # a depth map of another size is resized to the image first
+        half = cv2.resize(depth, (width // 2, height // 2))
+        key = f"zend.image_stereo_shift.half/{width}x{height}"
+        results[key] = timing = measure(lambda: zend.image_stereo_shift(bgra, half, 20), repeat)
+        timing["mismatch"] = int(np.count_nonzero(zend.image_stereo_shift(bgra, half, 20) !=
+                                                  stereo_shift_reference(bgra, cv2.resize(half, (width, height)), 20)))
+
+        for name, data in [("cv2", depth), ("numba", depth.astype(np.float64))]:
+            key = f"zend.MEDIAN3x3.{name}/{width}x{height}"
+            results[key] = timing = measure(lambda: zend.MEDIAN3x3(data), repeat)
+            timing["mismatch"] = int(np.count_nonzero(zend.MEDIAN3x3(data) != median_reference(data)))
+        results[f"reference.MEDIAN3x3/{width}x{height}"] = measure(lambda: median_reference(depth), 1, 0)
+
+    return report("stereo", results, sizes=sizes, shifts=shifts, divisions=divisions, repeat=repeat)
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--size", nargs="+", default=SIZES, help="WIDTHxHEIGHT")
+    parser.add_argument("--shift", type=float, nargs="+", default=SHIFTS, help="stereogram depth scale")
+    parser.add_argument("--divisions", type=int, default=8, help="stereogram tiles across")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--output", default=None, help="JSON file, stdout if not given")
+    args = parser.parse_args()
+    result = run(load("sup.image.mapping"), load("sup.image.zend"), args.size, args.shift, args.divisions, args.repeat)
+    report_save(result, args.output)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,127 @@
+"""
+Jovimetrix - Benchmark MJPEG StreamingServer
+
+Opens N loopback HTTP clients against one endpoint and reports process CPU
+use, how many JPEG encodes the server did and the fps each client received.
+
+    python -m benchmarks.stream --clients 1 4 8 --seconds 10 --fps 30
+"""
+
+import json
+import time
+import socket
+import argparse
+import threading
+import urllib.request
+from types import ModuleType
+from typing import Any, Dict, List
+
+import numpy as np
+
+from . import load
+
+# ==============================================================================
+
+def free_port() -> int:
+    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+def client(url: str, stop: threading.Event, frames: List[int], idx: int) -> None:
+    """Read multipart JPEG parts until told to stop, counting whole frames."""
+    with urllib.request.urlopen(url, timeout=5) as response:
+        while not stop.is_set():
+            line = response.readline()
+            if not line:
+                break
+            if line.strip() != b'--frame':
+                continue
+            length = 0
+            while (header := response.readline().strip()):
+                key, _, value = header.partition(b':')
+                if key.lower() == b'content-length':
+                    length = int(value)
+            response.read(length)
+            frames[idx] += 1
+
+def measure(url: str, broadcast: Any, clients: int, seconds: float) -> Dict[str, Any]:
+    stop = threading.Event()
+    frames = [0] * clients
+    threads = [threading.Thread(target=client, args=(url, stop, frames, i), daemon=True)
+               for i in range(clients)]
+    for t in threads:
+        t.start()
+
+    # let everyone connect before measuring
+    time.sleep(1.)
+    start_frames = frames.copy()
+    start_seq = getattr(broadcast, "seq", None)
+    cpu = time.process_time()
+    wall = time.perf_counter()
+    time.sleep(seconds)
+    cpu = time.process_time() - cpu
+    wall = time.perf_counter() - wall
+    received = [b - a for a, b in zip(start_frames, frames)]
+    encodes = None if start_seq is None else broadcast.seq - start_seq
+    stop.set()
+    for t in threads:
+        t.join(timeout=2)
+
+    return {
+        "clients": clients,
+        "seconds": round(wall, 3),
+        "cpu_percent": round(100. * cpu / wall, 1),
+        "encodes": encodes,
+        "encode_fps": None if encodes is None else round(encodes / wall, 2),
+        "client_fps": [round(r / wall, 2) for r in received],
+    }
+
+def run(stream: ModuleType, clients: List[int]=[1, 4, 8], seconds: float=5., fps: float=30.,
+        width: int=1280, height: int=720) -> Dict[str, Any]:
+    """Stream synthetic frames at fps and measure each client count in turn.
+
+    StreamingServer is a singleton so every pass shares the one server.
+    """
+    port = free_port()
+    server = stream.StreamingServer(host="127.0.0.1", port=port)
+    source = stream.MediaStreamStatic()
+    source.fps = fps
+    route = "/benchmark"
+    server.endpointAdd(route, source)
+
+    stop = threading.Event()
+    def produce() -> None:
+        rng = np.random.default_rng(0)
+        tiles = [rng.integers(0, 256, (height, width, 3), dtype=np.uint8) for _ in range(4)]
+        count = 0
+        while not stop.is_set():
+            source.image = tiles[count % len(tiles)].copy()
+            count += 1
+            time.sleep(1. / fps)
+
+    threading.Thread(target=produce, daemon=True).start()
+    time.sleep(0.25)
+
+    url = f"http://127.0.0.1:{port}{route}"
+    broadcast = server.OUT[route]
+    results = [measure(url, broadcast, count, seconds) for count in clients]
+    stop.set()
+    return {
+        "source_fps": fps,
+        "resolution": [width, height],
+        "results": results
+    }
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--clients", type=int, nargs="+", default=[1, 4, 8])
+    parser.add_argument("--seconds", type=float, default=5.)
+    parser.add_argument("--fps", type=float, default=30.)
+    parser.add_argument("--width", type=int, default=1280)
+    parser.add_argument("--height", type=int, default=720)
+    args = parser.parse_args()
+    result = run(load("sup.stream"), args.clients, args.seconds, args.fps, args.width, args.height)
+    print(json.dumps(result, indent=4))
+
+if __name__ == "__main__":
+    main()
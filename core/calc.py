@@ -667,9 +667,10 @@ Additionally, you can specify the easing function (EASE) and the desired output
         a_xyzw = parse_param(kw, Lexicon.IN_A+Lexicon.IN_A, EnumConvertType.VEC4, [(0, 0, 0, 0)])
         b_xyzw = parse_param(kw, Lexicon.IN_B+Lexicon.IN_B, EnumConvertType.VEC4, [(1, 1, 1, 1)])
         alpha = parse_param(kw, Lexicon.FLOAT,EnumConvertType.VEC4, [(0.5,0.5,0.5,0.5)], 0, 1)
-        op = parse_param(kw, Lexicon.EASE, EnumEase, EnumEase.SIN_IN_OUT.name)
+        # NONE is not an EnumEase member, keep the names and look the easing up later
+        op = parse_param(kw, Lexicon.EASE, EnumConvertType.STRING, EnumEase.SIN_IN_OUT.name)
         typ = parse_param(kw, Lexicon.TYPE, EnumNumberType, EnumNumberType.FLOAT.name)
-        values = []
+        rows = []
         params = list(zip_longest_fill(A, B, a_xyzw, b_xyzw, alpha, op, typ))
         pbar = ProgressBar(len(params))
         for idx, (A, B, a_xyzw, b_xyzw, alpha, op, typ) in enumerate(params):
@@ -684,20 +685,25 @@ Additionally, you can specify the easing function (EASE) and the desired output
             val_b = parse_value(B, EnumConvertType.VEC4, b_xyzw)
             alpha = parse_value(alpha, EnumConvertType.VEC4, alpha)
 
-            if size > 1:
-                val_a = val_a[:size + 1]
-                val_b = val_b[:size + 1]
-            else:
-                val_a = [val_a[0]]
-                val_b = [val_b[0]]
-
             # logger.debug([A, B, val_a, val_b, alpha, size])
+            rows.append((op, typ, size, val_a[:size], val_b[:size], alpha[:size]))
+
+        # every element that shares an easing is eased in one call
+        eased = [None] * len(rows)
+        for ease in set(r[0] for r in rows if r[0] != "NONE"):
+            index = [i for i, r in enumerate(rows) if r[0] == ease]
+            val_a, val_b, alpha = (np.concatenate([np.asarray(rows[i][c], dtype=np.float64) for i in index])
+                                   for c in (3, 4, 5))
+            val = ease_op(EnumEase[ease], val_a, val_b, alpha=alpha)
+            for i, v in zip(index, np.split(val, np.cumsum([rows[i][2] for i in index])[:-1])):
+                eased[i] = v
 
+        values = []
+        for idx, (op, typ, size, val_a, val_b, alpha) in enumerate(rows):
             if op == "NONE":
                 val = [val_b[x] * alpha[x] + val_a[x] * (1 - alpha[x]) for x in range(size)]
             else:
-                # ease = EnumEase[op]
-                val = [ease_op(op, val_a[x], val_b[x], alpha=alpha[x]) for x in range(size)]
+                val = eased[idx]
 
             convert = int if "INT" in typ.name else float
             ret = []
@@ -1063,7 +1069,7 @@ Produce waveforms like sine, square, or sawtooth with adjustable frequency, ampl
                 Lexicon.PHASE: ("FLOAT", {"default": 0, "min": 0.0, "max": 1.0, "step": 0.001, }),
                 Lexicon.OFFSET: ("FLOAT", {"default": 0, "min": 0.0, "max": 1.0, "step": 0.001, }),
                 Lexicon.TIME: ("FLOAT", {"default": 0, "min": 0, "max": sys.maxsize, "step": 0.0001}),
-                Lexicon.INVERT: ("BOOLEAN", {"default": False}),
+                Lexicon.INVERT: ("BOOLEAN", {"default": False, "tooltip":"use the reciprocal of the amplitude"}),
             }
         })
         return Lexicon._parse(d)
@@ -1077,18 +1083,25 @@ Produce waveforms like sine, square, or sawtooth with adjustable frequency, ampl
         delta_time = parse_param(kw, Lexicon.TIME, EnumConvertType.FLOAT, 0., 0., sys.maxsize)
         invert = parse_param(kw, Lexicon.INVERT, EnumConvertType.BOOLEAN, False)
         absolute = parse_param(kw, Lexicon.ABSOLUTE, EnumConvertType.BOOLEAN, False)
-        results = []
         params = list(zip_longest_fill(op, freq, amp, phase, shift, delta_time, invert, absolute))
         pbar = ProgressBar(len(params))
-        for idx, (op, freq, amp, phase, shift, delta_time, invert, absolute) in enumerate(params):
-            # freq = 1. / freq
-            if invert:
-                amp = 1. / val
-            val = wave_op(op, phase, freq, amp, shift, delta_time)
-            if absolute:
-                val = np.abs(val)
-            val = max(-sys.maxsize, min(val, sys.maxsize))
-            results.append([val, int(val)])
+        op, freq, amp, phase, shift, delta_time, invert, absolute = zip(*params)
+        freq, amp, phase, shift, delta_time = (np.asarray(x, dtype=np.float64)
+                                               for x in (freq, amp, phase, shift, delta_time))
+        # freq = 1. / freq
+        # INVERT uses the reciprocal of the amplitude, a zero amplitude stays zero
+        invert = np.asarray(invert, dtype=bool) & (amp != 0)
+        amp[invert] = 1. / amp[invert]
+        val = np.empty(len(params))
+        # the whole schedule of each wave is one call
+        for wave in set(op):
+            index = np.array([o == wave for o in op])
+            val[index] = wave_op(wave, phase[index], freq[index], amp[index], shift[index], delta_time[index])
+        val = np.where(absolute, np.abs(val), val)
+        results = []
+        for idx, v in enumerate(val.tolist()):
+            v = max(-sys.maxsize, min(v, sys.maxsize))
+            results.append([v, int(v)])
             pbar.update_absolute(idx)
         return *list(zip(*results)),
 
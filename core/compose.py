@@ -20,18 +20,20 @@ from .. import \
 
 from ..sup.util import \
     EnumConvertType, \
-    parse_dynamic, parse_param, zip_longest_fill
+    frame_map, parse_dynamic, parse_param, zip_constant, zip_longest_fill
 
 from ..sup.image import \
     MIN_IMAGE_SIZE, \
     EnumImageType, \
-    image_mask, image_mask_add, image_matte, image_minmax, image_convert, \
-    cv2tensor, cv2tensor_full, tensor2cv
+    image_batch_pointwise, image_mask, image_mask_add, image_matte, image_minmax, \
+    image_convert, cv2tensor, cv2tensor_full, cv2tensor_full_batch, tensor2cv, \
+    tensor2cv_batch
 
 from ..sup.image.color import \
     EnumCBDeficiency, EnumCBSimulator, EnumColorMap, EnumColorTheory, \
     color_lut_full, color_lut_match, color_lut_palette, \
     color_lut_tonal, color_lut_visualize, color_match_reinhard, color_theory, color_blind, \
+    color_blind_batch, \
     color_top_used, image_gradient_expand, image_gradient_map, pixel_eval
 
 from ..sup.image.adjust import \
@@ -124,9 +126,39 @@ Enhance and modify images with various effects such as blurring, sharpening, col
         invert = parse_param(kw, Lexicon.INVERT, EnumConvertType.BOOLEAN, False)
         params = list(zip_longest_fill(pA, mask, op, radius, val, lohi,
                                         lmh, hsv, contrast, gamma, matte, invert))
-        images = []
         pbar = ProgressBar(len(params))
-        for idx, (pA, mask, op, radius, val, lohi, lmh, hsv, contrast, gamma, matte, invert) in enumerate(params):
+
+        # per-pixel adjustments with constant settings run over the whole batch at once
+        _, mask, op, _, val, _, lmh, hsv, contrast, gamma, matte, _ = params[0]
+        pointwise = op in [EnumAdjustOP.INVERT, EnumAdjustOP.LEVELS, EnumAdjustOP.POSTERIZE] or \
+            (op == EnumAdjustOP.HSV and contrast == 0)
+        if pointwise and mask is None and zip_constant(params, 0) and \
+            (batch := tensor2cv_batch([p[0] for p in params])) is not None:
+            img_new = image_batch_pointwise(batch, image_convert, 3)
+            match op:
+                case EnumAdjustOP.INVERT:
+                    img_new = image_batch_pointwise(img_new, image_invert, val)
+
+                case EnumAdjustOP.LEVELS:
+                    l, m, h = lmh
+                    img_new = image_batch_pointwise(img_new, image_levels, l, h, m, gamma)
+
+                case EnumAdjustOP.HSV:
+                    h, s, v = hsv
+                    img_new = image_batch_pointwise(img_new, image_hsv, h, s, v)
+                    if gamma != 0:
+                        img_new = image_batch_pointwise(img_new, image_gamma, gamma)
+
+                case EnumAdjustOP.POSTERIZE:
+                    img_new = image_posterize(img_new, int(val))
+
+            img_new = image_batch_pointwise(img_new, image_convert, 4)
+            if batch.shape[3] == 4:
+                img_new[..., 3] = batch[..., 3]
+            pbar.update_absolute(len(params))
+            return cv2tensor_full_batch(img_new, matte)
+
+        def process(pA, mask, op, radius, val, lohi, lmh, hsv, contrast, gamma, matte, invert) -> Tuple[torch.Tensor, ...]:
             pA = tensor2cv(pA) if pA is not None else channel_solid(chan=EnumImageType.BGR)
             img_new = image_convert(pA, 3)
 
@@ -220,8 +252,9 @@ Enhance and modify images with various effects such as blurring, sharpening, col
                 img_new[:,:,3] = mask
             #    img_new = image_mask_add(mask)
 
-            images.append(cv2tensor_full(img_new, matte))
-            pbar.update_absolute(idx)
+            return cv2tensor_full(img_new, matte)
+
+        images = frame_map(process, params, pbar)
         return [torch.stack(i) for i in zip(*images)]
 
 class BlendNode(JOVImageNode):
@@ -265,9 +298,38 @@ Combine two input images using various blending modes, such as normal, screen, m
         matte = parse_param(kw, Lexicon.MATTE, EnumConvertType.VEC4INT, [(0, 0, 0, 255)], 0, 255)
         invert = parse_param(kw, Lexicon.INVERT, EnumConvertType.BOOLEAN, False)
         params = list(zip_longest_fill(pA, pB, mask, func, alpha, flip, mode, wihi, sample, matte, invert))
-        images = []
         pbar = ProgressBar(len(params))
-        for idx, (pA, pB, mask, func, alpha, flip, mode, wihi, sample, matte, invert) in enumerate(params):
+
+        # same sized batches with constant settings blend in one pass
+        _, _, mask, func, alpha, flip, mode, wihi, sample, matte, invert = params[0]
+        batchA = batchB = batchM = None
+        if zip_constant(params, 0, 1, 2):
+            batchA = tensor2cv_batch([p[0] for p in params])
+            batchB = tensor2cv_batch([p[1] for p in params])
+            if mask is not None:
+                batchM = tensor2cv_batch([p[2] for p in params])
+
+        if batchA is not None and batchB is not None and batchA.shape[:3] == batchB.shape[:3] and \
+            (mask is None or (batchM is not None and batchM.shape[:3] == batchA.shape[:3])):
+            if flip:
+                batchA, batchB = batchB, batchA
+            b, h, w = batchA.shape[:3]
+            matted = pixel_eval(matte, EnumImageType.BGRA)
+            batchA = image_batch_pointwise(batchA, image_matte, matted)
+            batchB = batchB.reshape(b * h, w, -1)
+            if batchM is not None:
+                if invert:
+                    batchM = 255 - batchM
+                batchM = batchM.reshape(b * h, w, -1)
+
+            img = image_batch_pointwise(batchA, image_blend, batchB, batchM, func, alpha)
+            if mode != EnumScaleMode.MATTE:
+                width, height = wihi
+                img = np.stack([image_scalefit(i, width, height, mode, sample) for i in img])
+            pbar.update_absolute(len(params))
+            return cv2tensor_full_batch(img, matte)
+
+        def process(pA, pB, mask, func, alpha, flip, mode, wihi, sample, matte, invert) -> Tuple[torch.Tensor, ...]:
             if flip:
                 pA, pB = pB, pA
 
@@ -310,8 +372,9 @@ Combine two input images using various blending modes, such as normal, screen, m
                 img = image_scalefit(img, width, height, mode, sample)
 
             img = cv2tensor_full(img, matte)
-            images.append(img)
-            pbar.update_absolute(idx)
+            return img
+
+        images = frame_map(process, params, pbar)
         return [torch.stack(i) for i in zip(*images)]
 
 class ColorBlindNode(JOVImageNode):
@@ -342,13 +405,23 @@ Simulate color blindness effects on images. You can select various types of colo
         simulator = parse_param(kw, Lexicon.SIMULATOR, EnumCBSimulator, EnumCBSimulator.AUTOSELECT.name)
         severity = parse_param(kw, Lexicon.VALUE, EnumConvertType.FLOAT, 1)
         params = list(zip_longest_fill(pA, deficiency, simulator, severity))
-        images = []
         pbar = ProgressBar(len(params))
-        for idx, (pA, deficiency, simulator, severity) in enumerate(params):
+
+        # the matrix simulators cover a batch with constant settings in one pass
+        _, deficiency, simulator, severity = params[0]
+        if zip_constant(params, 0) and \
+            (batch := tensor2cv_batch([p[0] for p in params])) is not None and \
+            batch.shape[3] in (3, 4) and \
+            (batch := color_blind_batch(batch, deficiency, simulator, severity)) is not None:
+            pbar.update_absolute(len(params))
+            return cv2tensor_full_batch(batch)
+
+        def process(pA, deficiency, simulator, severity) -> Tuple[torch.Tensor, ...]:
             pA = channel_solid(chan=EnumImageType.BGRA) if pA is None else tensor2cv(pA)
             pA = color_blind(pA, deficiency, simulator, severity)
-            images.append(cv2tensor_full(pA))
-            pbar.update_absolute(idx)
+            return cv2tensor_full(pA)
+
+        images = frame_map(process, params, pbar)
         return [torch.stack(i) for i in zip(*images)]
 
 class ColorMatchNode(JOVImageNode):
@@ -391,9 +464,9 @@ Adjust the color scheme of one image to match another with the Color Match Node.
         invert = parse_param(kw, Lexicon.INVERT, EnumConvertType.BOOLEAN, False)
         matte = parse_param(kw, Lexicon.MATTE, EnumConvertType.VEC4INT, [(0, 0, 0, 255)], 0, 255)
         params = list(zip_longest_fill(pA, pB, colormap, colormatch_mode, colormatch_map, num_colors, flip, invert, matte))
-        images = []
         pbar = ProgressBar(len(params))
-        for idx, (pA, pB, colormap, mode, cmap, num_colors, flip, invert, matte) in enumerate(params):
+
+        def process(pA, pB, colormap, mode, cmap, num_colors, flip, invert, matte) -> Tuple[torch.Tensor, ...]:
             if flip == True:
                 pA, pB = pB, pA
 
@@ -426,8 +499,9 @@ Adjust the color scheme of one image to match another with the Color Match Node.
             if mask is not None:
                 pA = image_mask_add(pA, mask)
 
-            images.append(cv2tensor_full(pA, matte))
-            pbar.update_absolute(idx)
+            return cv2tensor_full(pA, matte)
+
+        images = frame_map(process, params, pbar)
         return [torch.stack(i) for i in zip(*images)]
 
 class ColorKMeansNode(JOVBaseNode):
@@ -468,13 +542,9 @@ The top-k colors ordered from most->least used as a strip, tonal palette and 3D
         wihi = parse_param(kw, Lexicon.WH, EnumConvertType.VEC2INT, [(256, 256)], MIN_IMAGE_SIZE)
 
         params = list(zip_longest_fill(pA, kcolors, nodes, lut_height, wihi))
-        top_colors = []
-        lut_tonal = []
-        lut_full = []
-        lut_visualized = []
-        gradients = []
         pbar = ProgressBar(len(params) * sum(kcolors))
-        for idx, (pA, kcolors, nodes, lut_height, wihi) in enumerate(params):
+
+        def process(pA, kcolors, nodes, lut_height, wihi) -> Tuple[Any, ...]:
             if pA is None:
                 pA = channel_solid(chan=EnumImageType.BGRA)
 
@@ -482,15 +552,25 @@ The top-k colors ordered from most->least used as a strip, tonal palette and 3D
             colors = color_top_used(pA, kcolors)
 
             # size down to 1px strip then expand to 256 for full gradient
-            top_colors.extend([cv2tensor(channel_solid(*wihi, color=c)) for c in colors])
-            lut_tonal.append(cv2tensor(color_lut_tonal(colors, width=pA.shape[1], height=lut_height)))
+            top = [cv2tensor(channel_solid(*wihi, color=c)) for c in colors]
+            tonal = cv2tensor(color_lut_tonal(colors, width=pA.shape[1], height=lut_height))
             full = color_lut_full(colors, nodes)
-            lut_full.append(torch.from_numpy(full))
-            lut_visualized.append(cv2tensor(color_lut_visualize(full, wihi[1])))
+            visualized = cv2tensor(color_lut_visualize(full, wihi[1]))
             gradient = image_gradient_expand(color_lut_palette(colors, 1))
             gradient = cv2.resize(gradient, wihi)
-            gradients.append(cv2tensor(gradient))
-            pbar.update_absolute(idx)
+            return top, tonal, torch.from_numpy(full), visualized, cv2tensor(gradient)
+
+        top_colors = []
+        lut_tonal = []
+        lut_full = []
+        lut_visualized = []
+        gradients = []
+        for top, tonal, full, visualized, gradient in frame_map(process, params, pbar):
+            top_colors.extend(top)
+            lut_tonal.append(tonal)
+            lut_full.append(full)
+            lut_visualized.append(visualized)
+            gradients.append(gradient)
 
         return torch.stack(top_colors), torch.stack(lut_tonal), torch.stack(gradients), lut_full, torch.stack(lut_visualized),
 
@@ -524,15 +604,16 @@ Generate a color harmony based on the selected scheme. Supported schemes include
         user = parse_param(kw, Lexicon.VALUE, EnumConvertType.INT, 0, -180, 180)
         invert = parse_param(kw, Lexicon.INVERT, EnumConvertType.BOOLEAN, False)
         params = list(zip_longest_fill(pA, scheme, user, invert))
-        images = []
         pbar = ProgressBar(len(params))
-        for idx, (img, target, user, invert) in enumerate(params):
+
+        def process(img, target, user, invert) -> List[torch.Tensor]:
             img = tensor2cv(img) if img is not None else channel_solid(chan=EnumImageType.BGRA)
             img = color_theory(img, user, target)
             if invert:
                 img = (image_invert(s, 1) for s in img)
-            images.append([cv2tensor(a) for a in img])
-            pbar.update_absolute(idx)
+            return [cv2tensor(a) for a in img]
+
+        images = frame_map(process, params, pbar)
         return [torch.stack(i) for i in zip(*images)]
 
 class CropNode(JOVImageNode):
@@ -569,9 +650,9 @@ Extract a portion of an input image or resize it. It supports various cropping m
         blbr = parse_param(kw, Lexicon.BLBR, EnumConvertType.VEC4, [(1, 0, 1, 1,)], 0, 1)
         matte = parse_param(kw, Lexicon.MATTE, EnumConvertType.VEC4INT, [(0, 0, 0, 255)], 0, 255)
         params = list(zip_longest_fill(pA, func, xy, wihi, tltr, blbr, matte))
-        images = []
         pbar = ProgressBar(len(params))
-        for idx, (pA, func, xy, wihi, tltr, blbr, matte) in enumerate(params):
+
+        def process(pA, func, xy, wihi, tltr, blbr, matte) -> Tuple[torch.Tensor, ...]:
             width, height = wihi
             pA = tensor2cv(pA) if pA is not None else channel_solid(width, height)
             alpha = None
@@ -595,8 +676,9 @@ Extract a portion of an input image or resize it. It supports various cropping m
                 pass
             else:
                 pA = image_crop_center(pA, width, height)
-            images.append(cv2tensor_full(pA, matte))
-            pbar.update_absolute(idx)
+            return cv2tensor_full(pA, matte)
+
+        images = frame_map(process, params, pbar)
         return [torch.stack(i) for i in zip(*images)]
 
 class FilterMaskNode(JOVImageNode):
@@ -630,9 +712,9 @@ Create masks based on specific color ranges within an image. Specify the color r
         fuzz = parse_param(kw, Lexicon.FLOAT, EnumConvertType.VEC3, [(0.5,0.5,0.5)], 0, 1)
         matte = parse_param(kw, Lexicon.MATTE, EnumConvertType.VEC4INT, [(0, 0, 0, 255)], 0, 255)
         params = list(zip_longest_fill(pA, start, use_range, end, fuzz, matte))
-        images = []
         pbar = ProgressBar(len(params))
-        for idx, (pA, start, use_range, end, fuzz, matte) in enumerate(params):
+
+        def process(pA, start, use_range, end, fuzz, matte) -> Tuple[torch.Tensor, ...]:
             img = np.zeros((MIN_IMAGE_SIZE, MIN_IMAGE_SIZE, 3), dtype=np.uint8) if pA is None else tensor2cv(pA)
 
             img, mask = image_filter(img, start, end, fuzz, use_range)
@@ -640,8 +722,9 @@ Create masks based on specific color ranges within an image. Specify the color r
                 alpha_channel = np.zeros((img.shape[0], img.shape[1], 1), dtype=img.dtype)
                 img = np.concatenate((img, alpha_channel), axis=2)
             img[..., 3] = mask[:,:]
-            images.append(cv2tensor_full(img, matte))
-            pbar.update_absolute(idx)
+            return cv2tensor_full(img, matte)
+
+        images = frame_map(process, params, pbar)
         return [torch.stack(i) for i in zip(*images)]
 
 class Flatten(JOVImageNode):
@@ -678,13 +761,14 @@ Combine multiple input images into a single image by summing their pixel values.
         sample = parse_param(kw, Lexicon.SAMPLE, EnumInterpolation, EnumInterpolation.LANCZOS4.name)
         matte = parse_param(kw, Lexicon.MATTE, EnumConvertType.VEC4INT, [(0, 0, 0, 255)], 0, 255)
 
-        images = []
         params = list(zip_longest_fill(mode, sample, wihi, matte))
         pbar = ProgressBar(len(params))
-        for idx, (mode, sample, wihi, matte) in enumerate(params):
+
+        def process(mode, sample, wihi, matte) -> Tuple[torch.Tensor, ...]:
             current = image_flatten(pA)
-            images.append(cv2tensor_full(current, matte))
-            pbar.update_absolute(idx)
+            return cv2tensor_full(current, matte)
+
+        images = frame_map(process, params, pbar)
         return [torch.stack(i) for i in zip(*images)]
 
 class GradientMap(JOVImageNode):
@@ -719,10 +803,21 @@ Remaps an input image using a gradient lookup table (LUT). The gradient image wi
         wihi = parse_param(kw, Lexicon.WH, EnumConvertType.VEC2INT, [(512, 512)], MIN_IMAGE_SIZE)
         sample = parse_param(kw, Lexicon.SAMPLE, EnumInterpolation, EnumInterpolation.LANCZOS4.name)
         matte = parse_param(kw, Lexicon.MATTE, EnumConvertType.VEC4INT, [(0, 0, 0, 255)], 0, 255)
-        images = []
         params = list(zip_longest_fill(pA, gradient, flip, mode, sample, wihi, matte))
         pbar = ProgressBar(len(params))
-        for idx, (pA, gradient, flip, mode, sample, wihi, matte) in enumerate(params):
+
+        # one gradient for every frame is a single lookup over the batch
+        _, gradient, _, mode, _, _, matte = params[0]
+        if mode == EnumScaleMode.MATTE and zip_constant(params, 0) and \
+            (batch := tensor2cv_batch([p[0] for p in params])) is not None:
+            gradient = channel_solid(chan=EnumImageType.BGR) if gradient is None else tensor2cv(gradient)
+            image = image_gradient_map(batch, gradient)
+            if batch.shape[3] == 4:
+                image = np.concatenate([image, batch[..., 3:]], axis=-1)
+            pbar.update_absolute(len(params))
+            return cv2tensor_full_batch(image, matte)
+
+        def process(pA, gradient, flip, mode, sample, wihi, matte) -> Tuple[torch.Tensor, ...]:
             pA = channel_solid(chan=EnumImageType.BGR) if pA is None else tensor2cv(pA)
             mask = None
             if pA.ndim == 3 and pA.shape[2] == 4:
@@ -735,8 +830,9 @@ Remaps an input image using a gradient lookup table (LUT). The gradient image wi
                 pA = image_scalefit(pA, w, h, mode, sample)
             if mask is not None:
                 pA = image_mask_add(pA, mask)
-            images.append(cv2tensor_full(pA, matte))
-            pbar.update_absolute(idx)
+            return cv2tensor_full(pA, matte)
+
+        images = frame_map(process, params, pbar)
         return [torch.stack(i) for i in zip(*images)]
 
 class PixelMergeNode(JOVImageNode):
@@ -780,9 +876,9 @@ Combines individual color channels (red, green, blue) along with an optional mas
         flip = parse_param(kw, Lexicon.FLIP, EnumConvertType.VEC4, [(0, 0, 0, 0)], 0., 1.)
         invert = parse_param(kw, Lexicon.INVERT, EnumConvertType.BOOLEAN, False)
         params = list(zip_longest_fill(rgba, R, G, B, A, mode, wihi, sample, matte, flip, invert))
-        images = []
         pbar = ProgressBar(len(params))
-        for idx, (rgba, r, g, b, a, mode, wihi, sample, matte, flip, invert) in enumerate(params):
+
+        def process(rgba, r, g, b, a, mode, wihi, sample, matte, flip, invert) -> Tuple[torch.Tensor, ...]:
             replace = r, g, b, a
             if rgba is not None:
                 rgba = tensor2cv(rgba)
@@ -812,8 +908,9 @@ Combines individual color channels (red, green, blue) along with an optional mas
             if invert == True:
                 img = image_invert(img, 1)
 
-            images.append(cv2tensor_full(img, matte))
-            pbar.update_absolute(idx)
+            return cv2tensor_full(img, matte)
+
+        images = frame_map(process, params, pbar)
         return [torch.stack(i) for i in zip(*images)]
 
 class PixelSplitNode(JOVBaseNode):
@@ -843,13 +940,14 @@ Takes an input image and splits it into its individual color channels (red, gree
         return Lexicon._parse(d)
 
     def run(self, **kw) -> RGBAMaskType:
-        images = []
         pA = parse_param(kw, Lexicon.PIXEL, EnumConvertType.IMAGE, None)
         pbar = ProgressBar(len(pA))
-        for idx, pA in enumerate(pA):
+
+        def process(pA) -> List[torch.Tensor]:
             pA = channel_solid(chan=EnumImageType.BGRA) if pA is None else tensor2cv(pA)
-            images.append([cv2tensor(x, True) for x in image_split(pA)])
-            pbar.update_absolute(idx)
+            return [cv2tensor(x, True) for x in image_split(pA)]
+
+        images = frame_map(process, [(p,) for p in pA], pbar)
         return [torch.stack(i) for i in zip(*images)]
 
 class PixelSwapNode(JOVImageNode):
@@ -889,15 +987,28 @@ Swap pixel values between two input images based on specified channel swizzle op
         swap_a = parse_param(kw, Lexicon.SWAP_A, EnumPixelSwizzle, EnumPixelSwizzle.ALPHA_A.name)
         matte = parse_param(kw, Lexicon.MATTE, EnumConvertType.VEC4INT, [(0, 0, 0, 255)], 0, 255)
         params = list(zip_longest_fill(pA, pB, swap_r, swap_g, swap_b, swap_a, matte))
-        images = []
         pbar = ProgressBar(len(params))
-        for idx, (pA, pB, swap_r, swap_g, swap_b, swap_a, matte) in enumerate(params):
+
+        # same sized batches with a constant swizzle are swapped in one pass
+        if zip_constant(params, 0, 1) and \
+            (batchA := tensor2cv_batch([p[0] for p in params])) is not None and \
+            (batchB := tensor2cv_batch([p[1] for p in params])) is not None and \
+            batchA.shape[:3] == batchB.shape[:3]:
+            _, _, swap_r, swap_g, swap_b, swap_a, matte = params[0]
+            b, h, w = batchA.shape[:3]
+            batchA = image_batch_pointwise(batchA, image_convert, 4)
+            batchB = image_batch_pointwise(batchB, image_convert, 4)
+            batchB = image_batch_pointwise(batchB, image_matte, (0,0,0,0))
+            out = image_batch_pointwise(batchA, image_swap_channels, batchB.reshape(b * h, w, 4),
+                                        (swap_r, swap_g, swap_b, swap_a), matte)
+            pbar.update_absolute(len(params))
+            return cv2tensor_full_batch(out)
+
+        def process(pA, pB, swap_r, swap_g, swap_b, swap_a, matte) -> Tuple[torch.Tensor, ...]:
             if pA is None:
                 if pB is None:
                     out = channel_solid(chan=EnumImageType.BGRA)
-                    images.append(cv2tensor_full(out))
-                    pbar.update_absolute(idx)
-                    continue
+                    return cv2tensor_full(out)
 
                 h, w = pB.shape[:2]
                 pA = channel_solid(w, h, chan=EnumImageType.BGRA)
@@ -912,9 +1023,9 @@ Swap pixel values between two input images based on specified channel swizzle op
             pB = image_scalefit(pB, w, h, EnumScaleMode.CROP)
 
             out = image_swap_channels(pA, pB, (swap_r, swap_g, swap_b, swap_a), matte)
+            return cv2tensor_full(out)
 
-            images.append(cv2tensor_full(out))
-            pbar.update_absolute(idx)
+        images = frame_map(process, params, pbar)
         return [torch.stack(i) for i in zip(*images)]
 
 class StackNode(JOVImageNode):
@@ -993,15 +1104,26 @@ Define a range and apply it to an image for segmentation and feature extraction.
         block = parse_param(kw, Lexicon.SIZE, EnumConvertType.INT, 3, 3)
         invert = parse_param(kw, Lexicon.INVERT, EnumConvertType.BOOLEAN, False)
         params = list(zip_longest_fill(pA, mode, adapt, threshold, block, invert))
-        images = []
         pbar = ProgressBar(len(params))
-        for idx, (pA, mode, adapt, th, block, invert) in enumerate(params):
+
+        # a global threshold is per-pixel, so a constant setting covers the batch in one pass
+        _, mode, adapt, th, block, invert = params[0]
+        if adapt == EnumThresholdAdapt.ADAPT_NONE and zip_constant(params, 0) and \
+            (batch := tensor2cv_batch([p[0] for p in params])) is not None:
+            batch = image_batch_pointwise(batch, image_threshold, th, mode, adapt, block)
+            if invert == True:
+                batch = image_batch_pointwise(batch, image_invert, 1)
+            pbar.update_absolute(len(params))
+            return cv2tensor_full_batch(batch)
+
+        def process(pA, mode, adapt, th, block, invert) -> Tuple[torch.Tensor, ...]:
             pA = tensor2cv(pA) if pA is not None else channel_solid(chan=EnumImageType.BGRA)
             pA = image_threshold(pA, th, mode, adapt, block)
             if invert == True:
                 pA = image_invert(pA, 1)
-            images.append(cv2tensor_full(pA))
-            pbar.update_absolute(idx)
+            return cv2tensor_full(pA)
+
+        images = frame_map(process, params, pbar)
         return [torch.stack(i) for i in zip(*images)]
 
 class TransformNode(JOVImageNode):
@@ -1057,9 +1179,9 @@ Apply various geometric transformations to images, including translation, rotati
         sample = parse_param(kw, Lexicon.SAMPLE, EnumInterpolation, EnumInterpolation.LANCZOS4.name)
         matte = parse_param(kw, Lexicon.MATTE, EnumConvertType.VEC4INT, [(0, 0, 0, 255)], 0, 255)
         params = list(zip_longest_fill(pA, mask, offset, angle, size, edge, tile_xy, mirror, mirror_pivot, proj, strength, tltr, blbr, mode, wihi, sample, matte))
-        images = []
         pbar = ProgressBar(len(params))
-        for idx, (pA, mask, offset, angle, size, edge, tile_xy, mirror, mirror_pivot, proj, strength, tltr, blbr, mode, wihi, sample, matte) in enumerate(params):
+
+        def process(pA, mask, offset, angle, size, edge, tile_xy, mirror, mirror_pivot, proj, strength, tltr, blbr, mode, wihi, sample, matte) -> Tuple[torch.Tensor, ...]:
             pA = tensor2cv(pA) if pA is not None else channel_solid(chan=EnumImageType.BGRA)
             if mask is not None:
                 mask = tensor2cv(mask)
@@ -1101,8 +1223,9 @@ Apply various geometric transformations to images, including translation, rotati
                 w, h = wihi
                 pA = image_scalefit(pA, w, h, mode, sample)
 
-            images.append(cv2tensor_full(pA, matte))
-            pbar.update_absolute(idx)
+            return cv2tensor_full(pA, matte)
+
+        images = frame_map(process, params, pbar)
         return [torch.stack(i) for i in zip(*images)]
 
 '''
@@ -2,7 +2,8 @@
 Jovimetrix - Creation
 """
 
-from typing import Tuple
+import threading
+from typing import List, Tuple
 
 import torch
 import numpy as np
@@ -18,7 +19,7 @@ from .. import \
 
 from ..sup.util import \
     EnumConvertType, \
-    parse_param, zip_longest_fill
+    frame_map, parse_param, zip_longest_fill
 
 from ..sup.image import \
     MIN_IMAGE_SIZE, \
@@ -35,7 +36,7 @@ from ..sup.image.adjust import \
     EnumEdge, EnumScaleMode, EnumInterpolation, \
     image_invert, image_rotate, image_scalefit, image_transform, image_translate
 
-from ..sup.image.mapping import image_stereogram
+from ..sup.image.mapping import image_stereogram, image_stereogram_noise
 
 from ..sup.text import \
     EnumAlignment, EnumJustify, \
@@ -79,10 +80,10 @@ Generate a constant image or mask of a specified size and color. It can be used
         wihi = parse_param(kw, Lexicon.WH, EnumConvertType.VEC2INT, [(512, 512)], MIN_IMAGE_SIZE)
         mode = parse_param(kw, Lexicon.MODE, EnumScaleMode, EnumScaleMode.MATTE.name)
         sample = parse_param(kw, Lexicon.SAMPLE, EnumInterpolation, EnumInterpolation.LANCZOS4.name)
-        images = []
         params = list(zip_longest_fill(pA, mask, matte, wihi, mode, sample))
         pbar = ProgressBar(len(params))
-        for idx, (pA, mask, matte, wihi, mode, sample) in enumerate(params):
+
+        def process(pA, mask, matte, wihi, mode, sample) -> Tuple[torch.Tensor, ...]:
             width, height = wihi
             if mask is not None:
                 mask = tensor2cv(mask)
@@ -90,16 +91,17 @@ Generate a constant image or mask of a specified size and color. It can be used
                 pA = channel_solid(width, height, matte, EnumImageType.BGRA)
                 if mask is not None:
                     pA = image_mask_add(pA, mask)
-                images.append(cv2tensor_full(pA))
-            else:
-                pA = tensor2cv(pA)
-                pA = image_convert(pA, 4)
-                if mask is not None:
-                    pA = image_mask_add(pA, mask)
-                if mode != EnumScaleMode.MATTE:
-                    pA = image_scalefit(pA, width, height, mode, sample)
-                images.append(cv2tensor_full(pA, matte))
-            pbar.update_absolute(idx)
+                return cv2tensor_full(pA)
+
+            pA = tensor2cv(pA)
+            pA = image_convert(pA, 4)
+            if mask is not None:
+                pA = image_mask_add(pA, mask)
+            if mode != EnumScaleMode.MATTE:
+                pA = image_scalefit(pA, width, height, mode, sample)
+            return cv2tensor_full(pA, matte)
+
+        images = frame_map(process, params, pbar)
         return [torch.stack(i) for i in zip(*images)]
 
 class ShapeNode(JOVImageNode):
@@ -140,9 +142,9 @@ Create n-sided polygons. These shapes can be customized by adjusting parameters
         matte = parse_param(kw, Lexicon.MATTE, EnumConvertType.VEC4INT, [(0, 0, 0, 255)], 0, 255)
         blur = parse_param(kw, Lexicon.BLUR, EnumConvertType.FLOAT, 0)
         params = list(zip_longest_fill(shape, sides, offset, angle, edge, size, wihi, color, matte, blur))
-        images = []
         pbar = ProgressBar(len(params))
-        for idx, (shape, sides, offset, angle, edge, size, wihi, color, matte, blur) in enumerate(params):
+
+        def process(shape, sides, offset, angle, edge, size, wihi, color, matte, blur) -> List[torch.Tensor]:
             width, height = wihi
             sizeX, sizeY = size
             fill = color[:3][::-1]
@@ -169,8 +171,9 @@ Create n-sided polygons. These shapes can be customized by adjusting parameters
             pB = image_mask_add(pA, mask)
             matte = image_matte(pB, matte)
 
-            images.append([cv2tensor(pB), cv2tensor(matte), cv2tensor(mask, True)])
-            pbar.update_absolute(idx)
+            return [cv2tensor(pB), cv2tensor(matte), cv2tensor(mask, True)]
+
+        images = frame_map(process, params, pbar)
         return [torch.stack(i) for i in zip(*images)]
 
 class StereogramNode(JOVImageNode):
@@ -205,17 +208,25 @@ Generates false perception 3D images from 2D input. Set tile divisions, noise, g
         shift = parse_param(kw, Lexicon.SHIFT, EnumConvertType.FLOAT, 0, 1, -1)
         invert = parse_param(kw, Lexicon.INVERT, EnumConvertType.BOOLEAN, False)
         params = list(zip_longest_fill(pA, depth, divisions, noise, gamma, shift, invert))
-        images = []
+        # one noise tile per size and gamma so a batch keeps the same pattern
+        tiles = {}
+        tiles_lock = threading.Lock()
         pbar = ProgressBar(len(params))
-        for idx, (pA, depth, divisions, noise, gamma, shift, invert) in enumerate(params):
+
+        def process(pA, depth, divisions, noise, gamma, shift, invert) -> Tuple[torch.Tensor, ...]:
             pA = channel_solid(chan=EnumImageType.BGRA) if pA is None else tensor2cv(pA)
             h, w = pA.shape[:2]
             depth = channel_solid(w, h, chan=EnumImageType.BGRA) if depth is None else tensor2cv(depth)
             if invert:
                 depth = image_invert(depth, 1.0)
-            pA = image_stereogram(pA, depth, divisions, noise, gamma, shift)
-            images.append(cv2tensor_full(pA))
-            pbar.update_absolute(idx)
+            dh, dw = depth.shape[:2]
+            with tiles_lock:
+                if (tile := tiles.get((dw, dh, gamma), None)) is None:
+                    tile = tiles[(dw, dh, gamma)] = image_stereogram_noise(dw, dh, gamma)
+            pA = image_stereogram(pA, depth, divisions, noise, gamma, shift, tile)
+            return cv2tensor_full(pA)
+
+        images = frame_map(process, params, pbar)
         return [torch.stack(i) for i in zip(*images)]
 
 class StereoscopicNode(JOVBaseNode):
@@ -242,17 +253,18 @@ Simulates depth perception in images by generating stereoscopic views. It accept
         pA = parse_param(kw, Lexicon.PIXEL, EnumConvertType.IMAGE, None)
         baseline = parse_param(kw, Lexicon.INT, EnumConvertType.FLOAT, 0, 0.1, 1)
         focal_length = parse_param(kw, Lexicon.VALUE, EnumConvertType.FLOAT, 500, 0)
-        images = []
         params = list(zip_longest_fill(pA, baseline, focal_length))
         pbar = ProgressBar(len(params))
-        for idx, (pA, baseline, focal_length) in enumerate(params):
+
+        def process(pA, baseline, focal_length) -> torch.Tensor:
             pA = tensor2cv(pA) if pA is not None else channel_solid(chan=EnumImageType.GRAYSCALE)
             # Convert depth image to disparity map
             disparity_map = np.divide(1.0, pA.astype(np.float32), where=pA!=0)
             # Compute disparity values based on baseline and focal length
             disparity_map *= baseline * focal_length
-            images.append(cv2tensor(pA))
-            pbar.update_absolute(idx)
+            return cv2tensor(pA)
+
+        images = frame_map(process, params, pbar)
         return torch.stack(images)
 
 class TextNode(JOVImageNode):
@@ -260,6 +272,7 @@ class TextNode(JOVImageNode):
     CATEGORY = f"JOVIMETRIX 🔺🟩🔵/{JOV_CATEGORY}"
     FONTS = font_names()
     FONT_NAMES = sorted(FONTS.keys())
+    LAZY = False
     DESCRIPTION = """
 Generates images containing text based on parameters such as font, size, alignment, color, and position. Users can input custom text messages, select fonts from a list of available options, adjust font size, and specify the alignment and justification of the text. Additionally, the node provides options for auto-sizing text to fit within specified dimensions, controlling letter-by-letter rendering, and applying edge effects such as clipping and inversion.
 """
@@ -314,15 +327,15 @@ Generates images containing text based on parameters such as font, size, alignme
         angle = parse_param(kw, Lexicon.ANGLE, EnumConvertType.INT, 0)
         edge = parse_param(kw, Lexicon.EDGE, EnumEdge, EnumEdge.CLIP.name)
         invert = parse_param(kw, Lexicon.INVERT, EnumConvertType.BOOLEAN, False)
-        images = []
         params = list(zip_longest_fill(full_text, font_idx, autosize, letter, color,
                                 matte, columns, font_size, align, justify, margin,
                                 line_spacing, wihi, pos, angle, edge, invert))
 
         pbar = ProgressBar(len(params))
-        for idx, (full_text, font_idx, autosize, letter, color, matte, columns,
-                font_size, align, justify, margin, line_spacing, wihi, pos,
-                angle, edge, invert) in enumerate(params):
+
+        def process(full_text, font_idx, autosize, letter, color, matte, columns,
+                    font_size, align, justify, margin, line_spacing, wihi, pos,
+                    angle, edge, invert) -> List[Tuple[torch.Tensor, ...]]:
 
             width, height = wihi
             font_name = self.FONTS[font_idx]
@@ -344,12 +357,16 @@ Generates images containing text based on parameters such as font, size, alignme
             font_size *= 2.5
 
             font = ImageFont.truetype(font_name, font_size)
+            frames = []
             for ch in full_text:
                 img = text_draw(ch, font, width, height, align, justify, margin, line_spacing, color)
                 img = image_rotate(img, angle, edge=edge)
                 img = image_translate(img, pos, edge=edge)
                 if invert:
                     img = image_invert(img, 1)
-                images.append(cv2tensor_full(img, matte))
-            pbar.update_absolute(idx)
+                frames.append(cv2tensor_full(img, matte))
+            return frames
+
+        # with LETTER each entry draws one frame per character
+        images = [frame for frames in frame_map(process, params, pbar) for frame in frames]
         return [torch.stack(i) for i in zip(*images)]
@@ -87,6 +87,8 @@ except Exception as e:
 
 class GLSLNodeBase(JOVImageNode):
     CATEGORY = f"JOVIMETRIX 🔺🟩🔵/GLSL"
+    # shader list is read from disk and the module adds web routes
+    LAZY = False
 
     @classmethod
     def INPUT_TYPES(cls) -> InputType:
@@ -78,6 +78,7 @@ class MIDIReaderNode(MIDIHeader):
     CATEGORY = f"JOVIMETRIX 🔺🟩🔵/{JOV_CATEGORY}"
     SORT = 5
     DEVICES = midi_device_names()
+    LAZY = False
     DESCRIPTION = """
 Captures MIDI messages from an external MIDI device or controller. It monitors MIDI input and provides information about the received MIDI messages, including whether a note is being played, the MIDI channel, control number, note number, value, and a normalized value. This node is essential for integrating MIDI control into various applications, such as music production, live performances, and interactive installations.
 """
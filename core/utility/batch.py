@@ -29,6 +29,8 @@ from ...sup.util import \
     EnumConvertType, \
     parse_dynamic, parse_param
 
+from ...sup.cache import CacheLRU
+
 from ...sup.image import \
     MIN_IMAGE_SIZE, IMAGE_FORMATS, \
     image_convert, image_matte, image_load, cv2tensor, cv2tensor_full, tensor2cv
@@ -41,6 +43,16 @@ from ...sup.image.adjust import \
 
 JOV_CATEGORY = "UTILITY"
 
+# memory budget, per queue node, for decoded queue entries
+JOV_QUEUE_CACHE = 512
+try: JOV_QUEUE_CACHE = int(os.getenv("JOV_QUEUE_CACHE", JOV_QUEUE_CACHE))
+except: pass
+
+# how many queue entries to decode ahead of the current index
+JOV_QUEUE_PREFETCH = 4
+try: JOV_QUEUE_PREFETCH = max(0, int(os.getenv("JOV_QUEUE_PREFETCH", JOV_QUEUE_PREFETCH)))
+except: pass
+
 class EnumBatchMode(Enum):
     MERGE = 30
     PICK = 10
@@ -283,7 +295,7 @@ class QueueBaseNode(JOVBaseNode):
         self.__current = None
         self.__previous = None
         self.__ident = None
-        self.__last_q_value = {}
+        self.__cache = CacheLRU(JOV_QUEUE_CACHE, min(JOV_QUEUE_PREFETCH, os.cpu_count() or 1))
 
     # consume the list into iterable items to load/process
     def __parseQ(self, data: Any, recurse: bool=False) -> List[str]:
@@ -332,24 +344,48 @@ class QueueBaseNode(JOVBaseNode):
                 entries.extend(ret)
         return entries
 
+    @classmethod
+    def __loadable(cls, q_data: Any) -> bool:
+        if not isinstance(q_data, (str,)):
+            return False
+        _, ext = os.path.splitext(q_data)
+        return ext in IMAGE_FORMATS or ext == '.json'
+
+    @classmethod
+    def __cache_key(cls, q_data: str) -> Tuple[str, float]:
+        # a changed file on disk gets a new key and the stale entry ages out
+        try: mtime = os.path.getmtime(q_data)
+        except OSError: mtime = 0
+        return q_data, mtime
+
+    @classmethod
+    def __load(cls, key: Tuple[str, float]) -> np.ndarray | dict:
+        q_data = key[0]
+        _, ext = os.path.splitext(q_data)
+        if ext in IMAGE_FORMATS:
+            return image_load(q_data)[0]
+        #elif ext in self.VIDEO_FORMATS:
+        #    return load_file(q_data)
+        with open(q_data, 'r', encoding='utf-8') as f:
+            return json.load(f)
+
     # turn Q element into actual hard type
     def process(self, q_data: Any) -> torch.Tensor | str | dict:
-        # single Q cache to skip loading single entries over and over
-        # @TODO: MRU cache strategy
-        if (val := self.__last_q_value.get(q_data, None)) is not None:
-            return val
-        if isinstance(q_data, (str,)):
-            _, ext = os.path.splitext(q_data)
-            if ext in IMAGE_FORMATS:
-                data = image_load(q_data)[0]
-                self.__last_q_value[q_data] = data
-            #elif ext in self.VIDEO_FORMATS:
-            #    data = load_file(q_data)
-            #    self.__last_q_value[q_data] = data
-            elif ext == '.json':
-                with open(q_data, 'r', encoding='utf-8') as f:
-                    self.__last_q_value[q_data] = json.load(f)
-        return self.__last_q_value.get(q_data, q_data)
+        if not self.__loadable(q_data):
+            return q_data
+        return self.__cache.get(self.__cache_key(q_data), self.__load)
+
+    def prefetch(self, index: int, count: int=JOV_QUEUE_PREFETCH, loop: bool=True) -> None:
+        """Decode the next `count` queue entries, from index, in the background."""
+        keys = []
+        for idx in range(index, index + count):
+            if loop and self.__len > 0:
+                idx %= self.__len
+            elif idx >= self.__len:
+                break
+            if self.__loadable(q_data := self.__q[idx]):
+                keys.append(self.__cache_key(q_data))
+        self.__cache.prefetch(keys, self.__load)
 
     def run(self, ident, **kw) -> Tuple[Any, List[str], str, int, int]:
 
@@ -370,6 +406,7 @@ class QueueBaseNode(JOVBaseNode):
             q = parse_param(kw, Lexicon.QUEUE, EnumConvertType.STRING, "")[0]
             self.__q = self.__parseQ(q, recurse)
             self.__len = len(self.__q)
+            self.__cache.clear()
             self.__index_last = 0
             self.__previous = self.__q[0] if len(self.__q) else None
             if self.__previous:
@@ -401,6 +438,8 @@ class QueueBaseNode(JOVBaseNode):
             data = []
             mw, mh, mc = 0, 0, 0
             for idx in range(self.__len):
+                # only a few entries ahead, the whole queue can be past the cache budget
+                self.prefetch(idx + 1, loop=False)
                 ret = self.process(self.__q[idx])
                 if isinstance(ret, (np.ndarray,)):
                     h, w, c = ret.shape
@@ -433,6 +472,7 @@ class QueueBaseNode(JOVBaseNode):
             if isinstance(data, (np.ndarray,)):
                 data = cv2tensor(data).unsqueeze(0)
             self.__index += 1
+            self.prefetch(self.__index, loop=loop)
 
         self.__previous = data
         comfy_api_post("jovi-queue-ping", ident, self.status)
@@ -447,7 +487,8 @@ class QueueBaseNode(JOVBaseNode):
             "c": self.__current,
             "i": self.__index_last,
             "s": self.__len,
-            "l": self.__q
+            "l": self.__q,
+            "cache": self.__cache.stats
         }
 
 class QueueNode(QueueBaseNode):
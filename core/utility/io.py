@@ -4,6 +4,7 @@ Jovimetrix - Utility
 
 import os
 import json
+import subprocess
 from uuid import uuid4
 from pathlib import Path
 from typing import Any, Tuple
@@ -30,6 +31,8 @@ from ...sup.util import \
 
 from ...sup.image import tensor2cv, tensor2pil
 
+from ...sup.export import ExportWriter, export_frames, export_gif, export_queue, export_webp
+
 # ==============================================================================
 
 JOV_CATEGORY = "UTILITY"
@@ -45,7 +48,9 @@ JOV_DELAY_MAX = 600
 try: JOV_DELAY_MAX = int(os.getenv("JOV_DELAY_MAX", JOV_DELAY_MAX))
 except: pass
 
-FORMATS = ["gif", "png", "jpg"]
+SAVE_FORMATS = ["png", "tiff"]
+
+FORMATS = ["gif", "png", "jpg", "webp"]
 if (JOV_GIFSKI := os.getenv("JOV_GIFSKI", None)) is not None:
     if not os.path.isfile(JOV_GIFSKI):
         logger.error(f"gifski missing [{JOV_GIFSKI}]")
@@ -143,15 +148,16 @@ Responsible for saving images or animations to disk. It supports various output
                 # GIF ONLY
                 Lexicon.OPTIMIZE: ("BOOLEAN", {"default": False,
                                               "tooltip":"Pass through another route node to pre-populate the outputs."}),
-                # GIFSKI ONLY
+                # GIFSKI OR WEBP
                 Lexicon.QUALITY: ("INT", {"default": 90, "min": 1, "max": 100,
                                               "tooltip":"Pass through another route node to pre-populate the outputs."}),
+                # GIFSKI ONLY
                 Lexicon.QUALITY_M: ("INT", {"default": 100, "min": 1, "max": 100,
                                               "tooltip":"Pass through another route node to pre-populate the outputs."}),
-                # GIF OR GIFSKI
+                # GIF, GIFSKI OR WEBP
                 Lexicon.FPS: ("INT", {"default": 24, "min": 1, "max": 60,
                                               "tooltip":"Pass through another route node to pre-populate the outputs."}),
-                # GIF OR GIFSKI
+                # GIF, GIFSKI OR WEBP
                 Lexicon.LOOP: ("INT", {"default": 0, "min": 0,
                                               "tooltip":"Pass through another route node to pre-populate the outputs."}),
             }
@@ -174,33 +180,39 @@ Responsible for saving images or animations to disk. It supports various output
 
         def output(extension) -> Path:
             path = output_dir / f"{suffix}.{extension}"
-            if not overwrite and os.path.isfile(path):
-                path = str(output_dir / f"{suffix}_%s.{extension}")
-                path = path_next(path)
+            if not overwrite:
+                if os.path.isfile(path):
+                    path = str(output_dir / f"{suffix}_%s.{extension}")
+                    path = path_next(path)
+                # claim the name now, the frame is written later on a writer thread
+                Path(path).touch()
             return path
 
-        images = [tensor2pil(i) for i in images]
         if format == "gifski":
             root = output_dir / f"{suffix}_{uuid4().hex[:16]}"
             # logger.debug(root)
+            frames = []
             try:
                 root.mkdir(parents=True, exist_ok=True)
-                for idx, i in enumerate(images):
-                    fname = str(root / f"{suffix}_{idx}.png")
-                    i.save(fname)
+                with ExportWriter() as writer:
+                    for idx, image in enumerate(images):
+                        fname = root / f"{suffix}_{idx}.png"
+                        writer.submit(fname, lambda image=image: tensor2pil(image))
+                        frames.append(str(fname))
             except Exception as e:
                 logger.warning(output_dir)
                 logger.error(str(e))
                 return
             else:
-                out = output('gif')
-                fps = f"--fps {fps}" if fps > 0 else ""
-                q = f"--quality {quality}"
-                mq = f"--motion-quality {motion}"
-                cmd = f"{JOV_GIFSKI} -o {out} {q} {mq} {fps} {str(root)}/{suffix}_*.png"
-                logger.info(cmd)
+                cmd = [JOV_GIFSKI, "-o", str(output('gif')), "--quality", str(quality),
+                       "--motion-quality", str(motion)]
+                if fps > 0:
+                    cmd += ["--fps", str(fps)]
+                # in frame order, a shell glob would sort 10 before 2
+                cmd += frames
+                logger.info(" ".join(cmd[:7] + [f"{root}/{suffix}_*.png"]))
                 try:
-                    os.system(cmd)
+                    subprocess.run(cmd, check=True)
                 except Exception as e:
                     logger.warning(cmd)
                     logger.error(str(e))
@@ -208,18 +220,26 @@ Responsible for saving images or animations to disk. It supports various output
                 # shutil.rmtree(root)
 
         elif format == "gif":
-            images[0].save(
-                output('gif'),
-                append_images=images[1:],
-                disposal=2,
-                duration=1 / fps * 1000 if fps else 0,
-                loop=loop,
-                optimize=optimize,
-                save_all=True,
-            )
+            if optimize:
+                # PIL diffs and optimizes the frames, it keeps all of them to do so
+                frames = export_frames(images[1:])
+                tensor2pil(images[0]).save(
+                    output('gif'),
+                    append_images=frames,
+                    disposal=2,
+                    duration=1 / fps * 1000 if fps else 0,
+                    loop=loop,
+                    optimize=optimize,
+                    save_all=True,
+                )
+            else:
+                export_gif(export_frames(images), output('gif'), fps, loop)
+        elif format == "webp":
+            export_webp(images, output('webp'), fps, loop, quality)
         else:
-            for img in images:
-                img.save(output(format), optimize=optimize)
+            with ExportWriter() as writer:
+                for image in images:
+                    writer.submit(output(format), lambda image=image: tensor2pil(image), optimize=optimize)
         return ()
 
 class RouteNode(JOVBaseNode):
@@ -279,6 +299,10 @@ Save the output image along with its metadata to the specified path. Supports sa
                 "usermeta": ("STRING", {"default": "", "multiline": True,
                                         "dynamicPrompts":False,
                                         "tooltip":"Custom user metadat to save with the file"}),
+                "format": (SAVE_FORMATS, {"default": SAVE_FORMATS[0],
+                                          "tooltip":"PNG keeps the metadata as text chunks, TIFF is written uncompressed with the metadata in the image description"}),
+                "compress_level": ("INT", {"default": 6, "min": 0, "max": 9,
+                                           "tooltip":"PNG zlib level, 0 writes uncompressed and is the fastest"}),
             }
         })
         return Lexicon._parse(d)
@@ -291,9 +315,18 @@ Save the output image along with its metadata to the specified path. Supports sa
         fname = parse_param(kw, 'fname', EnumConvertType.STRING, "output")
         prompt = parse_param(kw, 'prompt', EnumConvertType.STRING, "")
         pnginfo = parse_param(kw, 'extra_pnginfo', EnumConvertType.DICT, {})
-        params = list(zip_longest_fill(image, path, fname, metadata, usermeta, prompt, pnginfo))
+        format = parse_param(kw, 'format', EnumConvertType.STRING, SAVE_FORMATS[0])
+        level = parse_param(kw, 'compress_level', EnumConvertType.INT, 6, 0, 9)
+        params = list(zip_longest_fill(image, path, fname, metadata, usermeta, prompt, pnginfo, format, level))
         pbar = ProgressBar(len(params))
-        for idx, (image, path, fname, metadata, usermeta, prompt, pnginfo) in enumerate(params):
+        # frames are written on the shared queue, the node only waits when it is full
+        queue = export_queue()
+        failed, errors = queue.drain()
+        if failed:
+            # saves that failed after an earlier run returned, they belong to
+            # that run so they are reported without failing this one
+            logger.warning(f"{failed} earlier save(s) failed: " + "; ".join(errors))
+        for idx, (image, path, fname, metadata, usermeta, prompt, pnginfo, format, level) in enumerate(params):
             if image is None:
                 logger.warning("no image")
                 image = torch.zeros((32, 32, 4), dtype=torch.uint8, device="cpu")
@@ -308,24 +341,31 @@ Save the output image along with its metadata to the specified path. Supports sa
                 logger.error(usermeta)
             metadata["prompt"] = prompt
             metadata["workflow"] = json.dumps(pnginfo)
-            image = tensor2cv(image)
-            image = Image.fromarray(np.clip(image, 0, 255).astype(np.uint8))
-            meta_png = PngInfo()
-            for x in metadata:
-                try:
-                    data = json.dumps(metadata[x])
-                    meta_png.add_text(x, data)
-                except Exception as e:
-                    logger.error(e)
-                    logger.error(x)
+
+            def frame(image=image) -> Image.Image:
+                image = tensor2cv(image)
+                return Image.fromarray(np.clip(image, 0, 255).astype(np.uint8))
+
+            if format == "tiff":
+                save = {"tiffinfo": {270: json.dumps(metadata)}}
+            else:
+                format = "png"
+                meta_png = PngInfo()
+                for x in metadata:
+                    try:
+                        data = json.dumps(metadata[x])
+                        meta_png.add_text(x, data)
+                    except Exception as e:
+                        logger.error(e)
+                        logger.error(x)
+                save = {"pnginfo": meta_png, "compress_level": level}
             if path == "" or path is None:
                 path = get_output_directory()
             root = Path(path)
             if not root.exists():
                 root = Path(get_output_directory())
             root.mkdir(parents=True, exist_ok=True)
-            fname = (root / fname).with_suffix(".png")
-            logger.info(f"wrote file: {fname}")
-            image.save(fname, pnginfo=meta_png)
+            fname = (root / fname).with_suffix(f".{format}")
+            queue.submit(fname, frame, **save)
             pbar.update_absolute(idx)
         return ()
@@ -2,12 +2,11 @@
 Jovimetrix - Animation Support
 """
 
-import inspect
 from enum import Enum
-from typing import Tuple, Union
+from typing import Dict, Tuple, Union
 
 import numpy as np
-from numba import jit
+from numba import jit, vectorize
 
 __all__ = ["Ease", "Wave"]
 
@@ -21,8 +20,6 @@ class BadOperatorException(Exception):
     """Exception for bad operators."""
     pass
 
-MODULE = inspect.getmodule(inspect.currentframe())
-
 # ==============================================================================
 # === EASING ===
 # ==============================================================================
@@ -68,161 +65,193 @@ class EnumEase(Enum):
     BOUNCE_OUT = 101
     BOUNCE_IN_OUT = 102
 
-@jit(nopython=True, cache=True)
+# every easing and wave function is a ufunc: it takes a scalar or an array of
+# any shape and evaluates the whole array in one call
+EASE_SIGNATURE = ["float64(float64)"]
+
+@vectorize(EASE_SIGNATURE, cache=True)
 def ease_quad_in(t: TYPE_NUMBER) -> TYPE_NUMBER:
     return t * t
 
-@jit(nopython=True, cache=True)
+@vectorize(EASE_SIGNATURE, cache=True)
 def ease_quad_out(t: TYPE_NUMBER) -> TYPE_NUMBER:
     return -(t * (t - 2))
 
-@jit(nopython=True, cache=True)
+@vectorize(EASE_SIGNATURE, cache=True)
 def ease_quad_in_out(t: TYPE_NUMBER) -> TYPE_NUMBER:
-    return np.where(t < 0.5, 2 * t * t, (-2 * t * t) + (4 * t) - 1)
+    if t < 0.5:
+        return 2 * t * t
+    return (-2 * t * t) + (4 * t) - 1
 
-@jit(nopython=True, cache=True)
+@vectorize(EASE_SIGNATURE, cache=True)
 def ease_cubic_in(t: TYPE_NUMBER) -> TYPE_NUMBER:
     return t * t * t
 
-@jit(nopython=True, cache=True)
+@vectorize(EASE_SIGNATURE, cache=True)
 def ease_cubic_out(t: TYPE_NUMBER) -> TYPE_NUMBER:
     return (t - 1) * (t - 1) * (t - 1) + 1
 
-@jit(nopython=True, cache=True)
+@vectorize(EASE_SIGNATURE, cache=True)
 def ease_cubic_in_out(t: np.ndarray) -> np.ndarray:
-    return np.where(t < 0.5, 4 * t * t * t,
-                    0.5 * (2 * t - 2) * (2 * t - 2) * (2 * t - 2) + 1)
+    if t < 0.5:
+        return 4 * t * t * t
+    return 0.5 * (2 * t - 2) * (2 * t - 2) * (2 * t - 2) + 1
 
-@jit(nopython=True, cache=True)
+@vectorize(EASE_SIGNATURE, cache=True)
 def ease_quartic_in(t: np.ndarray) -> np.ndarray:
     return t * t * t * t
 
-@jit(nopython=True, cache=True)
+@vectorize(EASE_SIGNATURE, cache=True)
 def ease_quartic_out(t: np.ndarray) -> np.ndarray:
     return (t - 1) * (t - 1) * (t - 1) * (1 - t) + 1
 
-@jit(nopython=True, cache=True)
+@vectorize(EASE_SIGNATURE, cache=True)
 def ease_quartic_in_out(t: np.ndarray) -> np.ndarray:
-    return np.where(t < 0.5, 8 * t * t * t * t,
-                    -8 * (t - 1) * (t - 1) * (t - 1) * (t - 1) + 1)
+    if t < 0.5:
+        return 8 * t * t * t * t
+    return -8 * (t - 1) * (t - 1) * (t - 1) * (t - 1) + 1
 
-@jit(nopython=True, cache=True)
+@vectorize(EASE_SIGNATURE, cache=True)
 def ease_quintic_in(t: np.ndarray) -> np.ndarray:
     return t * t * t * t * t
 
-@jit(nopython=True, cache=True)
+@vectorize(EASE_SIGNATURE, cache=True)
 def ease_quintic_out(t: np.ndarray) -> np.ndarray:
     return (t - 1) * (t - 1) * (t - 1) * (t - 1) * (t - 1) + 1
 
-@jit(nopython=True, cache=True)
+@vectorize(EASE_SIGNATURE, cache=True)
 def ease_quintic_in_out(t: np.ndarray) -> np.ndarray:
-    return np.where(t < 0.5, 16 * t * t * t * t * t,
-                    0.5 * (2 * t - 2) * (2 * t - 2) * (2 * t - 2) * (2 * t - 2) + 1)
+    if t < 0.5:
+        return 16 * t * t * t * t * t
+    return 0.5 * (2 * t - 2) * (2 * t - 2) * (2 * t - 2) * (2 * t - 2) + 1
 
-@jit(nopython=True, cache=True)
+@vectorize(EASE_SIGNATURE, cache=True)
 def ease_sin_in(t: np.ndarray) -> np.ndarray:
     return np.sin((t - 1) * np.pi * 0.5) + 1
 
-@jit(nopython=True, cache=True)
+@vectorize(EASE_SIGNATURE, cache=True)
 def ease_sin_out(t: np.ndarray) -> np.ndarray:
     return np.sin(t * np.pi * 0.5)
 
-@jit(nopython=True, cache=True)
+@vectorize(EASE_SIGNATURE, cache=True)
 def ease_sin_in_out(t: np.ndarray) -> np.ndarray:
     return 0.5 * (1 - np.cos(t * np.pi))
 
-@jit(nopython=True, cache=True)
+@vectorize(EASE_SIGNATURE, cache=True)
 def ease_circular_in(t: np.ndarray) -> np.ndarray:
     return 1 - np.sqrt(1 - (t * t))
 
-@jit(nopython=True, cache=True)
+@vectorize(EASE_SIGNATURE, cache=True)
 def ease_circular_out(t: np.ndarray) -> np.ndarray:
     return np.sqrt((2 - t) * t)
 
-@jit(nopython=True, cache=True)
+@vectorize(EASE_SIGNATURE, cache=True)
 def ease_circular_in_out(t: np.ndarray) -> np.ndarray:
-    return np.where(t < 0.5, 0.5 * (1 - np.sqrt(1 - 4 * (t * t))),
-                    0.5 * (np.sqrt(-((2 * t) - 3) * ((2 * t) - 1)) + 1))
+    if t < 0.5:
+        return 0.5 * (1 - np.sqrt(1 - 4 * (t * t)))
+    return 0.5 * (np.sqrt(-((2 * t) - 3) * ((2 * t) - 1)) + 1)
 
-@jit(nopython=True, cache=True)
+@vectorize(EASE_SIGNATURE, cache=True)
 def ease_exponential_in(t: np.ndarray) -> np.ndarray:
-    return np.where(t == 0, 0, np.power(2, 10 * (t - 1)))
+    if t == 0:
+        return 0.
+    return np.power(2, 10 * (t - 1))
 
-@jit(nopython=True, cache=True)
+@vectorize(EASE_SIGNATURE, cache=True)
 def ease_exponential_out(t: np.ndarray) -> np.ndarray:
-    return np.where(t == 1, 1, 1 - np.power(2, -10 * t))
+    if t == 1:
+        return 1.
+    return 1 - np.power(2, -10 * t)
 
-@jit(nopython=True, cache=True)
+@vectorize(EASE_SIGNATURE, cache=True)
 def ease_exponential_in_out(t: np.ndarray) -> np.ndarray:
-    return np.where(t == 0, t, np.where(t < 0.5, 0.5 * np.power(2, (20 * t) - 10),
-                                        -0.5 * np.power(2, (-20 * t) + 10) + 1))
+    if t == 0:
+        return t
+    if t < 0.5:
+        return 0.5 * np.power(2, (20 * t) - 10)
+    return -0.5 * np.power(2, (-20 * t) + 10) + 1
 
-@jit(nopython=True, cache=True)
+@vectorize(EASE_SIGNATURE, cache=True)
 def ease_elastic_in(t: np.ndarray) -> np.ndarray:
     return np.sin(13 * np.pi * 0.5 * t) * np.power(2, 10 * (t - 1))
 
-@jit(nopython=True, cache=True)
+@vectorize(EASE_SIGNATURE, cache=True)
 def ease_elastic_out(t: np.ndarray) -> np.ndarray:
     return np.sin(-13 * np.pi * 0.5 * (t + 1)) * np.power(2, -10 * t) + 1
 
-@jit(nopython=True, cache=True)
+@vectorize(EASE_SIGNATURE, cache=True)
 def ease_elastic_in_out(t: np.ndarray) -> np.ndarray:
-    return np.where(t < 0.5, 0.5 * np.sin(13 * np.pi * 0.5 * (2 * t)) * np.power(2, 10 * ((2 * t) - 1)),
-                    0.5 * (np.sin(-13 * np.pi * 0.5 * ((2 * t - 1) + 1)) * np.power(2, -10 * (2 * t - 1)) + 2))
+    if t < 0.5:
+        return 0.5 * np.sin(13 * np.pi * 0.5 * (2 * t)) * np.power(2, 10 * ((2 * t) - 1))
+    return 0.5 * (np.sin(-13 * np.pi * 0.5 * ((2 * t - 1) + 1)) * np.power(2, -10 * (2 * t - 1)) + 2)
 
-@jit(nopython=True, cache=True)
+@vectorize(EASE_SIGNATURE, cache=True)
 def ease_back_in(t: np.ndarray) -> np.ndarray:
     return t * t * t - t * np.sin(t * np.pi)
 
-@jit(nopython=True, cache=True)
+@vectorize(EASE_SIGNATURE, cache=True)
 def ease_back_out(t: np.ndarray) -> np.ndarray:
     p = 1 - t
     return 1 - (p * p * p - p * np.sin(p * np.pi))
 
-@jit(nopython=True, cache=True)
+@vectorize(EASE_SIGNATURE, cache=True)
 def ease_back_in_out(t: np.ndarray) -> np.ndarray:
-    return np.where(t < 0.5, 0.5 * (2 * t) * (2 * t) * (2 * t) - (2 * t) * np.sin((2 * t) * np.pi),
-                    0.5 * (1 - (2 * t - 1)) * (1 - (2 * t - 1)) * (1 - (2 * t - 1)) - (1 - (2 * t - 1)) * np.sin((1 - (2 * t - 1)) * np.pi) + 0.5)
-
-@jit(nopython=True, cache=True)
+    if t < 0.5:
+        return 0.5 * (2 * t) * (2 * t) * (2 * t) - (2 * t) * np.sin((2 * t) * np.pi)
+    return 0.5 * (1 - (2 * t - 1)) * (1 - (2 * t - 1)) * (1 - (2 * t - 1)) - (1 - (2 * t - 1)) * np.sin((1 - (2 * t - 1)) * np.pi) + 0.5
+
+@jit(nopython=True, cache=True)
+def bounce(t: float) -> float:
+    """Scalar bounce out, shared by the bounce ufuncs."""
+    if t < 4 / 11:
+        return 121 * t * t / 16
+    if t < 8 / 11:
+        return (363 / 40.0 * t * t) - (99 / 10.0 * t) + 17 / 5.0
+    if t < 9 / 10:
+        return (4356 / 361.0 * t * t) - (35442 / 1805.0 * t) + 16061 / 1805.0
+    return (54 / 5.0 * t * t) - (513 / 25.0 * t) + 268 / 25.0
+
+@vectorize(EASE_SIGNATURE, cache=True)
 def ease_bounce_in(t: np.ndarray) -> np.ndarray:
-    return 1 - ease_bounce_out(1 - t)
+    return 1 - bounce(1 - t)
 
-@jit(nopython=True, cache=True)
+@vectorize(EASE_SIGNATURE, cache=True)
 def ease_bounce_out(t: np.ndarray) -> np.ndarray:
-    return np.where(t < 4 / 11, 121 * t * t / 16,
-        np.where(t < 8 / 11, (363 / 40.0 * t * t) - (99 / 10.0 * t) + 17 / 5.0,
-        np.where(t < 9 / 10, (4356 / 361.0 * t * t) - (35442 / 1805.0 * t) + 16061 / 1805.0,
-                (54 / 5.0 * t * t) - (513 / 25.0 * t) + 268 / 25.0)))
+    return bounce(t)
 
-@jit(nopython=True, cache=True)
+@vectorize(EASE_SIGNATURE, cache=True)
 def ease_bounce_in_out(t: np.ndarray) -> np.ndarray:
-    return np.where(t < 0.5, 0.5 * ease_bounce_in(t * 2), 0.5 * ease_bounce_out(t * 2 - 1) + 0.5)
+    if t < 0.5:
+        return 0.5 * (1 - bounce(1 - t * 2))
+    return 0.5 * bounce(t * 2 - 1) + 0.5
+
+EASE: Dict[EnumEase, np.ufunc] = {op: globals()[f"ease_{op.name.lower()}"] for op in EnumEase}
 
 def ease_op(op: EnumEase,
-            start: float=0, end: float=1, duration: float=1,
-            alpha: float=1., clip: Tuple[int, int]=(0, 1)) -> np.ndarray:
+            start: TYPE_NUMBER=0, end: TYPE_NUMBER=1, duration: float=1,
+            alpha: TYPE_NUMBER=1., clip: Tuple[int, int]=(0, 1)) -> np.ndarray:
     """
     Compute eased values.
 
     Parameters:
         op (EaseOP): Easing operator.
-        start (float): Starting value.
-        end (float): Ending value.
+        start (TYPE_NUMBER): Starting value(s).
+        end (TYPE_NUMBER): Ending value(s).
         duration (float): Duration of the easing.
-        alpha (float): Alpha values.
+        alpha (TYPE_NUMBER): Alpha value(s), any shape that broadcasts with start and end.
         clip (Tuple[int, int]): Clip range.
 
     Returns:
         TYPE_NUMBER: Eased value(s)
     """
-    if (func := getattr(MODULE, f"ease_{op.name.lower()}", None)) is None:
+    if (func := EASE.get(op, None)) is None:
         raise BadOperatorException(op.name)
+    alpha = np.asarray(alpha, dtype=np.float64)
     t = clip[0] * (1 - alpha) + clip[1] * alpha
     duration = max(min(duration, 1), 0)
     t /= duration
     a = func(t)
-    return end * a + start * (1 - a)
+    return np.asarray(end) * a + np.asarray(start) * (1 - a)
 
 # ==============================================================================
 # === WAVE FUNCTIONS SIMPLE ===
@@ -246,47 +275,58 @@ class EnumWave(Enum):
     GAUSSIAN = 90
     CHIRP = 100
 
+WAVE_SIGNATURE = ["float64(float64, float64, float64, float64, float64)"]
+
 @jit(nopython=True, cache=True)
+def heaviside(x: float) -> float:
+    """np.heaviside(x, 1) for one value, numba has no heaviside."""
+    if x < 0:
+        return 0.
+    if x >= 0:
+        return 1.
+    return x
+
+@vectorize(WAVE_SIGNATURE, cache=True)
 def wave_sin(phase: float, frequency: float, amplitude: float, offset: float,
             timestep: float) -> float:
     return amplitude * np.sin(frequency * np.pi * 2 * timestep + phase) + offset
 
-@jit(nopython=True, cache=True)
+@vectorize(WAVE_SIGNATURE, cache=True)
 def wave_cos(phase: float, frequency: float, amplitude: float, offset: float,
             timestep: float) -> float:
     return amplitude * np.cos(frequency * np.pi * 2 * timestep + phase) + offset
 
-@jit(nopython=True, cache=True)
+@vectorize(WAVE_SIGNATURE, cache=True)
 def wave_tan(phase: float, frequency: float, amplitude: float, offset: float,
             timestep: float) -> float:
     return amplitude * np.tan(frequency * np.pi * 2 * timestep + phase) + offset
 
-@jit(nopython=True, cache=True)
+@vectorize(WAVE_SIGNATURE, cache=True)
 def wave_sawtooth(phase: float, frequency: float, amplitude: float, offset: float,
                 timestep: float) -> float:
     return amplitude * (2 * (frequency * timestep + phase) % 1 - 0.5) + offset
 
-@jit(nopython=True, cache=True)
+@vectorize(WAVE_SIGNATURE, cache=True)
 def wave_triangle(phase: float, frequency: float, amplitude: float, offset: float,
                 timestep: float) -> float:
     return amplitude * (4 * np.abs((frequency * timestep + phase) % 1 - 0.5) - 1) + offset
 
-@jit(nopython=True, cache=True)
+@vectorize(WAVE_SIGNATURE, cache=True)
 def wave_ramp(phase: float, frequency: float, amplitude: float, offset: float,
             timestep: float) -> float:
     return amplitude * (frequency * timestep + phase % 1) + offset
 
-@jit(nopython=True, cache=True)
+@vectorize(WAVE_SIGNATURE, cache=True)
 def wave_step(phase: float, frequency: float, amplitude: float, offset: float,
             timestep: float) -> float:
-    return amplitude * np.heaviside(frequency * timestep + phase, 1) + offset
+    return amplitude * heaviside(frequency * timestep + phase) + offset
 
-@jit(nopython=True, cache=True)
+@vectorize(WAVE_SIGNATURE, cache=True)
 def wave_haversine(phase: float, frequency: float, amplitude: float, offset: float,
                 timestep: float) -> float:
     return amplitude * (1 - np.cos(frequency * np.pi * 2 * (timestep + phase))) + offset
 
-@jit(nopython=True, cache=True)
+@vectorize(WAVE_SIGNATURE, cache=True)
 def wave_noise(phase: float, frequency: float, amplitude: float, offset: float,
             timestep: float) -> float:
     return amplitude * np.random.uniform(-1, 1) + offset
@@ -295,52 +335,61 @@ def wave_noise(phase: float, frequency: float, amplitude: float, offset: float,
 # === WAVE FUNCTIONS COMPLEX ===
 # ==============================================================================
 
-@jit(nopython=True, cache=True)
+@vectorize(WAVE_SIGNATURE, cache=True)
 def wave_square(phase: float, frequency: float, amplitude: float, offset: float,
                 timestep: float) -> float:
     return amplitude * np.sign(np.sin(np.pi * 2 * timestep + phase) - frequency) + offset
 
-@jit(nopython=True, cache=True)
+@vectorize(WAVE_SIGNATURE, cache=True)
 def wave_exponential(phase: float, frequency: float, amplitude: float,
                     offset: float, timestep: float) -> float:
     return amplitude * np.exp(-frequency * (timestep + phase)) + offset
 
-@jit(nopython=True, cache=True)
+@vectorize(WAVE_SIGNATURE, cache=True)
 def wave_rectangular_pulse(phase: float, frequency: float, amplitude: float,
                         offset: float, timestep: float) -> float:
-    return amplitude * np.heaviside(timestep + phase, 1) * np.heaviside(-(timestep + phase) + frequency, 1) + offset
+    return amplitude * heaviside(timestep + phase) * heaviside(-(timestep + phase) + frequency) + offset
 
-@jit(nopython=True, cache=True)
+@vectorize(WAVE_SIGNATURE, cache=True)
 def wave_logarithmic(phase: float, frequency: float, amplitude: float, offset: float,
                     timestep: float) -> float:
-    return amplitude * np.log10(timestep + phase) / np.max(1, np.log10(frequency)) + offset
+    return amplitude * np.log10(timestep + phase) / max(1., np.log10(frequency)) + offset
 
-@jit(nopython=True, cache=True)
+@vectorize(WAVE_SIGNATURE, cache=True)
 def wave_chirp(phase: float, frequency: float, amplitude: float, offset: float,
             timestep: float) -> float:
     return amplitude * np.sin(np.pi * 2 * frequency * (timestep + phase)**2) + offset
 
 ####
 
-@jit(nopython=True, cache=True)
+@vectorize(["float64(float64, float64, float64, float64, float64, float64)"], cache=True)
 def wave_gaussian(phase: float, mean: float, amplitude: float, offset: float,
-                timestep: float, std_dev: float = 1) -> float:
+                timestep: float, std_dev: float) -> float:
     return amplitude * np.exp(-0.5 * ((timestep + phase - mean) / std_dev)**2) + offset
 
-def wave_op(op: EnumEase, phase: float, frequency: float, amplitude: float,
-            offset: float, timestep: float, std_dev: float=1) -> np.ndarray:
-
-    op = op.name.lower()
-    if (func := getattr(MODULE, f"wave_{op}", None)) is None:
-        raise BadOperatorException(str(op))
-    """
-    phase = float(phase)
-    frequency = float(frequency)
-    amplitude = float(amplitude)
-    offset = float(offset)
-    timestep = float(timestep)
-    std_dev = float(std_dev)
-    """
-    if op.endswith('gaussian'):
+WAVE: Dict[EnumWave, np.ufunc] = {
+    EnumWave.SIN: wave_sin,
+    EnumWave.COS: wave_cos,
+    EnumWave.TAN: wave_tan,
+    EnumWave.SAWTOOTH: wave_sawtooth,
+    EnumWave.TRIANGLE: wave_triangle,
+    EnumWave.SQUARE: wave_square,
+    EnumWave.RAMP: wave_ramp,
+    EnumWave.STEP: wave_step,
+    EnumWave.EXPONENTIAL: wave_exponential,
+    EnumWave.LOGARITHMIC: wave_logarithmic,
+    EnumWave.NOISE: wave_noise,
+    EnumWave.HAVERSINE: wave_haversine,
+    EnumWave.RECTANGULAR_PULSE: wave_rectangular_pulse,
+    EnumWave.GAUSSIAN: wave_gaussian,
+    EnumWave.CHIRP: wave_chirp,
+}
+
+def wave_op(op: EnumWave, phase: TYPE_NUMBER, frequency: TYPE_NUMBER, amplitude: TYPE_NUMBER,
+            offset: TYPE_NUMBER, timestep: TYPE_NUMBER, std_dev: TYPE_NUMBER=1) -> np.ndarray:
+    """Wave value(s), every argument but op broadcasts so a whole schedule is one call."""
+    if (func := WAVE.get(op, None)) is None:
+        raise BadOperatorException(op.name)
+    if op == EnumWave.GAUSSIAN:
         return func(phase, frequency, amplitude, offset, timestep, std_dev)
     return func(phase, frequency, amplitude, offset, timestep)
@@ -0,0 +1,145 @@
+"""
+Jovimetrix - CACHE support
+"""
+
+import sys
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Callable, Dict, Hashable, List
+
+import numpy as np
+import torch
+
+from loguru import logger
+
+# ==============================================================================
+# === SUPPORT ===
+# ==============================================================================
+
+def cache_sizeof(value: Any) -> int:
+    """Rough byte size of a cached value; exact for arrays and tensors."""
+    if isinstance(value, np.ndarray):
+        return value.nbytes
+    if isinstance(value, torch.Tensor):
+        return value.element_size() * value.nelement()
+    if isinstance(value, (tuple, list)):
+        return sum(cache_sizeof(v) for v in value)
+    return sys.getsizeof(value)
+
+# ==============================================================================
+# === CLASS ===
+# ==============================================================================
+
+class CacheLRU:
+    """Byte bounded least-recently-used cache with a background loader pool.
+
+    Entries are evicted oldest first once the total size passes the budget.
+    Values larger than the whole budget are handed back but never stored.
+    `prefetch` loads keys on worker threads so a later `get` finds them ready.
+    `clear` bumps a generation, a load still in flight from before it is
+    handed to its caller but not stored.
+    """
+    def __init__(self, budget_mb: int=512, workers: int=2) -> None:
+        self.__budget = max(0, budget_mb) * 1024 * 1024
+        self.__size = 0
+        self.__data: OrderedDict[Hashable, Any] = OrderedDict()
+        self.__sizes: Dict[Hashable, int] = {}
+        self.__pending: Dict[Hashable, Future] = {}
+        self.__lock = threading.RLock()
+        self.__generation = 0
+        self.__pool = ThreadPoolExecutor(max_workers=max(1, workers), thread_name_prefix="jov_cache") \
+            if workers > 0 else None
+        self.__hit = 0
+        self.__miss = 0
+        self.__evict = 0
+
+    def __contains__(self, key: Hashable) -> bool:
+        with self.__lock:
+            return key in self.__data
+
+    def __len__(self) -> int:
+        return len(self.__data)
+
+    def __store(self, key: Hashable, value: Any, generation: int) -> None:
+        size = cache_sizeof(value)
+        with self.__lock:
+            if generation != self.__generation:
+                return
+            if key in self.__data:
+                self.__size -= self.__sizes.pop(key)
+                del self.__data[key]
+            if size > self.__budget:
+                return
+            self.__data[key] = value
+            self.__sizes[key] = size
+            self.__size += size
+            while self.__size > self.__budget and len(self.__data):
+                old, _ = self.__data.popitem(last=False)
+                self.__size -= self.__sizes.pop(old)
+                self.__evict += 1
+
+    def __load(self, key: Hashable, loader: Callable[[Hashable], Any], generation: int) -> Any:
+        try:
+            value = loader(key)
+        finally:
+            with self.__lock:
+                # a clear dropped this entry, a newer prefetch may own the key now
+                if generation == self.__generation:
+                    self.__pending.pop(key, None)
+        self.__store(key, value, generation)
+        return value
+
+    def get(self, key: Hashable, loader: Callable[[Hashable], Any]) -> Any:
+        """Return the cached value for key, loading it with `loader(key)` on a miss."""
+        with self.__lock:
+            if key in self.__data:
+                self.__data.move_to_end(key)
+                self.__hit += 1
+                return self.__data[key]
+            future = self.__pending.get(key, None)
+            generation = self.__generation
+            if future is None:
+                self.__miss += 1
+            else:
+                # already in flight from a prefetch, the decode cost is hidden
+                self.__hit += 1
+
+        if future is not None:
+            try:
+                return future.result()
+            except Exception as e:
+                logger.error(f"prefetch failed {key}: {e}")
+        return self.__load(key, loader, generation)
+
+    def prefetch(self, keys: List[Hashable], loader: Callable[[Hashable], Any]) -> None:
+        """Queue keys to load in the background if they are not cached or in flight."""
+        if self.__pool is None:
+            return
+        with self.__lock:
+            for key in keys:
+                if key in self.__data or key in self.__pending:
+                    continue
+                self.__pending[key] = self.__pool.submit(self.__load, key, loader, self.__generation)
+
+    def clear(self) -> None:
+        with self.__lock:
+            self.__generation += 1
+            for future in self.__pending.values():
+                future.cancel()
+            self.__pending.clear()
+            self.__data.clear()
+            self.__sizes.clear()
+            self.__size = 0
+
+    @property
+    def stats(self) -> Dict[str, int]:
+        with self.__lock:
+            return {
+                "hit": self.__hit,
+                "miss": self.__miss,
+                "evict": self.__evict,
+                "count": len(self.__data),
+                "size": self.__size,
+                "budget": self.__budget
+            }
@@ -0,0 +1,269 @@
+"""
+Jovimetrix - EXPORT support
+"""
+
+import os
+import atexit
+import threading
+from pathlib import Path
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Callable, Deque, Dict, Generator, Iterable, List, Optional, Sequence, Tuple
+
+import torch
+from PIL import Image, GifImagePlugin
+
+from loguru import logger
+
+from .image import tensor2pil
+
+# ==============================================================================
+
+# threads that encode and write still frames
+JOV_EXPORT_WORKERS = min(4, os.cpu_count() or 1)
+try: JOV_EXPORT_WORKERS = max(1, int(os.getenv("JOV_EXPORT_WORKERS", JOV_EXPORT_WORKERS)))
+except: pass
+
+# frames the shared save queue holds before a node has to wait for the disk
+JOV_SAVE_PENDING = 32
+try: JOV_SAVE_PENDING = max(1, int(os.getenv("JOV_SAVE_PENDING", JOV_SAVE_PENDING)))
+except: pass
+
+# failed writes a writer remembers until the next flush, only the messages are
+# kept so a failed frame is not held on to by its traceback
+JOV_EXPORT_ERRORS = 16
+try: JOV_EXPORT_ERRORS = max(1, int(os.getenv("JOV_EXPORT_ERRORS", JOV_EXPORT_ERRORS)))
+except: pass
+
+# ==============================================================================
+# === EXCEPTIONAL ===
+# ==============================================================================
+
+class ExportException(Exception):
+    """One or more queued writes failed."""
+    pass
+
+# ==============================================================================
+# === CLASS ===
+# ==============================================================================
+
+class ExportSequence(Image.Image):
+    """Multi frame PIL image over a list of frames.
+
+    Only the frame at the current seek position is converted, so the encoders
+    that walk a sequence with seek (animated WebP) hold one frame at a time.
+    """
+    def __init__(self, frames: Sequence[torch.Tensor]) -> None:
+        super().__init__()
+        self.__frames = frames
+        self.__frame = -1
+        self.n_frames = len(frames)
+        self.is_animated = self.n_frames > 1
+        self.seek(0)
+
+    def seek(self, frame: int) -> None:
+        if frame == self.__frame:
+            return
+        if not 0 <= frame < self.n_frames:
+            raise EOFError("no more frames")
+        img = tensor2pil(self.__frames[frame])
+        self.im = img.im
+        self._mode = img.mode
+        self._size = img.size
+        self.palette = None
+        self.info = {}
+        self.__frame = frame
+
+    def tell(self) -> int:
+        return self.__frame
+
+class ExportWriter:
+    """Thread pool that encodes and writes single images.
+
+    At most `pending` frames are queued at once, `submit` blocks until a slot
+    frees up so the memory used stays flat no matter how long the batch is.
+    Writes to the same file keep their submit order. `flush` waits for what
+    is queued and raises an ExportException naming the writes that failed
+    since the last flush, `drain` hands those back without waiting or
+    raising and `close` also stops the threads. With `verbose` every
+    finished write is logged.
+    """
+    def __init__(self, workers: int=JOV_EXPORT_WORKERS, pending: Optional[int]=None,
+                 verbose: bool=False) -> None:
+        workers = max(1, workers)
+        self.__pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="jov_export")
+        self.__slots = threading.Semaphore(pending or workers * 2)
+        self.__lock = threading.Lock()
+        self.__files: Dict[str, Future] = {}
+        self.__futures: List[Future] = []
+        self.__errors: Deque[str] = deque(maxlen=JOV_EXPORT_ERRORS)
+        self.__failed = 0
+        self.__verbose = verbose
+        self.__count = 0
+
+    def __enter__(self) -> "ExportWriter":
+        return self
+
+    def __exit__(self, *arg) -> None:
+        self.close()
+
+    def __write(self, fname: str, frame: Callable[[], Image.Image], previous: Optional[Future],
+                kw: Dict[str, Any]) -> None:
+        try:
+            if previous is not None:
+                previous.exception()
+            frame().save(fname, **kw)
+            if self.__verbose:
+                logger.info(f"wrote file: {fname}")
+        except Exception as e:
+            logger.error(f"export failed {fname}: {e}")
+            # do not leave the empty placeholder of a failed write behind
+            if os.path.isfile(fname) and os.path.getsize(fname) == 0:
+                os.remove(fname)
+            # the message only, raising here would keep the frame alive in the
+            # traceback for as long as the future is around
+            with self.__lock:
+                self.__errors.append(f"{fname}: {e}")
+                self.__failed += 1
+        finally:
+            self.__slots.release()
+
+    def submit(self, fname: str | Path, frame: Callable[[], Image.Image], **kw) -> Future:
+        """Queue `frame().save(fname, **kw)`, frame runs on the writer thread."""
+        fname = str(fname)
+        self.__slots.acquire()
+        with self.__lock:
+            # finished writes are only kept around until the next submit
+            self.__futures = [f for f in self.__futures if not f.done()]
+            self.__files = {k: f for k, f in self.__files.items() if not f.done()}
+            future = self.__pool.submit(self.__write, fname, frame, self.__files.get(fname, None), kw)
+            self.__files[fname] = future
+            self.__futures.append(future)
+            self.__count += 1
+        return future
+
+    def flush(self) -> int:
+        """Wait for the queued writes, returns how many frames were submitted."""
+        with self.__lock:
+            futures = list(self.__futures)
+        for future in futures:
+            future.exception()
+        failed, errors = self.drain()
+        if failed:
+            raise ExportException(f"{failed} write(s) failed: " + "; ".join(errors))
+        return self.__count
+
+    def drain(self) -> Tuple[int, List[str]]:
+        """Take the failed writes since the last flush without waiting or raising.
+
+        Returns the count and the last JOV_EXPORT_ERRORS messages, both start
+        over from zero.
+        """
+        with self.__lock:
+            errors, failed = list(self.__errors), self.__failed
+            self.__errors.clear()
+            self.__failed = 0
+        return failed, errors
+
+    def close(self) -> int:
+        """Flush and stop the writer threads."""
+        try:
+            return self.flush()
+        finally:
+            self.__pool.shutdown(wait=True)
+
+    @property
+    def pending(self) -> int:
+        with self.__lock:
+            return sum(1 for f in self.__futures if not f.done())
+
+    @property
+    def failed(self) -> int:
+        """Writes that failed since the last flush."""
+        with self.__lock:
+            return self.__failed
+
+# ==============================================================================
+# === SUPPORT ===
+# ==============================================================================
+
+def export_frames(images: Iterable[torch.Tensor]) -> Generator[Image.Image, None, None]:
+    """Convert frames to PIL as they are consumed."""
+    for image in images:
+        yield tensor2pil(image)
+
+def export_gif(frames: Iterable[Image.Image], fname: str | Path, fps: int=24,
+               loop: int=0, disposal: int=2) -> int:
+    """Write an animated GIF one frame at a time.
+
+    Each frame is quantized on its own like PIL does, with the first palette
+    as the global table and a local table for every frame after it. Frames
+    are not diffed against each other; use PIL `save_all` with optimize for
+    the smaller file. Returns the frame count.
+    """
+    duration = 1 / fps * 1000 if fps else 0
+    count = 0
+    with open(fname, "wb") as fd:
+        for frame in frames:
+            if frame.mode not in ("1", "L", "P"):
+                if Image.getmodebase(frame.mode) == "RGB":
+                    frame = frame.convert("P", palette=Image.Palette.ADAPTIVE)
+                    if frame.palette.mode == "RGBA":
+                        for rgba in frame.palette.colors:
+                            if rgba[3] == 0:
+                                frame.info["transparency"] = frame.palette.colors[rgba]
+                                break
+                else:
+                    frame = frame.convert("L")
+
+            info = {"loop": loop}
+            header, _ = GifImagePlugin.getheader(frame, None, info)
+            if count == 0:
+                for data in header:
+                    fd.write(data)
+
+            params = {"duration": duration, "disposal": disposal}
+            if "transparency" in frame.info:
+                params["transparency"] = frame.info["transparency"]
+            if count > 0:
+                params["include_color_table"] = True
+            for data in GifImagePlugin.getdata(frame, (0, 0), **params):
+                fd.write(data)
+            count += 1
+        fd.write(b";")
+    return count
+
+def export_webp(frames: Sequence[torch.Tensor], fname: str | Path, fps: int=24,
+                loop: int=0, quality: int=90) -> int:
+    """Write an animated WebP, the frames are converted as the encoder asks for them."""
+    sequence = ExportSequence(frames)
+    sequence.save(fname, format="WEBP", save_all=True, loop=loop, quality=quality,
+                  duration=int(1 / fps * 1000) if fps else 0)
+    return sequence.n_frames
+
+_EXPORT_QUEUE: Optional[ExportWriter] = None
+_EXPORT_QUEUE_LOCK = threading.Lock()
+
+def export_queue() -> ExportWriter:
+    """Writer shared by every run so a node can return before its frames are
+    on disk. It is flushed when the process exits."""
+    global _EXPORT_QUEUE
+    with _EXPORT_QUEUE_LOCK:
+        if _EXPORT_QUEUE is None:
+            _EXPORT_QUEUE = ExportWriter(JOV_EXPORT_WORKERS, JOV_SAVE_PENDING, verbose=True)
+            atexit.register(export_queue_close)
+        return _EXPORT_QUEUE
+
+def export_queue_close() -> None:
+    """Wait for the queued saves and stop the shared writer."""
+    global _EXPORT_QUEUE
+    with _EXPORT_QUEUE_LOCK:
+        queue, _EXPORT_QUEUE = _EXPORT_QUEUE, None
+    if queue is None:
+        return
+    if (count := queue.pending) > 0:
+        logger.info(f"flushing {count} queued saves")
+    try:
+        queue.close()
+    except Exception as e:
+        logger.error(str(e))
@@ -5,13 +5,15 @@ Image Support
 import math
 import base64
 import requests
+import functools
 from enum import Enum
 from io import BytesIO
-from typing import List, Tuple, Union
+from typing import Callable, List, Optional, Tuple, Union
 
 import cv2
 import torch
 import numpy as np
+from numba import njit, prange
 from PIL import Image, ImageOps
 
 from ... import RGBAMaskType
@@ -101,8 +103,12 @@ def cv2pil(image: TYPE_IMAGE) -> Image.Image:
             image = np.squeeze(image, axis=-1)
     return Image.fromarray(image)
 
-def cv2tensor(image: TYPE_IMAGE, grayscale: bool=False) -> torch.Tensor:
-    """Convert a CV2 image to a torch tensor, with handling for grayscale/mask."""
+def cv2tensor(image: TYPE_IMAGE, grayscale: bool=False, dtype: np.dtype=None) -> torch.Tensor:
+    """Convert a CV2 image to a torch tensor, with handling for grayscale/mask.
+
+    Images are read as 0..255. With `dtype=np.float32` a float32 image is
+    taken to hold 0..1 already, see `image_dtype`.
+    """
     if grayscale or image.ndim < 3 or image.shape[2] == 1:
         if image.ndim < 3:
             image = np.expand_dims(image, -1)
@@ -114,20 +120,122 @@ def cv2tensor(image: TYPE_IMAGE, grayscale: bool=False) -> torch.Tensor:
 
         image = np.squeeze(image, axis=-1)
 
+    if dtype == np.float32 and image.dtype == np.float32:
+        return torch.from_numpy(image)
     image = image.astype(np.float32) / 255.0
     return torch.from_numpy(image)
 
-def cv2tensor_full(image: TYPE_IMAGE, matte:TYPE_PIXEL=(0,0,0,255)) -> RGBAMaskType:
+@functools.lru_cache(maxsize=32)
+def cv2tensor_matte_lut(color: Tuple[int, int, int]) -> np.ndarray:
+    """Float RGB of every (alpha, value) pair composited over the matte color,
+    indexed [alpha, value, channel]. Computed the way `image_matte` blends, so
+    the lookup is exact."""
+    alpha = (np.arange(256) / 255.0)[:, None, None]
+    value = np.arange(256, dtype=np.uint8)[None, :, None]
+    color = np.asarray(color).astype(np.uint8)[None, None, :]
+    blend = ((1 - alpha) * color + alpha * value).astype(np.uint8)
+    return blend.astype(np.float32) / 255.0
+
+@njit(parallel=True, cache=True)
+def cv2tensor_full_kernel(image: TYPE_IMAGE, lut: np.ndarray, rgba: TYPE_IMAGE,
+                          rgb: TYPE_IMAGE, mask: TYPE_IMAGE) -> None:
+    cc = image.shape[1]
+    for i in prange(image.shape[0]):
+        a = image[i, 3] if cc == 4 else 255
+        for c in range(3):
+            value = image[i, min(c, cc - 1)]
+            rgba[i, c] = np.float32(value) / np.float32(255.)
+            rgb[i, c] = lut[a, value, c]
+        alpha = np.float32(a) / np.float32(255.)
+        rgba[i, 3] = alpha
+        mask[i] = alpha
+
+@njit(parallel=True, cache=True)
+def cv2tensor_full_float_kernel(image: TYPE_IMAGE, color: np.ndarray, rgba: TYPE_IMAGE,
+                                rgb: TYPE_IMAGE, mask: TYPE_IMAGE) -> None:
+    cc = image.shape[1]
+    for i in prange(image.shape[0]):
+        a = image[i, 3] if cc == 4 else np.float32(1.)
+        for c in range(3):
+            value = image[i, min(c, cc - 1)]
+            rgba[i, c] = value
+            rgb[i, c] = (1 - a) * color[c] + a * value
+        rgba[i, 3] = a
+        mask[i] = a
+
+def cv2tensor_full(image: TYPE_IMAGE, matte:TYPE_PIXEL=(0,0,0,255),
+                   out: RGBAMaskType=None, dtype: np.dtype=None) -> RGBAMaskType:
+    """RGBA, matte composited RGB and mask float tensors of a BGR(A) image.
+
+    uint8 images are converted in one pass, with the composite looked up per
+    pixel. Images are read as 0..255 unless `dtype=np.float32`, when float32
+    images hold 0..1 and are used as they are. Without `out` the mask is a
+    view of the RGBA alpha.
 
-    rgba = image_convert(image, 4)
-    # rgb = rgba[...,:3]
-    rgb = image_matte(rgba, matte)[...,:3]
-    mask = rgba[...,3]
-    rgba = torch.from_numpy(rgba.astype(np.float32) / 255.0)
-    rgb = torch.from_numpy(rgb.astype(np.float32) / 255.0)
-    mask = torch.from_numpy(mask.astype(np.float32) / 255.0)
+    Args:
+        image (TYPE_IMAGE): Image of 1, 3 or 4 channels, with or without leading batch axes.
+        matte (TYPE_PIXEL): Color the RGB output is composited onto.
+        out (RGBAMaskType): Contiguous rgba, rgb and mask tensors to fill in place,
+            such as the rows of `cv2tensor_full_alloc`.
+        dtype (np.dtype): Working dtype of the caller, see `image_dtype`.
+    """
+    if image.ndim == 2:
+        image = np.expand_dims(image, -1)
+
+    cc = image.shape[-1]
+    if out is None:
+        shape = image.shape[:-1]
+        rgba = torch.empty(shape + (4,), dtype=torch.float32)
+        rgb = torch.empty(shape + (3,), dtype=torch.float32)
+        mask = rgba[..., 3]
+    else:
+        rgba, rgb, mask = out
+
+    if image.dtype == np.uint8:
+        lut = cv2tensor_matte_lut(tuple(int(c) for c in matte[:3]))
+        cv2tensor_full_kernel(image.reshape(-1, cc), lut, rgba.view(-1, 4).numpy(),
+                              rgb.view(-1, 3).numpy(), mask.view(-1).numpy())
+        return rgba, rgb, mask
+
+    if dtype == np.float32 and image.dtype == np.float32:
+        # already 0..1, the composite keeps full precision
+        color = np.asarray(pixel_unit(matte[:3], np.float32), dtype=np.float32)
+        cv2tensor_full_float_kernel(image.reshape(-1, cc), color, rgba.view(-1, 4).numpy(),
+                                    rgb.view(-1, 3).numpy(), mask.view(-1).numpy())
+        return rgba, rgb, mask
+
+    # any other dtype holds 0..255 and blends in float64
+    if cc == 4:
+        data = image
+    else:
+        shape = image.shape[:-1]
+        data = np.concatenate([np.broadcast_to(image[..., :3], shape + (3,)),
+                               np.full(shape + (1,), 255, dtype=image.dtype)], axis=-1)
+    alpha = data[..., 3:4] / 255.0
+    color = np.asarray(matte[:3]).astype(image.dtype)
+    blend = ((1 - alpha) * color + alpha * data[..., :3]).astype(image.dtype)
+    rgba.numpy()[:] = data.astype(np.float32) / 255.0
+    rgb.numpy()[:] = blend.astype(np.float32) / 255.0
+    mask.numpy()[:] = rgba.numpy()[..., 3]
     return rgba, rgb, mask
 
+def cv2tensor_full_alloc(count: int, width: int, height: int) -> RGBAMaskType:
+    """Empty [B,H,W,4], [B,H,W,3] and [B,H,W] outputs for `cv2tensor_full`."""
+    rgba = torch.empty((count, height, width, 4), dtype=torch.float32)
+    rgb = torch.empty((count, height, width, 3), dtype=torch.float32)
+    mask = torch.empty((count, height, width), dtype=torch.float32)
+    return rgba, rgb, mask
+
+def cv2tensor_full_batch(image: TYPE_IMAGE, matte:TYPE_PIXEL=(0,0,0,255)) -> RGBAMaskType:
+    """Batched version of `cv2tensor_full` for a [B,H,W,C] image stack.
+    The conversion and matte composite are done once for the whole batch.
+    """
+    if image.ndim == 3:
+        image = np.expand_dims(image, -1)
+
+    b, h, w = image.shape[:3]
+    return cv2tensor_full(image, matte, cv2tensor_full_alloc(b, w, h))
+
 def hsv2bgr(hsl_color: TYPE_PIXEL) -> TYPE_PIXEL:
     return cv2.cvtColor(np.uint8([[hsl_color]]), cv2.COLOR_HSV2BGR)[0, 0]
 
@@ -159,8 +267,12 @@ def pil2tensor(image: Image.Image) -> torch.Tensor:
     image = np.array(image).astype(np.float32) / 255.0
     return torch.from_numpy(image).unsqueeze(0)
 
-def tensor2cv(tensor: torch.Tensor, invert_mask:bool=True) -> TYPE_IMAGE:
-    """Convert a torch Tensor to a numpy ndarray."""
+def tensor2cv(tensor: torch.Tensor, invert_mask:bool=True, dtype: np.dtype=np.uint8) -> TYPE_IMAGE:
+    """Convert a torch Tensor to a numpy ndarray.
+
+    With `dtype=np.float32` the 0..1 values are kept and a float32 CPU tensor
+    comes back as a view, not a copy.
+    """
     if tensor.ndim > 3:
         raise Exception("Tensor is batch of tensors")
 
@@ -170,6 +282,30 @@ def tensor2cv(tensor: torch.Tensor, invert_mask:bool=True) -> TYPE_IMAGE:
     if tensor.shape[2] == 1 and invert_mask:
         tensor = 1. - tensor
 
+    tensor = tensor.cpu().numpy()
+    if dtype == np.float32:
+        return tensor.astype(np.float32, copy=False)
+    return np.clip(255.0 * tensor, 0, 255).astype(np.uint8)
+
+def tensor2cv_batch(tensor: Union[torch.Tensor, List[torch.Tensor]],
+                    invert_mask:bool=True) -> Optional[TYPE_IMAGE]:
+    """Convert a batch of torch Tensors to a single [B,H,W,C] numpy ndarray.
+    Returns None if the frames are missing or do not share the same shape.
+    """
+    if isinstance(tensor, (list, tuple)):
+        if len(tensor) == 0 or any(t is None for t in tensor):
+            return None
+        shape = tensor[0].shape
+        if any(t.shape != shape for t in tensor):
+            return None
+        tensor = torch.stack(tensor)
+
+    if tensor.ndim < 4:
+        tensor = tensor.unsqueeze(-1)
+
+    if tensor.shape[3] == 1 and invert_mask:
+        tensor = 1. - tensor
+
     tensor = tensor.cpu().numpy()
     return np.clip(255.0 * tensor, 0, 255).astype(np.uint8)
 
@@ -196,6 +332,34 @@ def mixlabLayer2cv(layer: dict) -> torch.Tensor:
 # === IMAGE ===
 # ==============================================================================
 
+def image_dtype(image: TYPE_IMAGE, dtype: np.dtype=None) -> TYPE_IMAGE:
+    """Move an image to a working dtype.
+
+    uint8 images hold 0..255 and float32 images hold 0..1, so a chain of
+    helpers called with `dtype=np.float32` keeps full precision and skips the
+    round trip through uint8. `None` or the image's own dtype returns the
+    image untouched.
+    """
+    if dtype is None or image.dtype == dtype:
+        return image
+    if dtype == np.float32:
+        return image.astype(np.float32) / 255.0
+    if image.dtype == np.float32:
+        return np.clip(255.0 * image, 0, 255).astype(dtype)
+    return image.astype(dtype)
+
+def image_unit(dtype: np.dtype=None) -> float:
+    """Full scale value of a working dtype."""
+    return 1. if dtype == np.float32 else 255.
+
+def pixel_unit(color: TYPE_PIXEL, dtype: np.dtype=None) -> TYPE_PIXEL:
+    """Scale a 0..255 color to the working dtype."""
+    if dtype != np.float32:
+        return color
+    if isinstance(color, (int, float)):
+        return color / 255.
+    return tuple(c / 255. for c in color)
+
 def image_mask(image: TYPE_IMAGE, color: TYPE_PIXEL = 255) -> TYPE_IMAGE:
     """Create a mask from the image, preserving transparency.
 
@@ -224,7 +388,8 @@ def image_mask_add(image:TYPE_IMAGE, mask:TYPE_IMAGE=None, alpha:float=255) -> T
     image[..., 3] = mask if mask.ndim == 2 else mask[:, :, 0]
     return image
 
-def image_matte(image: TYPE_IMAGE, color: TYPE_iRGBA=(0, 0, 0, 255), width: int=None, height: int=None) -> TYPE_IMAGE:
+def image_matte(image: TYPE_IMAGE, color: TYPE_iRGBA=(0, 0, 0, 255), width: int=None,
+                height: int=None, dtype: np.dtype=None) -> TYPE_IMAGE:
     """
     Puts an RGB(A) image atop a colored matte expanding or clipping the image if requested.
 
@@ -233,11 +398,15 @@ def image_matte(image: TYPE_IMAGE, color: TYPE_iRGBA=(0, 0, 0, 255), width: int=
         color (TYPE_iRGBA): The color of the matte as a tuple (R, G, B, A).
         width (int, optional): The width of the matte. Defaults to the image width.
         height (int, optional): The height of the matte. Defaults to the image height.
+        dtype (np.dtype, optional): Working dtype, see `image_dtype`.
 
     Returns:
         TYPE_IMAGE: Composited RGBA image on a matte with original alpha channel.
     """
 
+    image = image_dtype(image, dtype)
+    color = pixel_unit(color, dtype)
+
     # Determine the dimensions of the image and the matte
     image_height, image_width = image.shape[:2]
     width = width or image_width
@@ -249,30 +418,39 @@ def image_matte(image: TYPE_IMAGE, color: TYPE_iRGBA=(0, 0, 0, 255), width: int=
     # Calculate the center position for the image on the matte
     x_offset = (width - image_width) // 2
     y_offset = (height - image_height) // 2
+    region = matte[y_offset:y_offset + image_height, x_offset:x_offset + image_width]
 
     # Extract the alpha channel from the image if it's RGBA
     if image.ndim == 3 and image.shape[2] == 4:
-        alpha = image[:, :, 3] / 255.0
+        alpha = image[:, :, 3:4] / image_unit(dtype)
 
         # Blend the RGB channels using the alpha mask
-        for c in range(3):  # Iterate over RGB channels
-            matte[y_offset:y_offset + image_height, x_offset:x_offset + image_width, c] = \
-                (1 - alpha) * matte[y_offset:y_offset + image_height, x_offset:x_offset + image_width, c] + \
-                alpha * image[:, :, c]
+        region[..., :3] = (1 - alpha) * region[..., :3] + alpha * image[:, :, :3]
 
         # Set the alpha channel to the image's alpha channel
-        matte[y_offset:y_offset + image_height, x_offset:x_offset + image_width, 3] = image[:, :, 3]
+        region[..., 3] = image[:, :, 3]
     else:
         # Handle non-RGBA images (just copy the image onto the matte)
         if image.ndim == 2:
             image = np.expand_dims(image, axis=-1)
             image = np.repeat(image, 3, axis=-1)
-        matte[y_offset:y_offset + image_height, x_offset:x_offset + image_width, :3] = image[:, :, :3]
+        region[..., :3] = image[:, :, :3]
 
     return matte
 
+def image_batch_pointwise(image: TYPE_IMAGE, func: Callable, *arg, **kw) -> TYPE_IMAGE:
+    """Run a single image operation over an entire [B,H,W,C] batch in one call.
+
+    The batch is folded into one tall (B*H, W, C) image, so this is only valid
+    for per-pixel operations (thresholds, lookup tables, channel math) and not
+    for anything that samples neighbours or whole image statistics.
+    """
+    b, h, w = image.shape[:3]
+    image = func(image.reshape(b * h, w, -1), *arg, **kw)
+    return image.reshape(b, h, w, -1)
+
 def image_convert(image: TYPE_IMAGE, channels: int, width: int=None, height: int=None,
-                  matte: Tuple[int, ...]=(0, 0, 0, 255)) -> TYPE_IMAGE:
+                  matte: Tuple[int, ...]=(0, 0, 0, 255), dtype: np.dtype=None) -> TYPE_IMAGE:
     """Force image format to a specific number of channels.
     Args:
         image (TYPE_IMAGE): Input image.
@@ -280,9 +458,12 @@ def image_convert(image: TYPE_IMAGE, channels: int, width: int=None, height: int
         width (int): Desired width. `None` means leave unchanged.
         height (int): Desired height. `None` means leave unchanged.
         matte (tuple): RGBA color to use as background color for transparent areas.
+        dtype (np.dtype): Working dtype, see `image_dtype`. `None` keeps the image as uint8.
     Returns:
         TYPE_IMAGE: Image with the specified number of channels.
     """
+    image = image_dtype(image, dtype)
+    matte = pixel_unit(matte, dtype)
     if image.ndim == 2:
         image = np.expand_dims(image, axis=-1)
 
@@ -300,7 +481,7 @@ def image_convert(image: TYPE_IMAGE, channels: int, width: int=None, height: int
             image = np.concatenate([image, alpha], axis=2)
         elif cc == 4 and channels == 1:
             rgb = image[..., :3]
-            alpha = image[..., 3:4] / 255.0
+            alpha = image[..., 3:4] / image_unit(dtype)
             image = (np.mean(rgb, axis=2, keepdims=True) * alpha).astype(image.dtype)
         elif cc == 4 and channels == 3:
             image = image[..., :3]
@@ -12,8 +12,8 @@ import numpy as np
 from . import \
     TYPE_IMAGE, TYPE_PIXEL, \
     TYPE_fCOORD2D, EnumImageType, \
-    image_convert, image_mask_add, image_matte, image_minmax, bgr2image, \
-    cv2tensor, image2bgr, tensor2cv
+    image_convert, image_dtype, image_mask_add, image_matte, image_minmax, bgr2image, \
+    cv2tensor, image2bgr, pixel_unit, tensor2cv
 
 from .compose import image_blend, image_crop_center
 
@@ -193,23 +193,36 @@ def image_gamma(image: TYPE_IMAGE, value: float) -> TYPE_IMAGE:
     return bgr2image(image, alpha, cc == 1)
 
 def image_histogram(image:TYPE_IMAGE, bins=256) -> TYPE_IMAGE:
-    bins = max(image.max(), bins) + 1
-    flatImage = image.flatten()
-    histogram = np.zeros(bins)
-    for pixel in flatImage:
-        histogram[pixel] += 1
-    return histogram
+    """Count of every integer value in the image.
+
+    A [B,H,W,C] batch returns one histogram row per frame.
+    """
+    bins = int(max(image.max(), bins)) + 1
+    if image.ndim < 4:
+        return np.bincount(image.ravel(), minlength=bins).astype(np.float64)
+
+    # offset each frame into its own run of bins and count them all at once
+    count = image.shape[0]
+    flat = image.reshape(count, -1).astype(np.intp)
+    flat += (np.arange(count, dtype=np.intp) * bins)[:, None]
+    histogram = np.bincount(flat.ravel(), minlength=count * bins)
+    return histogram.reshape(count, bins).astype(np.float64)
 
 def image_histogram_normalize(image:TYPE_IMAGE)-> TYPE_IMAGE:
-    L = image.max()
+    """Spread the values over 0..max via the cumulative histogram.
+
+    Each frame of a [B,H,W,C] batch is equalized on its own.
+    """
+    if image.ndim == 4:
+        return np.stack([image_histogram_normalize(frame) for frame in image])
+
+    L = int(image.max())
     nonEqualizedHistogram = image_histogram(image, bins=L)
     sumPixels = np.sum(nonEqualizedHistogram)
     nonEqualizedHistogram = nonEqualizedHistogram/sumPixels
     cfdHistogram = np.cumsum(nonEqualizedHistogram)
     transformMap = np.floor((L-1) * cfdHistogram)
-    flatNonEqualizedImage = list(image.flatten())
-    flatEqualizedImage = [transformMap[p] for p in flatNonEqualizedImage]
-    return np.reshape(flatEqualizedImage, image.shape)
+    return np.take(transformMap, image)
 
 def image_hsv(image: TYPE_IMAGE, hue: float, saturation: float, value: float) -> TYPE_IMAGE:
     image, alpha, cc = image2bgr(image)
@@ -288,8 +301,18 @@ def image_mirror(image: TYPE_IMAGE, mode:EnumMirrorMode, x:float=0.5,
     return image
 
 def image_pixelate(image: TYPE_IMAGE, amount:float=1.)-> TYPE_IMAGE:
+    """Fill blocks with their average color. Accepts a [B,H,W,C] batch.
 
-    h, w = image.shape[:2]
+    Rows and columns left over past the last whole block keep their pixels.
+    """
+    batch = image.ndim == 4
+    if not batch:
+        image = image[None]
+    flat = image.ndim == 3
+    if flat:
+        image = image[..., None]
+
+    count, h, w, cc = image.shape
     amount = max(0, min(1, amount))
     block_size_h = max(1, (h * amount))
     block_size_w = max(1, (w * amount))
@@ -297,23 +320,36 @@ def image_pixelate(image: TYPE_IMAGE, amount:float=1.)-> TYPE_IMAGE:
     num_blocks_w = int(np.ceil(w / block_size_w))
     block_size_h = h // num_blocks_h
     block_size_w = w // num_blocks_w
-    pixelated_image = image.copy()
-
-    for i in range(num_blocks_h):
-        for j in range(num_blocks_w):
-            # Calculate block boundaries
-            y_start = i * block_size_h
-            y_end = min((i + 1) * block_size_h, h)
-            x_start = j * block_size_w
-            x_end = min((j + 1) * block_size_w, w)
-
-            # Average color values within the block
-            block_average = np.mean(image[y_start:y_end, x_start:x_end], axis=(0, 1))
+    y_end = num_blocks_h * block_size_h
+    x_end = num_blocks_w * block_size_w
+
+    if image.dtype == np.uint8 and cc <= 4:
+        # block sums are four lookups into the summed area table
+        ys = np.arange(num_blocks_h + 1) * block_size_h
+        xs = np.arange(num_blocks_w + 1) * block_size_w
+        block_average = np.empty((count, num_blocks_h, num_blocks_w, cc))
+        for idx, frame in enumerate(image):
+            table = cv2.integral(frame, sdepth=cv2.CV_64F).reshape(h + 1, w + 1, cc)
+            grid = table[ys[:, None], xs[None, :]]
+            block_average[idx] = grid[1:, 1:] - grid[:-1, 1:] - grid[1:, :-1] + grid[:-1, :-1]
+        block_average /= block_size_h * block_size_w
+    else:
+        blocks = image[:, :y_end, :x_end].reshape(count, num_blocks_h, block_size_h,
+                                                   num_blocks_w, block_size_w, cc)
+        block_average = blocks.mean(axis=(2, 4))
 
-            # Fill the block with the average color
-            pixelated_image[y_start:y_end, x_start:x_end] = block_average
+    # widen each block row once, then copy it down the block in whole rows.
+    # casting truncates the averages the same as assigning them did.
+    strip = np.repeat(block_average.astype(image.dtype), block_size_w, axis=2)
+    pixelated_image = image.copy()
+    rows = pixelated_image[:, :y_end].reshape(count, num_blocks_h, block_size_h, w, cc)
+    rows[:, :, :, :x_end] = strip[:, :, None]
 
-    return pixelated_image.astype(np.uint8)
+    if flat:
+        pixelated_image = pixelated_image[..., 0]
+    if not batch:
+        pixelated_image = pixelated_image[0]
+    return pixelated_image.astype(np.uint8, copy=False)
 
 def image_posterize(image: TYPE_IMAGE, levels:int=256) -> TYPE_IMAGE:
     divisor = 256 / max(2, min(256, levels))
@@ -363,15 +399,16 @@ def image_scale(image: TYPE_IMAGE, scale:TYPE_fCOORD2D=(1.0, 1.0),
 def image_scalefit(image: TYPE_IMAGE, width: int, height:int,
                 mode:EnumScaleMode=EnumScaleMode.MATTE,
                 sample:EnumInterpolation=EnumInterpolation.LANCZOS4,
-                matte:TYPE_PIXEL=(0,0,0,0)) -> TYPE_IMAGE:
+                matte:TYPE_PIXEL=(0,0,0,0), dtype: np.dtype=None) -> TYPE_IMAGE:
 
+    image = image_dtype(image, dtype)
     match mode:
         case EnumScaleMode.MATTE:
-            image = image_matte(image, matte, width, height)
+            image = image_matte(image, matte, width, height, dtype=dtype)
 
         case EnumScaleMode.RESIZE_MATTE:
-            canvas = np.full((height, width, 4), matte, dtype=image.dtype)
-            image = image_blend(canvas, image)
+            canvas = np.full((height, width, 4), pixel_unit(matte, dtype), dtype=image.dtype)
+            image = image_blend(canvas, image, dtype=dtype)
             #image = image_matte(image, matte, width, height)
 
         case EnumScaleMode.ASPECT:
@@ -2,24 +2,42 @@
 Jovimetrix - Image Color Support
 """
 
+import os
+import hashlib
+import functools
+import threading
 from enum import Enum
-from typing import List, Tuple
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
 
 import cv2
 import numpy as np
-from numba import cuda
+from numba import cuda, njit, prange
 from scipy.spatial import KDTree
 from skimage import exposure
-from sklearn.cluster import KMeans
-from daltonlens import simulate
+from daltonlens import convert, simulate
 from blendmodes.blend import BlendType
 
+from loguru import logger
+
 from . import TYPE_IMAGE, TYPE_PIXEL, \
     EnumImageType, \
-    bgr2hsv, hsv2bgr, image_convert, image_mask, image_mask_add
+    bgr2hsv, hsv2bgr, image_convert, image_dtype, image_mask, image_mask_add
 
 from .compose import image_blend
 
+# ==============================================================================
+
+# how many compiled 3D LUTs and user color maps to keep, 0 turns the cache off
+JOV_LUT_CACHE = 16
+try: JOV_LUT_CACHE = max(0, int(os.getenv("JOV_LUT_CACHE", JOV_LUT_CACHE)))
+except: pass
+
+# pixels color_top_used clusters, drawn with a fixed seed, 0 uses every pixel
+JOV_PALETTE_SAMPLES = 65536
+try: JOV_PALETTE_SAMPLES = max(0, int(os.getenv("JOV_PALETTE_SAMPLES", JOV_PALETTE_SAMPLES)))
+except: pass
+
 # ==============================================================================
 # === TYPE ===
 # ==============================================================================
@@ -39,6 +57,11 @@ class EnumGrayscaleCrunch(Enum):
     HIGH = 1
     MEAN = 2
 
+class EnumClusterBackend(Enum):
+    AUTO = 0
+    CPU = 10
+    CUDA = 20
+
 class EnumColorMap(Enum):
     AUTUMN = cv2.COLORMAP_AUTUMN
     BONE = cv2.COLORMAP_BONE
@@ -243,98 +266,375 @@ def kmeans_kernel(pixels, centroids, assignments) -> None:
                 min_centroid = i
         assignments[idx] = min_centroid
 
-def color_image2lut(image: np.ndarray, num_colors: int = 256) -> np.ndarray:
-    """Create X sized LUT from an RGB image using GPU acceleration."""
+@njit(parallel=True, cache=True)
+def kmeans_assign_cpu(pixels, centroids, assignments) -> None:
+    for idx in prange(pixels.shape[0]):
+        min_dist = 1e10
+        min_centroid = 0
+        for i in range(centroids.shape[0]):
+            dist = 0.
+            for j in range(3):
+                diff = pixels[idx, j] - centroids[i, j]
+                dist += diff * diff
+            if dist < min_dist:
+                min_dist = dist
+                min_centroid = i
+        assignments[idx] = min_centroid
+
+def kmeans_assign_cuda(pixels, centroids, assignments) -> None:
+    threads_per_block = 256
+    blocks = (pixels.shape[0] + threads_per_block - 1) // threads_per_block
+    kmeans_kernel[blocks, threads_per_block](pixels, centroids, assignments)
+
+KMEANS_ASSIGN = {
+    EnumClusterBackend.CPU: kmeans_assign_cpu,
+    EnumClusterBackend.CUDA: kmeans_assign_cuda,
+}
+
+def kmeans_backend(backend: EnumClusterBackend=EnumClusterBackend.AUTO) -> EnumClusterBackend:
+    """Resolve AUTO to CUDA when a device is present, otherwise the CPU."""
+    if backend == EnumClusterBackend.AUTO:
+        try:
+            if cuda.is_available():
+                return EnumClusterBackend.CUDA
+        except Exception:
+            pass
+        return EnumClusterBackend.CPU
+    return backend
+
+def kmeans_seed(pixels: np.ndarray, num_colors: int, rng: np.random.Generator,
+                weights: np.ndarray=None) -> np.ndarray:
+    """k-means++ seeding, each new centroid picked weighted by squared distance
+    times the pixel weight."""
+    count = pixels.shape[0]
+    centroids = np.empty((num_colors, 3), dtype=np.float32)
+    if weights is None:
+        centroids[0] = pixels[rng.integers(0, count)]
+    else:
+        centroids[0] = pixels[rng.choice(count, p=weights / weights.sum())]
+    dist = np.sum((pixels - centroids[0]) ** 2, axis=-1)
+    for i in range(1, num_colors):
+        score = dist if weights is None else dist * weights
+        total = score.sum()
+        idx = rng.choice(count, p=score / total) if total > 0 else rng.integers(0, count)
+        centroids[i] = pixels[idx]
+        np.minimum(dist, np.sum((pixels - centroids[i]) ** 2, axis=-1), out=dist)
+    return centroids
+
+def color_kmeans(pixels: np.ndarray, num_colors: int,
+                 backend: EnumClusterBackend=EnumClusterBackend.AUTO,
+                 batch: int=4096, tolerance: float=0.5, max_iter: int=100,
+                 seed: int=None, weights: np.ndarray=None) -> np.ndarray:
+    """Mini-batch K-means over Nx3 float32 pixels, returns the centroids.
+
+    Every step assigns a random batch of pixels and moves each centroid
+    toward its batch mean by its share of all the samples it has seen.
+    Stops once no centroid moves more than tolerance (0-255 units). When the
+    batch covers every pixel it is plain Lloyd iteration. `weights` counts
+    each pixel that many times, batches are then drawn in proportion to it.
+    """
+    assign = KMEANS_ASSIGN[kmeans_backend(backend)]
+    rng = np.random.default_rng(seed)
+    count = pixels.shape[0]
+    if weights is not None:
+        weights = np.asarray(weights, dtype=np.float64)
+        chance = weights / weights.sum()
+
+    # every centroid wants a few samples per step
+    batch = max(batch, num_colors * 16)
+    full = batch >= count
+
+    def draw() -> np.ndarray:
+        if weights is None:
+            return pixels[rng.integers(0, count, size=batch)]
+        return pixels[rng.choice(count, size=batch, p=chance)]
+
+    if full:
+        centroids = kmeans_seed(pixels, num_colors, rng, weights)
+    else:
+        centroids = kmeans_seed(draw(), num_colors, rng)
+    sample = pixels
+    assignments = np.zeros(min(batch, count), dtype=np.int32)
+    seen = np.zeros(num_colors, dtype=np.float64)
+
+    for _ in range(max_iter):
+        if not full:
+            sample = draw()
+        assign(sample, centroids, assignments)
+
+        scale = weights if full else None
+        hits = np.bincount(assignments, weights=scale, minlength=num_colors).astype(np.float64)
+        if scale is not None:
+            sums = np.stack([np.bincount(assignments, weights=sample[:, j] * scale, minlength=num_colors)
+                             for j in range(3)], axis=-1)
+        else:
+            sums = np.stack([np.bincount(assignments, weights=sample[:, j], minlength=num_colors)
+                             for j in range(3)], axis=-1)
+        mask = hits > 0
+        previous = centroids.copy()
+        if full:
+            centroids[mask] = sums[mask] / hits[mask, None]
+        else:
+            seen += hits
+            centroids[mask] += (sums[mask] - hits[mask, None] * centroids[mask]) / seen[mask, None]
+
+        if np.max(np.abs(centroids - previous)) < tolerance:
+            break
+    return centroids
+
+def color_image2lut(image: np.ndarray, num_colors: int = 256,
+                    backend: EnumClusterBackend=EnumClusterBackend.AUTO) -> np.ndarray:
+    """Create X sized LUT from an RGB image, clustered on the GPU if one is present."""
     # Ensure image is in RGB format
     if image.shape[2] == 4:  # If RGBA, convert to RGB
         image = cv2.cvtColor(image, cv2.COLOR_RGBA2RGB)
     elif image.shape[2] == 1:  # If grayscale, convert to RGB
         image = cv2.cvtColor(image, cv2.COLOR_GRAY2RGB)
 
-    # Reshape and transfer to GPU
     pixels = np.asarray(image.reshape(-1, 3)).astype(np.float32)
-    # logger.debug("Pixel range:", np.min(pixels), np.max(pixels))
-
-    # Initialize centroids using random pixels
-    random_indices = np.random.choice(pixels.shape[0], size=num_colors, replace=False)
-    centroids = pixels[random_indices]
-    # logger.debug("Initial centroids range:", np.min(centroids), np.max(centroids))
-
-    # Prepare for K-means
-    assignments = np.zeros(pixels.shape[0], dtype=np.int32)
-    threads_per_block = 256
-    blocks = (pixels.shape[0] + threads_per_block - 1) // threads_per_block
-
-    # K-means iterations
-    for iteration in range(20):  # Adjust the number of iterations as needed
-        kmeans_kernel[blocks, threads_per_block](pixels, centroids, assignments)
-        new_centroids = np.zeros((num_colors, 3), dtype=np.float32)
-        for i in range(num_colors):
-            mask = (assignments == i)
-            if np.any(mask):
-                new_centroids[i] = np.mean(pixels[mask], axis=0)
-
-        centroids = new_centroids
-
-        if iteration % 5 == 0:
-            # logger.debug(f"Iteration {iteration}, Centroids range: {np.min(centroids)} {np.max(centroids)}")
-            pass
+    num_colors = max(1, min(256, num_colors))
+    centroids = color_kmeans(pixels, num_colors, backend)
 
     # Create LUT
     lut = np.zeros((256, 1, 3), dtype=np.uint8)
     lut[:num_colors] = np.clip(centroids, 0, 255).reshape(-1, 1, 3).astype(np.uint8)
-    # logger.debug(f"Final LUT range: { np.min(lut)} {np.max(lut)}")
     return np.asarray(lut)
 
+CB_SIMULATOR = {
+    EnumCBSimulator.AUTOSELECT: simulate.Simulator_AutoSelect,
+    EnumCBSimulator.BRETTEL1997: simulate.Simulator_Brettel1997,
+    EnumCBSimulator.COBLISV1: simulate.Simulator_CoblisV1,
+    EnumCBSimulator.COBLISV2: simulate.Simulator_CoblisV2,
+    EnumCBSimulator.MACHADO2009: simulate.Simulator_Machado2009,
+    EnumCBSimulator.VIENOT1999: simulate.Simulator_Vienot1999,
+    EnumCBSimulator.VISCHECK: simulate.Simulator_Vischeck,
+}
+
+_CB_REGISTRY: Dict[Tuple[EnumCBSimulator, EnumCBDeficiency], simulate.Simulator] = {}
+_CB_LOCK = threading.Lock()
+
+def color_blind_simulator(simulator: EnumCBSimulator,
+                          deficiency: EnumCBDeficiency) -> simulate.Simulator:
+    """One simulator instance per (algorithm, deficiency), built on first use."""
+    key = (simulator, deficiency)
+    with _CB_LOCK:
+        if (sim := _CB_REGISTRY.get(key, None)) is None:
+            sim = _CB_REGISTRY[key] = CB_SIMULATOR[simulator]()
+        return sim
+
+def color_blind_resolve(simulator: EnumCBSimulator, deficiency: EnumCBDeficiency,
+                        severity: float) -> EnumCBSimulator:
+    """The algorithm AUTOSELECT runs, picked the way daltonlens picks it."""
+    if simulator != EnumCBSimulator.AUTOSELECT:
+        return simulator
+    if deficiency == EnumCBDeficiency.TRITAN:
+        return EnumCBSimulator.BRETTEL1997
+    if severity < 0.999:
+        return EnumCBSimulator.MACHADO2009
+    return EnumCBSimulator.VIENOT1999
+
+# buckets over 0..1 that seed the encode, finer than the closest two thresholds
+CB_ENCODE_STEPS = 1 << 16
+
+@functools.lru_cache(maxsize=64)
+def color_blind_matrix(simulator: EnumCBSimulator, deficiency: EnumCBDeficiency,
+                       severity: float) -> Optional[Tuple[Any, ...]]:
+    """Linear RGB matrix of a simulation and the tables that encode its
+    output, None when the algorithm is not a single matrix.
+
+    Brettel (and Vischeck) project onto two half planes and Coblis V2 works
+    in xyY, the rest are read back by running the simulator on the three
+    primaries. Dichromacy simulators blend with the input below full
+    severity, that blend is returned as its two weights and kept apart so
+    it rounds the same.
+
+    thresholds[k] is the smallest linear value that encodes to k + 1, so an
+    encoded channel is the count of thresholds at or below it, the same
+    integer the simulator gets from its float conversion. start[i] is that
+    count at i / CB_ENCODE_STEPS, the kernel only walks up from there.
+    """
+    simulator = color_blind_resolve(simulator, deficiency, severity)
+    if simulator in (EnumCBSimulator.BRETTEL1997, EnumCBSimulator.VISCHECK, EnumCBSimulator.COBLISV2):
+        return None
+
+    sim = color_blind_simulator(simulator, deficiency)
+    primaries = np.eye(3, dtype=np.float32).reshape(1, 3, 3)
+    weight, keep = 1., 0.
+    # the linear RGB entry points are private to daltonlens (pinned to 0.1.x),
+    # a release that moves them falls back to the per frame simulator
+    try:
+        if isinstance(sim, simulate.DichromacySimulator):
+            matrix = sim._simulate_dichromacy_linear_rgb(primaries, deficiency.value)
+            if severity < 0.99999:
+                weight, keep = severity, 1. - severity
+        else:
+            matrix = sim._simulate_cvd_linear_rgb(primaries, deficiency.value, severity)
+        matrix = np.ascontiguousarray(np.asarray(matrix, dtype=np.float64).reshape(3, 3).T)
+    except Exception as e:
+        logger.warning(f"color blind matrix unavailable for {simulator.name}, simulating per frame: {e}")
+        return None
+
+    def encode(value: np.ndarray) -> np.ndarray:
+        value = value.reshape(1, -1)
+        match sim.imageEncoding:
+            case convert.ImageEncoding.SRGB:
+                value = convert.sRGB_from_linearRGB(value)
+            case convert.ImageEncoding.GAMMA_22:
+                value = convert.gamma22_from_linearRGB(value)
+        return convert.as_uint8(value)[0].astype(np.int64)
+
+    # bisect on the bit pattern, it orders positive floats
+    target = np.arange(1, 256)
+    lo = np.zeros(255, dtype=np.int64)
+    hi = np.full(255, np.float64(1.).view(np.int64), dtype=np.int64)
+    while np.any(lo < hi):
+        mid = (lo + hi) // 2
+        above = encode(mid.view(np.float64)) >= target
+        hi = np.where(above, mid, hi)
+        lo = np.where(above, lo, mid + 1)
+    thresholds = lo.view(np.float64).copy()
+    # sRGB tops out just under 255 and never reaches it
+    thresholds[encode(thresholds) < target] = np.inf
+    grid = np.arange(CB_ENCODE_STEPS + 1, dtype=np.float64) / CB_ENCODE_STEPS
+    start = np.searchsorted(thresholds, grid, side="right").astype(np.int32)
+    return matrix, weight, keep, sim.imageEncoding, thresholds, start
+
+@functools.lru_cache(maxsize=4)
+def color_blind_decode(encoding: convert.ImageEncoding) -> np.ndarray:
+    """float32 linear value of every uint8 input, computed the way the simulators do."""
+    value = convert.as_float32(np.arange(256, dtype=np.uint8).reshape(1, -1))
+    match encoding:
+        case convert.ImageEncoding.SRGB:
+            value = convert.linearRGB_from_sRGB(value)
+        case convert.ImageEncoding.GAMMA_22:
+            value = convert.linearRGB_from_gamma22(value)
+    return value[0].astype(np.float32)
+
+@njit(parallel=True, cache=True)
+def color_blind_kernel(image: TYPE_IMAGE, matrix: np.ndarray, weight: float, keep: np.float32,
+                       decode: np.ndarray, thresholds: np.ndarray, start: np.ndarray,
+                       out: TYPE_IMAGE) -> None:
+    """Rows of BGR(A) pixels, simulated in RGB order and written back as BGR(A)."""
+    cc = image.shape[1]
+    steps = start.shape[0] - 1
+    for i in prange(image.shape[0]):
+        rgb = (decode[image[i, 2]], decode[image[i, 1]], decode[image[i, 0]])
+        for c in range(3):
+            value = np.float64(rgb[0]) * matrix[c, 0] + np.float64(rgb[1]) * matrix[c, 1] + \
+                    np.float64(rgb[2]) * matrix[c, 2]
+            # the input share is a float32 product, as in the simulator
+            value = value * weight + np.float64(rgb[c] * keep)
+            # negative and NaN both land on 0
+            idx = 0
+            if value > 0.:
+                idx = start[min(steps, int(value * steps))]
+                while idx < 255 and thresholds[idx] <= value:
+                    idx += 1
+            out[i, 2 - c] = idx
+        if cc == 4:
+            out[i, 3] = image[i, 3]
+
+def color_blind_batch(image: TYPE_IMAGE, deficiency: EnumCBDeficiency,
+                      simulator: EnumCBSimulator=EnumCBSimulator.AUTOSELECT,
+                      severity: float=1.0) -> Optional[TYPE_IMAGE]:
+    """Simulate a uint8 BGR(A) image or [B,H,W,C] batch in one pass.
+
+    Returns None when the algorithm is not a single matrix, the caller then
+    goes through color_blind frame by frame.
+    """
+    if (found := color_blind_matrix(simulator, deficiency, float(severity))) is None:
+        return None
+    matrix, weight, keep, encoding, thresholds, start = found
+    image = np.ascontiguousarray(image)
+    cc = image.shape[-1]
+    out = np.empty_like(image)
+    color_blind_kernel(image.reshape(-1, cc), matrix, weight, np.float32(keep),
+                       color_blind_decode(encoding), thresholds, start, out.reshape(-1, cc))
+    return out
+
 def color_blind(image: TYPE_IMAGE, deficiency:EnumCBDeficiency,
                     simulator:EnumCBSimulator=EnumCBSimulator.AUTOSELECT,
                     severity:float=1.0) -> TYPE_IMAGE:
 
     cc = image.shape[2] if image.ndim == 3 else 1
+    if image.dtype == np.uint8 and cc in (3, 4):
+        if (out := color_blind_batch(image, deficiency, simulator, severity)) is not None:
+            return out
+
     if cc == 4:
         mask = image_mask(image)
     image = image_convert(image, 3)
     image = cv2.cvtColor(image, cv2.COLOR_BGR2RGB)
-    match simulator:
-        case EnumCBSimulator.AUTOSELECT:
-            simulator = simulate.Simulator_AutoSelect()
-        case EnumCBSimulator.BRETTEL1997:
-            simulator = simulate.Simulator_Brettel1997()
-        case EnumCBSimulator.COBLISV1:
-            simulator = simulate.Simulator_CoblisV1()
-        case EnumCBSimulator.COBLISV2:
-            simulator = simulate.Simulator_CoblisV2()
-        case EnumCBSimulator.MACHADO2009:
-            simulator = simulate.Simulator_Machado2009()
-        case EnumCBSimulator.VIENOT1999:
-            simulator = simulate.Simulator_Vienot1999()
-        case EnumCBSimulator.VISCHECK:
-            simulator = simulate.Simulator_Vischeck()
-    image = simulator.simulate_cvd(image, deficiency.value, severity=severity)
+    simulator = color_blind_resolve(simulator, deficiency, severity)
+    sim = color_blind_simulator(simulator, deficiency)
+    image = sim.simulate_cvd(image, deficiency.value, severity=severity)
     image = cv2.cvtColor(image, cv2.COLOR_RGB2BGR)
     if cc == 4:
         image = image_mask_add(image, mask)
     return image
 
+_LUT_CACHE: OrderedDict = OrderedDict()
+_LUT_LOCK = threading.Lock()
+
+def lut_cache_get(key: Tuple) -> np.ndarray:
+    with _LUT_LOCK:
+        if (lut := _LUT_CACHE.get(key, None)) is not None:
+            _LUT_CACHE.move_to_end(key)
+        return lut
+
+def lut_cache_put(key: Tuple, lut: np.ndarray) -> np.ndarray:
+    """Keep lut under key, least recently used first out once there are more
+    than JOV_LUT_CACHE. Cached arrays are read only."""
+    lut.flags.writeable = False
+    if JOV_LUT_CACHE > 0:
+        with _LUT_LOCK:
+            _LUT_CACHE[key] = lut
+            while len(_LUT_CACHE) > JOV_LUT_CACHE:
+                _LUT_CACHE.popitem(last=False)
+    return lut
+
+def lut_cache_clear() -> None:
+    with _LUT_LOCK:
+        _LUT_CACHE.clear()
+
+def color_lut_compile(colors: List[Tuple[int, int, int]], nodes: int=33) -> np.ndarray:
+    """Read only (nodes, nodes, nodes, 3) uint8 LUT that maps every grid point
+    to the closest of colors.
+
+    The grid spans 0-255 on each axis and the axes follow the channel order
+    of colors. LUTs are kept per (palette, nodes), so a palette is only
+    searched once however many frames it is applied to.
+    """
+    palette = np.asarray(colors, dtype=np.int64).reshape(-1, 3)
+    nodes = max(2, min(256, int(nodes)))
+    key = ("palette", palette.tobytes(), nodes)
+    if (lut := lut_cache_get(key)) is not None:
+        return lut
+
+    kdtree = KDTree(palette)
+    axis = np.linspace(0, 255, nodes)
+    g, b = np.meshgrid(axis, axis, indexing="ij")
+    plane = np.stack([np.zeros_like(g), g, b], axis=-1).reshape(-1, 3)
+    lut = np.empty((nodes, nodes, nodes, 3), dtype=np.uint8)
+    # a plane at a time keeps the query small at 256 nodes
+    for idx, r in enumerate(axis):
+        plane[:, 0] = r
+        _, indices = kdtree.query(plane)
+        lut[idx] = palette[indices].reshape(nodes, nodes, 3)
+    return lut_cache_put(key, lut)
+
 def color_lut_full(dominant_colors: List[Tuple[int, int, int]], nodes:int=33) -> TYPE_IMAGE:
     """
     Create a 3D LUT by mapping each RGB value to the closest dominant color.
-    This version is optimized for speed using vectorization.
 
     Args:
         dominant_colors (List[Tuple[int, int, int]]): List of top colors as (R, G, B) tuples.
+        nodes (int): Grid points per axis, spread evenly over 0-255.
 
     Returns:
         np.ndarray: 3D LUT with shape (n, n, n, 3).
     """
-
-    kdtree = KDTree(dominant_colors)
-    r, g, b = np.mgrid[0:nodes, 0:nodes, 0:nodes]
-    rgb = np.stack([r, g, b], axis=-1).reshape(-1, 3)
-    _, indices = kdtree.query(rgb)
-    lut = np.array(dominant_colors)[indices]
-    lut = lut.reshape(nodes, nodes, nodes, 3).astype(np.uint8)
-    return lut
+    return color_lut_compile(dominant_colors, nodes).copy()
 
 def color_lut_match(image: TYPE_IMAGE, colormap:int=cv2.COLORMAP_JET,
                     usermap:TYPE_IMAGE=None, num_colors:int=255) -> TYPE_IMAGE:
@@ -345,8 +645,11 @@ def color_lut_match(image: TYPE_IMAGE, colormap:int=cv2.COLORMAP_JET,
 
     image = image_convert(image, 3)
     if usermap is not None:
-        usermap = image_convert(usermap, 3)
-        colormap = color_image2lut(usermap, num_colors)
+        usermap = np.ascontiguousarray(image_convert(usermap, 3))
+        # the same map image is usually fed to every frame, cluster it once
+        key = ("usermap", hashlib.sha1(usermap).digest(), usermap.shape, num_colors)
+        if (colormap := lut_cache_get(key)) is None:
+            colormap = lut_cache_put(key, color_image2lut(usermap, num_colors))
 
     image = cv2.applyColorMap(image, colormap)
     image = cv2.cvtColor(image, cv2.COLOR_RGB2BGR)
@@ -533,13 +836,49 @@ def color_mean(image: TYPE_IMAGE) -> TYPE_IMAGE:
             int(np.mean(image[:,:,2])) ]
     return color
 
-def color_top_used(image: TYPE_IMAGE, top_n: int=8) -> List[Tuple[int, int, int]]:
+def color_palette(image: TYPE_IMAGE, num_colors: int=8, samples: int=None,
+                  seed: int=0) -> Tuple[np.ndarray, np.ndarray]:
+    """Dominant colors of a 3 channel image and the share of pixels each one
+    covers, most used first.
+
+    At most `samples` pixels (JOV_PALETTE_SAMPLES by default, 0 for all of
+    them) are drawn with a fixed seed, so the same image always gives the
+    same palette. Identical colors are then merged into one entry weighted
+    by its count and clustered with k-means++ and mini-batch k-means, which
+    keeps the cost tied to the palette size and not the resolution.
+    """
+    if image.dtype != np.uint8:
+        image = image_dtype(image, np.uint8)
+    pixels = image.reshape(-1, 3)
+
+    samples = JOV_PALETTE_SAMPLES if samples is None else samples
+    if samples > 0 and pixels.shape[0] > samples:
+        rng = np.random.default_rng(seed)
+        pixels = pixels[rng.integers(0, pixels.shape[0], size=samples)]
+
+    # a histogram of the packed colors, one entry per distinct color
+    key = (pixels[:, 0].astype(np.uint32) << 16) | (pixels[:, 1].astype(np.uint32) << 8) | pixels[:, 2]
+    key, counts = np.unique(key, return_counts=True)
+    colors = np.stack([key >> 16, (key >> 8) & 255, key & 255], axis=-1).astype(np.float32)
+
+    num_colors = max(1, int(num_colors))
+    # a sampled histogram is small enough for full Lloyd steps
+    centroids = color_kmeans(colors, num_colors, batch=max(4096, samples), seed=seed, weights=counts)
+
+    assignments = np.zeros(colors.shape[0], dtype=np.int32)
+    kmeans_assign_cpu(colors, centroids, assignments)
+    share = np.bincount(assignments, weights=counts, minlength=num_colors) / counts.sum()
+    order = np.argsort(-share, kind="stable")
+    return centroids[order], share[order]
+
+def color_top_used(image: TYPE_IMAGE, top_n: int=8, samples: int=None) -> List[Tuple[int, int, int]]:
     """
     Find dominant colors in an image using k-means clustering.
 
     Args:
         image (np.ndarray): Input image in HxWxC format, assumed to be RGB.
         top_n (int): Number of top colors to return.
+        samples (int): Pixels to cluster, see `color_palette`.
 
     Returns:
         List[Tuple[int, int, int]]: List of top `top_n` colors.
@@ -550,17 +889,9 @@ def color_top_used(image: TYPE_IMAGE, top_n: int=8) -> List[Tuple[int, int, int]
     if image.shape[2] != 3:
         image = image_convert(image, 3)
 
-    pixels = image.reshape(-1, 3)
-    kmeans = KMeans(n_clusters=int(top_n), n_init=10)
-    kmeans.fit(pixels)
-    dominant_colors = kmeans.cluster_centers_
-    dominant_colors = np.round(dominant_colors).astype(int)
-    sorted_colors = sorted(
-        zip(dominant_colors, kmeans.labels_),
-        key=lambda x: np.sum(kmeans.labels_ == x[1]),
-        reverse=True
-    )
-    return [tuple(color) for color, _ in sorted_colors]
+    colors, _ = color_palette(image, top_n, samples)
+    colors = np.clip(np.round(colors), 0, 255).astype(int)
+    return [tuple(int(c) for c in color) for color in colors]
 
 # ==============================================================================
 # === COLOR ANALYSIS ===
@@ -677,11 +1008,16 @@ def image_gradient_expand(image: TYPE_IMAGE) -> None:
 # Adapted from WAS Suite -- gradient_map
 # https://github.com/WASasquatch/was-node-suite-comfyui
 def image_gradient_map(image:TYPE_IMAGE, color_map:TYPE_IMAGE, reverse:bool=False) -> TYPE_IMAGE:
+    """Color the gray levels of an image, or a [B,H,W,C] batch, from a gradient strip."""
     if reverse:
         color_map = color_map[:,:,::-1]
-    gray = image_grayscale(image)
+    shape = image.shape[:-1] if image.ndim == 4 else image.shape[:2]
+    if image.ndim == 4:
+        # frames stacked as rows convert and look up in one call each
+        image = image.reshape(-1, *image.shape[2:])
+    gray = image_grayscale(image).reshape(-1, shape[-1])
     color_map = image_gradient_expand(color_map)
-    return cv2.applyColorMap(gray, color_map)
+    return cv2.applyColorMap(gray, color_map).reshape(*shape, 3)
 
 def image_grayscale(image: TYPE_IMAGE, use_alpha: bool = False) -> TYPE_IMAGE:
     """Convert image to grayscale, optionally using the alpha channel if present.
@@ -2,17 +2,30 @@
 Jovimetrix - Coordinates and Mapping
 """
 
+import os
+import functools
+import threading
 from enum import Enum
+from collections import OrderedDict
 from typing import Any, List, Tuple
 
 import cv2
 import numpy as np
+from numba import njit, prange
+from scipy import fft
 
 from . import TAU, TYPE_IMAGE, TYPE_fCOORD2D, \
     image_convert, image_lerp, image_normalize
 
 from .color import image_grayscale
 
+# ==============================================================================
+
+# how many projection remap tables to keep, 0 turns the cache off
+JOV_REMAP_CACHE = 16
+try: JOV_REMAP_CACHE = max(0, int(os.getenv("JOV_REMAP_CACHE", JOV_REMAP_CACHE)))
+except: pass
+
 # ==============================================================================
 # === ENUMERATION ===
 # ==============================================================================
@@ -41,30 +54,44 @@ def image_mirror_mandela(imageA: np.ndarray, imageB: np.ndarray) -> Tuple[np.nda
     imageB = np.vstack([top, bottom])
     return imageA, imageB
 
+@njit(parallel=True, cache=True)
+def stereogram_rows(image: TYPE_IMAGE, offset: np.ndarray, pattern_width: int) -> TYPE_IMAGE:
+    """Each pixel past the first tile copies the already built pixel one tile
+    to its left, pushed by its depth offset. Rows are independent."""
+    height, width = offset.shape
+    chan = image.shape[2]
+    out = np.zeros_like(image)
+    for y in prange(height):
+        for x in range(min(pattern_width, width)):
+            for c in range(chan):
+                out[y, x, c] = image[y, x, c]
+        for x in range(pattern_width, width):
+            # wrap into the row like python indexing, numba does not bounds
+            # check and a deep offset can land past either end
+            pos = (x - pattern_width + offset[y, x]) % width
+            for c in range(chan):
+                out[y, x, c] = out[y, pos, c]
+    return out
+
 def image_stereogram(image: TYPE_IMAGE, depth: TYPE_IMAGE, divisions:int=8,
-                     mix:float=0.33, gamma:float=0.33, shift:float=1.) -> TYPE_IMAGE:
+                     mix:float=0.33, gamma:float=0.33, shift:float=1.,
+                     noise: TYPE_IMAGE=None) -> TYPE_IMAGE:
+    """Pass the same noise tile to keep the pattern steady across a batch."""
     height, width = depth.shape[:2]
-    out = np.zeros((height, width, 3), dtype=np.uint8)
     image = cv2.resize(image, (width, height))
     image = image_convert(image, 3)
     depth = image_convert(depth, 3)
-    noise = np.random.randint(0, max(1, int(gamma * 255)), (height, width, 3), dtype=np.uint8)
-    # noise = cv2.cvtColor(noise, cv2.COLOR_GRAY2BGR)
+    if noise is None or noise.shape[:2] != (height, width):
+        noise = image_stereogram_noise(width, height, gamma)
     image = cv2.addWeighted(image, 1. - mix, noise, mix, 0)
-
+    divisions = max(1, divisions)
     pattern_width = width // divisions
-    # shift -= 1
-    for y in range(height):
-        for x in range(width):
-            if x < pattern_width:
-                out[y, x] = image[y, x]
-            else:
-                # out[y, x] = out[y, x - pattern_width + int(shift * invert)]
-                offset = depth[y, x][0] // divisions
-                pos = x - pattern_width + int(shift * offset)
-                # pos = max(-pattern_width, min(pattern_width, pos))
-                out[y, x] = out[y, pos]
-    return out
+    # truncate toward zero, the same as int()
+    offset = (shift * (depth[..., 0] // divisions)).astype(np.int64)
+    return stereogram_rows(image, offset, pattern_width)
+
+def image_stereogram_noise(width: int, height: int, gamma: float=0.33) -> TYPE_IMAGE:
+    return np.random.randint(0, max(1, int(gamma * 255)), (height, width, 3), dtype=np.uint8)
 
 # ==============================================================================
 # === COORDINATES ===
@@ -119,17 +146,69 @@ def coord_sphere(width: int, height: int, radius: float) -> Tuple[TYPE_IMAGE, TY
     y_image = (y + 1) * (height - 1) / 2
     return x_image.astype(np.float32), y_image.astype(np.float32)
 
+def coord_polar(width: int, height: int) -> Tuple[TYPE_IMAGE, TYPE_IMAGE]:
+    """Inverse linear polar lookup, as cv2.linearPolar builds it for remap_polar.
+    Rows index one past the top so the source can carry a wrapped angle border."""
+    cx, cy = height // 2, width // 2
+    radius = max(width, height) // 2
+    x, y = np.meshgrid(np.arange(width, dtype=np.float32) - cx,
+                       np.arange(height, dtype=np.float32) - cy)
+    magnitude, angle = cv2.cartToPolar(x, y)
+    map_x = magnitude / np.float32(radius / width)
+    map_y = angle / np.float32(TAU / height) + 1
+    return map_x.astype(np.float32), map_y.astype(np.float32)
+
 # ==============================================================================
 # === MAPPING ===
 # ==============================================================================
 
+_REMAP_CACHE: OrderedDict = OrderedDict()
+_REMAP_LOCK = threading.Lock()
+
+def remap_maps(projection: EnumProjection, width: int, height: int,
+               strength: float=0.) -> Tuple[np.ndarray, np.ndarray]:
+    """Fixed point (CV_16SC2) remap tables for a projection.
+
+    Tables are kept per (projection, width, height, strength), least recently
+    used first out once there are more than JOV_REMAP_CACHE.
+    """
+    key = (projection, width, height, strength)
+    with _REMAP_LOCK:
+        if (maps := _REMAP_CACHE.get(key, None)) is not None:
+            _REMAP_CACHE.move_to_end(key)
+            return maps
+
+    nearest = False
+    match projection:
+        case EnumProjection.FISHEYE:
+            map_x, map_y = coord_fisheye(width, height, strength)
+        case EnumProjection.SPHERICAL:
+            map_x, map_y = coord_sphere(width, height, strength)
+        case EnumProjection.POLAR:
+            map_x, map_y = coord_polar(width, height)
+            nearest = True
+        case _:
+            raise ValueError(f"no remap table for {projection}")
+
+    maps = cv2.convertMaps(map_x, map_y, cv2.CV_16SC2, nninterpolation=nearest)
+    if JOV_REMAP_CACHE > 0:
+        with _REMAP_LOCK:
+            _REMAP_CACHE[key] = maps
+            while len(_REMAP_CACHE) > JOV_REMAP_CACHE:
+                _REMAP_CACHE.popitem(last=False)
+    return maps
+
+def remap_cache_clear() -> None:
+    with _REMAP_LOCK:
+        _REMAP_CACHE.clear()
+
 def remap_fisheye(image: TYPE_IMAGE, distort: float) -> TYPE_IMAGE:
     cc = image.shape[2] if image.ndim == 3 else 1
     height, width = image.shape[:2]
     if cc == 1:
         image = cv2.cvtColor(image, cv2.COLOR_GRAY2BGR)
-    map_x, map_y = coord_fisheye(width, height, distort)
-    image = cv2.remap(image, map_x, map_y, interpolation=cv2.INTER_LINEAR, borderMode=cv2.BORDER_CONSTANT)
+    map_1, map_2 = remap_maps(EnumProjection.FISHEYE, width, height, distort)
+    image = cv2.remap(image, map_1, map_2, interpolation=cv2.INTER_LINEAR, borderMode=cv2.BORDER_CONSTANT)
     #if cc == 1:
     #    image = image[..., 0]
     return image
@@ -149,38 +228,54 @@ def remap_polar(image: TYPE_IMAGE) -> TYPE_IMAGE:
     """Re-projects a 3D numpy array ("data") into a polar coordinate system.
     "origin" is a tuple of (x0, y0) and defaults to the center of the image."""
     h, w = image.shape[:2]
-    radius = max(w, h)
-    return cv2.linearPolar(image, (h // 2, w // 2), radius // 2, cv2.WARP_INVERSE_MAP)
+    map_1, map_2 = remap_maps(EnumProjection.POLAR, w, h)
+    # the angle wraps around, same border cv2.linearPolar adds
+    image = cv2.copyMakeBorder(image, 1, 1, 0, 0, cv2.BORDER_WRAP)
+    return cv2.remap(image, map_1, map_2, interpolation=cv2.INTER_NEAREST, borderMode=cv2.BORDER_CONSTANT)
 
 def remap_sphere(image: TYPE_IMAGE, radius: float) -> TYPE_IMAGE:
     height, width = image.shape[:2]
-    map_x, map_y = coord_sphere(width, height, radius)
-    return cv2.remap(image, map_x, map_y, interpolation=cv2.INTER_LINEAR, borderMode=cv2.BORDER_CONSTANT)
+    map_1, map_2 = remap_maps(EnumProjection.SPHERICAL, width, height, radius)
+    return cv2.remap(image, map_1, map_2, interpolation=cv2.INTER_LINEAR, borderMode=cv2.BORDER_CONSTANT)
+
+@functools.lru_cache(maxsize=8)
+def depth_grid(rows: int, cols: int) -> Tuple[np.ndarray, np.ndarray]:
+    """Read only frequency terms of the Frankot-Chellappa solve for one size,
+    over the half spectrum rfft2 returns."""
+    v_grid = fft.fftfreq(rows).astype(np.float32)[:, None]
+    u_grid = fft.rfftfreq(cols).astype(np.float32)[None, :]
+    denominator = u_grid**2 + v_grid**2
+    denominator[0, 0] = 1.0
+    x_term = (-1j * u_grid / denominator).astype(np.complex64)
+    y_term = (-1j * v_grid / denominator).astype(np.complex64)
+    x_term[0, 0] = y_term[0, 0] = 0.
+    # a real signal has no slope at the Nyquist frequency, the full complex
+    # transform dropped those terms when it kept only the real part
+    if cols % 2 == 0:
+        x_term[:, -1] = 0.
+    if rows % 2 == 0:
+        y_term[rows // 2] = 0.
+    x_term.flags.writeable = y_term.flags.writeable = False
+    return x_term, y_term
 
 def depth_from_gradient(grad_x, grad_y):
     """Optimized Frankot-Chellappa depth-from-gradient algorithm."""
     rows, cols = grad_x.shape
-    rows_scale = np.fft.fftfreq(rows)
-    cols_scale = np.fft.fftfreq(cols)
-    u_grid, v_grid = np.meshgrid(cols_scale, rows_scale)
-    grad_x_F = np.fft.fft2(grad_x)
-    grad_y_F = np.fft.fft2(grad_y)
-    denominator = u_grid**2 + v_grid**2
-    denominator[0, 0] = 1.0
-    Z_F = (-1j * u_grid * grad_x_F - 1j * v_grid * grad_y_F) / denominator
-    Z_F[0, 0] = 0.0
-    Z = np.fft.ifft2(Z_F).real
+    x_term, y_term = depth_grid(rows, cols)
+    # the gradients are real, so half the spectrum is enough
+    Z_F = fft.rfft2(grad_x.astype(np.float32, copy=False)) * x_term
+    Z_F += fft.rfft2(grad_y.astype(np.float32, copy=False)) * y_term
+    Z = fft.irfft2(Z_F, s=(rows, cols))
     Z -= np.min(Z)
     Z /= np.max(Z)
     return Z
 
 def height_from_normal(image: TYPE_IMAGE, tile:bool=True) -> TYPE_IMAGE:
     """Computes a height map from the given normal map."""
-    image = np.transpose(image, (2, 0, 1))
-    flip_img = np.flip(image, axis=1)
-    grad_x, grad_y = (flip_img[0] - 0.5) * 2, (flip_img[1] - 0.5) * 2
-    grad_x = np.flip(grad_x, axis=0)
-    grad_y = np.flip(grad_y, axis=0)
+    height, width = image.shape[:2]
+    image = image.astype(np.float32, copy=False)
+    grad_x = (image[..., 0] - 0.5) * 2
+    grad_y = (image[..., 1] - 0.5) * 2
 
     if not tile:
         grad_x, grad_y = image_mirror_mandela(grad_x, grad_y)
@@ -188,46 +283,61 @@ def height_from_normal(image: TYPE_IMAGE, tile:bool=True) -> TYPE_IMAGE:
 
     # re-crop
     if not tile:
-        height, width = image.shape[1], image.shape[2]
         pred_img = pred_img[:height, :width]
 
-    image = np.stack([pred_img, pred_img, pred_img])
-    image = np.transpose(image, (1, 2, 0))
-    return image
+    return cv2.merge([pred_img, pred_img, pred_img])
+
+def filter_wrap(image: TYPE_IMAGE, kernel_x: np.ndarray, kernel_y: np.ndarray) -> TYPE_IMAGE:
+    """float32 separable correlation with the image wrapped around at the edges."""
+    height, width = image.shape[:2]
+    pad_x, pad_y = len(kernel_x) // 2, len(kernel_y) // 2
+    image = cv2.copyMakeBorder(image, pad_y, pad_y, pad_x, pad_x, cv2.BORDER_WRAP)
+    image = cv2.sepFilter2D(image, cv2.CV_32F, kernel_x.astype(np.float32), kernel_y.astype(np.float32))
+    return image[pad_y:pad_y + height, pad_x:pad_x + width]
+
+@functools.lru_cache(maxsize=8)
+def blur_wrap_grid(rows: int, cols: int, size: int, sigma: float) -> np.ndarray:
+    """Read only rfft2 spectrum of a separable gaussian of `size` taps wrapped
+    onto a rows x cols period, so a blur is one multiply in frequency space."""
+    x = np.linspace(-(size - 1) / 2, (size - 1) / 2, size)
+    kernel = np.exp(-0.5 * np.square(x) / np.square(sigma))
+    kernel /= np.sum(kernel)
+    offset = np.arange(size) - size // 2
+
+    def taps(count: int) -> np.ndarray:
+        out = np.zeros(count)
+        np.add.at(out, offset % count, kernel)
+        return out
+
+    grid = fft.fft(taps(rows))[:, None] * fft.rfft(taps(cols))[None, :]
+    grid = grid.astype(np.complex64)
+    grid.flags.writeable = False
+    return grid
 
 def curvature_from_normal(image: TYPE_IMAGE, blur_radius:int=2)-> TYPE_IMAGE:
     """Computes a curvature map from the given normal map."""
-    image = np.transpose(image, (2, 0, 1))
+    image = image.astype(np.float32, copy=False)
     blur_factor = 1 / 2 ** min(8, max(2, blur_radius))
-    diff_kernel = np.array([-1, 0, 1])
 
-    def conv_1d(array, kernel) -> np.ndarray[Any, np.dtype[Any]]:
-        """Performs row-wise 1D convolutions with repeat padding."""
-        k_l = len(kernel)
-        extended = np.pad(array, k_l // 2, mode="wrap")
-        return np.array([np.convolve(row, kernel, mode="valid") for row in extended[k_l//2:-k_l//2+1]])
-
-    h_conv = conv_1d(image[0], diff_kernel)
-    v_conv = conv_1d(-image[1].T, diff_kernel).T
-    edges_conv = h_conv + v_conv
+    # central differences, wrapped: x[i-1] - x[i+1] across and -(y[j-1] - y[j+1]) down
+    one = np.ones(1, dtype=np.float32)
+    diff = np.array([1, 0, -1], dtype=np.float32)
+    edges_conv = filter_wrap(np.ascontiguousarray(image[..., 0]), diff, one)
+    edges_conv += filter_wrap(np.ascontiguousarray(image[..., 1]), one, -diff)
 
     # Calculate blur radius in pixels
-    blur_radius_px = int(np.mean(image.shape[1:3]) * blur_factor)
+    height, width = edges_conv.shape
+    blur_radius_px = int(np.mean((height, width)) * blur_factor)
     if blur_radius_px < 2:
         # If blur radius is too small, just normalize the edge convolution
         image = (edges_conv - np.min(edges_conv)) / (np.ptp(edges_conv) + 1e-10)
     else:
         blur_radius_px += blur_radius_px % 2 == 0
 
-        # Compute Gaussian kernel
+        # Gaussian blur, wrapped at the edges like the difference
         sigma = max(1, blur_radius_px // 8)
-        x = np.linspace(-(blur_radius_px - 1) / 2, (blur_radius_px - 1) / 2, blur_radius_px)
-        g_kernel = np.exp(-0.5 * np.square(x) / np.square(sigma))
-        g_kernel /= np.sum(g_kernel)
-
-        # Apply Gaussian blur
-        h_blur = conv_1d(edges_conv, g_kernel)
-        v_blur = conv_1d(h_blur.T, g_kernel).T
+        grid = blur_wrap_grid(height, width, blur_radius_px, sigma)
+        v_blur = fft.irfft2(fft.rfft2(edges_conv) * grid, s=(height, width))
         image = (v_blur - np.min(v_blur)) / (np.ptp(v_blur) + 1e-10)
 
     image = (image - image.min()) / (image.max() - image.min()) * 255
@@ -235,8 +345,8 @@ def curvature_from_normal(image: TYPE_IMAGE, blur_radius:int=2)-> TYPE_IMAGE:
 
 def roughness_from_normal(image: TYPE_IMAGE) -> TYPE_IMAGE:
     """Roughness from a normal map."""
-    up_vector = np.array([0, 0, 1])
-    image = 1 - np.dot(image, up_vector)
+    # 1 - (normal . up), the z channel
+    image = 1 - image[..., 2].astype(np.float32)
     image = (image - image.min()) / (image.max() - image.min())
     image = (255 * image).astype(np.uint8)
     return image_grayscale(image)
@@ -244,7 +354,7 @@ def roughness_from_normal(image: TYPE_IMAGE) -> TYPE_IMAGE:
 def roughness_from_albedo(image: TYPE_IMAGE) -> TYPE_IMAGE:
     """Roughness from an albedo map."""
     kernel_size = 3
-    image = cv2.Laplacian(image, cv2.CV_64F, ksize=kernel_size)
+    image = cv2.Laplacian(image, cv2.CV_32F, ksize=kernel_size)
     image = (image - image.min()) / (image.max() - image.min())
     image = (255 * image).astype(np.uint8)
     return image_grayscale(image)
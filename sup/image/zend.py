@@ -1,13 +1,14 @@
 
 import math
 import urllib
+import functools
 from typing import List, Tuple, Any
 
 import cv2
 import torch
 import requests
 import numpy as np
-from numba import jit
+from numba import jit, njit, prange
 from scipy import ndimage
 from skimage.metrics import structural_similarity as ssim
 from PIL import Image, ImageChops, ImageOps
@@ -312,19 +313,34 @@ def image_recenter(image: TYPE_IMAGE) -> TYPE_IMAGE:
     new_image[paste_y:paste_y+cropped_image.shape[0], paste_x:paste_x+cropped_image.shape[1]] = cropped_image
     return new_image
 
+@njit(parallel=True, cache=True)
+def stereo_shift_rows(image: TYPE_IMAGE, deltas: np.ndarray) -> TYPE_IMAGE:
+    """Scatter each pixel dx to the right, later pixels win. Rows are independent."""
+    height, width = deltas.shape
+    limit = image.shape[1]
+    chan = image.shape[2]
+    out = np.zeros_like(image)
+    for y in prange(height):
+        for x in range(width):
+            x2 = x + deltas[y, x]
+            if (x2 >= limit) or (x2 < 0):
+                continue
+            for c in range(chan):
+                out[y, x2, c] = image[y, x, c]
+    return out
+
 def image_stereo_shift(image: TYPE_IMAGE, depth: TYPE_IMAGE, shift:float=10) -> TYPE_IMAGE:
     # Ensure base image has alpha
     image = image_convert(image, 4)
     depth = image_convert(depth, 1)
-    deltas = np.array((depth / 255.0) * float(shift), dtype=int)
-    shifted_data = np.zeros(image.shape, dtype=np.uint8)
-    _, width = image.shape[:2]
-    for y, row in enumerate(deltas):
-        for x, dx in enumerate(row):
-            x2 = x + dx
-            if (x2 >= width) or (x2 < 0):
-                continue
-            shifted_data[y][x2] = image[y][x]
+    height, width = image.shape[:2]
+    if depth.shape[:2] != (height, width):
+        # the kernel walks the depth map and does not bounds check the image
+        depth = cv2.resize(depth, (width, height))
+        if depth.ndim == 2:
+            depth = depth[..., np.newaxis]
+    deltas = np.array((depth[..., 0] / 255.0) * float(shift), dtype=int)
+    shifted_data = stereo_shift_rows(image, deltas)
 
     shifted_image = cv2pil(shifted_data)
     alphas_image = Image.fromarray(
@@ -339,27 +355,46 @@ def image_stereo_shift(image: TYPE_IMAGE, depth: TYPE_IMAGE, shift:float=10) ->
 
 # KERNELS
 
-def MEDIAN3x3(image: TYPE_IMAGE) -> TYPE_IMAGE:
-    height, width = image.shape[:2]
-    out = np.zeros([height, width])
-    for i in range(1, height-1):
+# dtypes cv2.medianBlur handles for a 3x3 aperture
+MEDIAN_CV2 = (np.uint8, np.uint16, np.float32)
+
+@njit(parallel=True, cache=True)
+def median3x3_rows(image: TYPE_IMAGE) -> TYPE_IMAGE:
+    height, width = image.shape
+    out = np.zeros((height, width))
+    for i in prange(1, height-1):
+        temp = np.empty(9)
         for j in range(1, width-1):
-            temp = [
-                image[i-1, j-1],
-                image[i-1, j],
-                image[i-1, j + 1],
-                image[i, j-1],
-                image[i, j],
-                image[i, j + 1],
-                image[i + 1, j-1],
-                image[i + 1, j],
-                image[i + 1, j + 1]
-            ]
-
-            temp = sorted(temp)
-            out[i, j]= temp[4]
+            n = 0
+            for y in range(i-1, i+2):
+                for x in range(j-1, j+2):
+                    # insertion sort, nine values
+                    value = image[y, x]
+                    k = n
+                    while k > 0 and temp[k-1] > value:
+                        temp[k] = temp[k-1]
+                        k -= 1
+                    temp[k] = value
+                    n += 1
+            out[i, j] = temp[4]
     return out
 
+def MEDIAN3x3(image: TYPE_IMAGE) -> TYPE_IMAGE:
+    """Median of every 3x3 neighbourhood of a single channel image.
+
+    The one pixel border is left at zero and the result is float64.
+    """
+    height, width = image.shape[:2]
+    if height < 3 or width < 3:
+        return np.zeros([height, width])
+
+    if image.dtype.type in MEDIAN_CV2:
+        out = cv2.medianBlur(np.ascontiguousarray(image), 3).astype(np.float64)
+        out[[0, -1], :] = 0
+        out[:, [0, -1]] = 0
+        return out
+    return median3x3_rows(image)
+
 def kernel(stride: int) -> TYPE_IMAGE:
     """
     Generate a kernel matrix with a specific stride.
@@ -444,32 +479,30 @@ def image_load_data(data: str) -> TYPE_IMAGE:
     img = ImageOps.exif_transpose(data)
     return pil2cv(img)
 
+@functools.lru_cache(maxsize=32)
+def image_gradient_ramp(stops: Tuple[Tuple[float, Tuple[int, ...]], ...], width: int) -> np.ndarray:
+    """One read only (width, 4) BGRA row of the gaussian gradient, kept per stop list."""
+    widthf = float(width)
+    ws = widthf / len(stops)
+    x = np.arange(width, dtype=np.float64)
+    ramp = np.zeros((width, 3), dtype=np.float64)
+    # summed stop by stop, in order, like the per-pixel version did
+    for k, p in stops:
+        weight = np.exp(-(x - k * widthf)**2 / (2 * ws**2))
+        for c in range(3):
+            ramp[:, c] += p[c] * weight
+    row = np.full((width, 4), 255, dtype=np.uint8)
+    row[:, 2::-1] = np.minimum(255, ramp.astype(np.int64))
+    row.flags.writeable = False
+    return row
+
 def image_gradient(width:int, height:int, color_map:dict=None) -> TYPE_IMAGE:
     if color_map is None:
         color_map = {0: (0,0,0,255)}
     else:
         color_map = {np.clip(float(k), 0, 1): [np.clip(int(c), 0, 255) for c in v] for k, v in color_map.items()}
-    color_map = dict(sorted(color_map.items()))
-    image = Image.new('RGBA', (width, height))
-    draw = image.load()
-    widthf = float(width)
-
-    @jit
-    def gaussian(x, a, b, c, d=0) -> Any:
-        return a * math.exp(-(x - b)**2 / (2 * c**2)) + d
-
-    def pixel(x, spread:int=1) -> TYPE_iRGB:
-        ws = widthf / (spread * len(color_map))
-        r = sum([gaussian(x, p[0], k * widthf, ws) for k, p in color_map.items()])
-        g = sum([gaussian(x, p[1], k * widthf, ws) for k, p in color_map.items()])
-        b = sum([gaussian(x, p[2], k * widthf, ws) for k, p in color_map.items()])
-        return min(255, int(r)), min(255, int(g)), min(255, int(b))
-
-    for x in range(width):
-        r, g, b = pixel(x)
-        for y in range(height):
-            draw[x, y] = r, g, b
-    return pil2cv(image)
+    stops = tuple((float(k), tuple(int(c) for c in v)) for k, v in sorted(color_map.items()))
+    return np.broadcast_to(image_gradient_ramp(stops, width), (height, width, 4)).copy()
 
 def torch_rgb2hsv(rgb: torch.Tensor) -> torch.Tensor:
     cmax, cmax_idx = torch.max(rgb, dim=1, keepdim=True)
@@ -7,6 +7,8 @@ Blended from old ModernGL implementation + Audio_Scheduler & Fill Node Pack
 import os
 import re
 import sys
+import time
+import zlib
 from pathlib import Path
 from enum import Enum, EnumMeta as EnumType
 from typing import Any, Dict, Tuple
@@ -31,6 +33,9 @@ IMAGE_SIZE_DEFAULT = 512
 IMAGE_SIZE_MIN = 64
 IMAGE_SIZE_MAX = 16384
 
+# upload sampler textures as 8-bit RGBA instead of 32-bit float
+JOV_GLSL_RGBA8 = os.getenv("JOV_GLSL_RGBA8", 'false').strip().lower() in ('true', '1', 't')
+
 LAMBDA_UNIFORM = {
     'bool': gl.glUniform1i,
     'int': gl.glUniform1i,
@@ -125,7 +130,8 @@ class CompileException(Exception): pass
 
 class GLSLShader:
 
-    def __init__(self, vertex:str=None, fragment:str=None, width:int=IMAGE_SIZE_DEFAULT, height:int=IMAGE_SIZE_DEFAULT, fps:int=30) -> None:
+    def __init__(self, vertex:str=None, fragment:str=None, width:int=IMAGE_SIZE_DEFAULT, height:int=IMAGE_SIZE_DEFAULT, fps:int=30,
+                 rgba8:bool=JOV_GLSL_RGBA8) -> None:
         if not glfw.init():
             raise RuntimeError("GLFW did not init")
         self.__size: Tuple[int, int] = (max(width, IMAGE_SIZE_MIN), max(height, IMAGE_SIZE_MIN))
@@ -145,14 +151,17 @@ class GLSLShader:
         self.__fbo_texture = None
         self.__bgcolor = (0, 0, 0, 1.)
         self.__textures = {}
+        self.__rgba8 = rgba8
+        self.__stats = {'frames': 0, 'upload': 0, 'hit': 0, 'frame_ms': 0.}
         self.__window = None
         self.__init_window(vertex, fragment)
 
     def __cleanup(self) -> None:
         glfw.make_context_current(self.__window)
-        old = [v[3] for v in self.__userVar.values() if v[0] == 'sampler2D']
+        old = [v['id'] for v in self.__textures.values()]
         if len(old):
             gl.glDeleteTextures(old)
+        self.__textures = {}
 
         if self.__fbo_texture:
             gl.glDeleteTextures(1, [self.__fbo_texture])
@@ -241,10 +250,9 @@ class GLSLShader:
         for match in RE_VARIABLE.finditer(self.__source_fragment_raw):
             typ, name, default, val_min, val_max, val_step, meta, tooltip = match.groups()
 
+            # textures are made on first use, in __texture
             texture = None
-            if typ in ['sampler2D']:
-                texture = self.__textures[name] = gl.glGenTextures(1)
-            else:
+            if typ not in ['sampler2D']:
                 default = default.strip()
                 if default.startswith('EnumGLSL'):
                     typ = 'int'
@@ -289,6 +297,42 @@ class GLSLShader:
         self.__empty_image = np.zeros((self.__size[1], self.__size[0]), np.uint8)
         logger.debug("init framebuffer")
 
+    def __texture(self, name:str, image:np.ndarray) -> int:
+        """Bind the texture for a sampler, uploading the image only when it changed.
+
+        Textures are allocated at the render size on first use and updated in
+        place with glTexSubImage2D. An image with the same contents as the
+        last upload reuses what is already on the GPU. The contents are always
+        hashed, feedback buffers are the same array modified in place.
+        """
+        fmt, typ = (gl.GL_RGBA8, gl.GL_UNSIGNED_BYTE) if self.__rgba8 else (gl.GL_RGBA32F, gl.GL_FLOAT)
+        if (entry := self.__textures.get(name, None)) is None:
+            entry = self.__textures[name] = {'id': gl.glGenTextures(1), 'alloc': None, 'digest': None}
+
+        gl.glBindTexture(gl.GL_TEXTURE_2D, entry['id'])
+        alloc = (self.__size, fmt)
+        if entry['alloc'] != alloc:
+            gl.glTexImage2D(gl.GL_TEXTURE_2D, 0, fmt, self.__size[0], self.__size[1], 0, gl.GL_RGBA, typ, None)
+            gl.glTexParameteri(gl.GL_TEXTURE_2D, gl.GL_TEXTURE_MIN_FILTER, gl.GL_LINEAR)
+            gl.glTexParameteri(gl.GL_TEXTURE_2D, gl.GL_TEXTURE_MAG_FILTER, gl.GL_LINEAR)
+            entry.update(alloc=alloc, digest=None)
+
+        image = np.ascontiguousarray(image)
+        digest = (image.shape, image.dtype.str, zlib.crc32(image))
+        if digest == entry['digest']:
+            self.__stats['hit'] += 1
+            return entry['id']
+
+        val = image_convert(image, 4)
+        val = val[::-1,:]
+        if not self.__rgba8:
+            val = val.astype(np.float32) / 255.0
+        val = cv2.resize(val, self.__size, interpolation=cv2.INTER_LINEAR)
+        gl.glTexSubImage2D(gl.GL_TEXTURE_2D, 0, 0, 0, self.__size[0], self.__size[1], gl.GL_RGBA, typ, val)
+        entry['digest'] = digest
+        self.__stats['upload'] += 1
+        return entry['id']
+
     def __del__(self) -> None:
         self.__cleanup()
         #if self.__window is not None:
@@ -364,6 +408,19 @@ class GLSLShader:
     def last_frame(self) -> float:
         return self.__last_frame
 
+    @property
+    def rgba8(self) -> bool:
+        return self.__rgba8
+
+    @rgba8.setter
+    def rgba8(self, rgba8:bool) -> None:
+        self.__rgba8 = rgba8
+
+    @property
+    def stats(self) -> Dict[str, Any]:
+        """Frames rendered, texture uploads and cache hits and the last frame time."""
+        return self.__stats.copy()
+
     @property
     def bgcolor(self) -> Tuple[int, ...]:
         return self.__bgcolor
@@ -376,6 +433,7 @@ class GLSLShader:
                tile_edge:Tuple[EnumGLSLEdge,...]=(EnumGLSLEdge.CLAMP, EnumGLSLEdge.CLAMP),
                **kw) -> np.ndarray:
 
+        start = time.perf_counter()
         glfw.make_context_current(self.__window)
         gl.glUseProgram(self.__program)
 
@@ -399,27 +457,12 @@ class GLSLShader:
             val = kw.get(uk, p_value)
 
             if p_type == 'sampler2D':
-                if (texture := self.__textures.get(uk, None)) is None:
-                    logger.error(f"texture [{texture_index}] {uk} is None")
-                    texture_index += 1
-                    continue
-
-                gl.glActiveTexture(gl.GL_TEXTURE0 + texture_index)
-                gl.glBindTexture(gl.GL_TEXTURE_2D, texture)
-
                 # send in black if nothing in input image
                 if not isinstance(val, (np.ndarray,)):
                     val = self.__empty_image
 
-                # @TODO: could cache this ?
-                val = image_convert(val, 4)
-                val = val[::-1,:]
-                val = val.astype(np.float32) / 255.0
-                val = cv2.resize(val, self.__size, interpolation=cv2.INTER_LINEAR)
-                #
-                gl.glTexImage2D(gl.GL_TEXTURE_2D, 0, gl.GL_RGBA32F, self.__size[0], self.__size[1], 0, gl.GL_RGBA, gl.GL_FLOAT, val)
-                gl.glTexParameteri(gl.GL_TEXTURE_2D, gl.GL_TEXTURE_MIN_FILTER, gl.GL_LINEAR)
-                gl.glTexParameteri(gl.GL_TEXTURE_2D, gl.GL_TEXTURE_MAG_FILTER, gl.GL_LINEAR)
+                gl.glActiveTexture(gl.GL_TEXTURE0 + texture_index)
+                self.__texture(uk, val)
 
                 for idx, text_wrap in enumerate([gl.GL_TEXTURE_WRAP_S, gl.GL_TEXTURE_WRAP_T]):
                     match tile_edge[idx]:
@@ -453,6 +496,8 @@ class GLSLShader:
         self.__last_frame = image[::-1, :, :]
 
         glfw.poll_events()
+        self.__stats['frames'] += 1
+        self.__stats['frame_ms'] = 1000. * (time.perf_counter() - start)
 
         return self.__last_frame
 
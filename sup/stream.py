@@ -8,6 +8,7 @@ import sys
 import json
 import time
 import array
+import select
 import threading
 from typing import Any, Dict, List, Tuple
 from itertools import repeat
@@ -275,6 +276,7 @@ class MediaStreamBase:
         self.__fps = fps
         self.__timeout = None
         self.__frame = None
+        self.__count = 0
         self.__thread = threading.Thread(target=self.__run, daemon=True)
         self.__thread.start()
 
@@ -304,6 +306,7 @@ class MediaStreamBase:
                 newframe = self.callback()
                 if newframe is not None:
                     self.__frame = newframe
+                    self.__count += 1
                     self.__timeout = None
 
             if self.__timeout is not None and time.perf_counter() > self.__timeout:
@@ -351,6 +354,11 @@ class MediaStreamBase:
     def frame(self) -> Any:
         return self.__frame
 
+    @property
+    def frame_count(self) -> int:
+        """Frames handed over so far, also counts a buffer updated in place."""
+        return self.__count
+
     @property
     def fps(self) -> float:
         return self.__fps
@@ -579,42 +587,113 @@ class StreamManager(metaclass=Singleton):
 # === SERVER ===
 # ==============================================================================
 
+class StreamBroadcast:
+    """Encode the newest frame of a stream once and share the JPEG with every client.
+
+    Each new frame bumps a sequence number and wakes the waiting clients. A
+    slow client only ever picks up the latest frame, the ones it missed are
+    dropped rather than queued.
+    """
+    def __init__(self, stream: MediaStreamBase) -> None:
+        self.stream = stream
+        self.__cond = threading.Condition()
+        self.__seq = 0
+        self.__jpeg = None
+        self.__last = -1
+        self.__clients = 0
+
+    def join(self) -> None:
+        with self.__cond:
+            self.__clients += 1
+
+    def leave(self) -> None:
+        with self.__cond:
+            self.__clients = max(0, self.__clients - 1)
+
+    def publish(self) -> bool:
+        """Encode the stream's current frame if it is new. Returns True when one was sent."""
+        if self.__clients == 0 or self.stream is None:
+            return False
+        # a counter, not the frame object, devices can reuse their buffer
+        if (count := self.stream.frame_count) == self.__last or (frame := self.stream.frame) is None:
+            return False
+        self.__last = count
+        ret, jpeg = cv2.imencode('.jpg', frame)
+        if not ret:
+            return False
+        with self.__cond:
+            self.__jpeg = jpeg.tobytes()
+            self.__seq += 1
+            self.__cond.notify_all()
+        return True
+
+    def wait(self, seq: int, timeout: float=1.) -> Tuple[int, bytes | None]:
+        """Block until there is a frame newer than seq, then return the latest one."""
+        with self.__cond:
+            self.__cond.wait_for(lambda: self.__seq != seq, timeout)
+            return self.__seq, self.__jpeg
+
+    @property
+    def clients(self) -> int:
+        return self.__clients
+
+    @property
+    def seq(self) -> int:
+        return self.__seq
+
 class StreamingHandler(BaseHTTPRequestHandler):
     def __init__(self, outputs, *arg, **kw) -> None:
         self.__outputs = outputs
         super().__init__(*arg, **kw)
 
+    def __connected(self) -> bool:
+        """The client does not send anything after its GET, so a readable
+        socket that gives no data was closed on the other end."""
+        try:
+            readable, _, _ = select.select([self.connection], [], [], 0)
+            return not len(readable) or len(self.connection.recv(1)) > 0
+        except (ssl.SSLWantReadError, BlockingIOError):
+            return True
+        except Exception:
+            return False
+
     def do_GET(self) -> None:
         key = self.path.lower()
 
         # Check if the key exists in your data dictionary
         if key in self.__outputs:
-            data = self.__outputs[key]
+            broadcast = self.__outputs[key]
 
             self.send_response(200)
             self.send_header('Content-Type', 'multipart/x-mixed-replace; boundary=frame')
             self.end_headers()
 
-            while True:
-                try:
-                    if (frame := data['b']) is not None:
-                        _, jpeg = cv2.imencode('.jpg', frame)
-                        self.wfile.write(b'--frame\r\n')
-                        self.send_header('Content-Type', 'image/jpeg')
-                        self.send_header('Content-Length', len(jpeg))
-                        self.end_headers()
-                        self.wfile.write(jpeg.tobytes())
-                        self.wfile.write(b'\r\n')
-                except Exception as e:
-                    logger.error(str(e))
-                    break
-                time.sleep(0.001)
+            seq = 0
+            broadcast.join()
+            try:
+                while True:
+                    last, (seq, jpeg) = seq, broadcast.wait(seq)
+                    if seq == last or jpeg is None:
+                        # nothing new before the timeout, let go of clients that left
+                        if not self.__connected():
+                            break
+                        continue
+                    self.wfile.write(b'--frame\r\n')
+                    self.send_header('Content-Type', 'image/jpeg')
+                    self.send_header('Content-Length', len(jpeg))
+                    self.end_headers()
+                    self.wfile.write(jpeg)
+                    self.wfile.write(b'\r\n')
+            except Exception as e:
+                logger.error(str(e))
+            finally:
+                broadcast.leave()
 
         elif key == 'jovimetrix':
             self.send_response(200)
             self.send_header('Content-Type', 'application/json')
             self.end_headers()
-            data = json.dumps(data)
+            data = json.dumps(list(self.__outputs.keys()))
             self.wfile.write(data.encode('utf-8'))
         else:
             self.send_response(404)
@@ -622,11 +701,11 @@ class StreamingHandler(BaseHTTPRequestHandler):
             self.wfile.write(b'Not Found')
 
 class StreamingServer(metaclass=Singleton):
-    OUT = {}
+    OUT: Dict[str, StreamBroadcast] = {}
 
     @classmethod
     def endpointAdd(cls, name: str, stream: MediaStreamDevice) -> None:
-        StreamingServer.OUT[name] = {'_': stream, 'b': None}
+        StreamingServer.OUT[name] = StreamBroadcast(stream)
         logger.info(f"ENDPOINT_ADD ({name})")
 
     def __init__(self, host: str='', port: int=JOV_STREAM_PORT) -> None:
@@ -659,11 +738,10 @@ class StreamingServer(metaclass=Singleton):
             httpd.handle_request()
 
     def __capture(self) -> None:
+        # frames are only encoded when a stream hands over a new one
         while True:
-            current = StreamingServer.OUT.copy()
-            for k, v in current.items():
-                if (device := v['_']) is not None:
-                    StreamingServer.OUT[k]['b'] = device.frame
+            for broadcast in list(StreamingServer.OUT.values()):
+                broadcast.publish()
             time.sleep(0.001)
 
 # ==============================================================================
@@ -5,8 +5,10 @@ Jovimetrix - UTIL support
 import os
 import json
 import math
+import threading
 from enum import Enum
-from typing import Any, List, Generator, Optional, Tuple
+from concurrent.futures import CancelledError, Future, ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Generator, Optional, Tuple
 
 import torch
 
@@ -14,6 +16,11 @@ from loguru import logger
 
 MIN_IMAGE_SIZE = 32
 
+# threads that run the frames of one node, 0 runs them in the calling thread
+JOV_FRAME_WORKERS = min(4, os.cpu_count() or 1)
+try: JOV_FRAME_WORKERS = max(0, int(os.getenv("JOV_FRAME_WORKERS", JOV_FRAME_WORKERS)))
+except: pass
+
 # ==============================================================================
 # === ENUMERATION ===
 # ==============================================================================
@@ -267,6 +274,127 @@ def parse_value(val:Any, typ:EnumConvertType, default: Any,
         new_val = {'x': new_val[0], 'y': new_val[1]}
     return new_val
 
+PARSE_NUMBER = (int, float)
+
+# (type, default, clip_min, clip_max, zero) -> converter
+PARSE_CONVERTER: Dict[Tuple[Any, ...], Callable[[Any], Any]] = {}
+
+PARSE_FLOAT = (EnumConvertType.FLOAT, EnumConvertType.VEC2,
+               EnumConvertType.VEC3, EnumConvertType.VEC4)
+
+PARSE_VECTOR = PARSE_FLOAT + (EnumConvertType.INT, EnumConvertType.VEC2INT,
+                              EnumConvertType.VEC3INT, EnumConvertType.VEC4INT,
+                              EnumConvertType.COORD2D)
+
+def parse_freeze(val: Any) -> Any:
+    """Hashable key for a default, keeps list apart from tuple since
+    parse_value treats them differently."""
+    if isinstance(val, (list, tuple)):
+        return (type(val), tuple(parse_freeze(v) for v in val))
+    hash(val)
+    return (type(val), val)
+
+def parse_converter_build(typ: EnumConvertType, default: Any,
+                          clip_min: Optional[float]=None, clip_max: Optional[float]=None,
+                          zero: int=0) -> Callable[[Any], Any]:
+    """Build a function that does parse_value(val, typ, default, ...) for one
+    fixed set of arguments. Values that already have the target type convert
+    without walking the branches of parse_value, everything else goes through
+    parse_value so the result is always the same."""
+
+    def generic(val: Any) -> Any:
+        return parse_value(val, typ, default, clip_min, clip_max, zero)
+
+    if typ == EnumConvertType.ANY:
+        return lambda val: val
+
+    if isinstance(default, torch.Tensor):
+        return generic
+
+    if typ in [EnumConvertType.IMAGE, EnumConvertType.MASK]:
+        return lambda val: val if isinstance(val, torch.Tensor) else generic(val)
+
+    if typ == EnumConvertType.BOOLEAN:
+        return lambda val: val if type(val) is bool else generic(val)
+
+    if typ == EnumConvertType.STRING:
+        return lambda val: val if type(val) is str else generic(val)
+
+    if not isinstance(typ, EnumConvertType) and issubclass(typ, Enum):
+        return lambda val: typ[val] if type(val) is str else generic(val)
+
+    if typ not in PARSE_VECTOR:
+        return generic
+
+    size = max(1, int(typ.value / 10))
+    is_float = typ in PARSE_FLOAT
+    # the defaults used to pad short vectors, None where it is not a plain number
+    pad = []
+    for idx in range(size):
+        try:
+            d = default[idx] if idx < len(default) else 0
+        except:
+            try:
+                d = default.get(str(idx), 0)
+            except:
+                d = default
+        pad.append(d if type(d) in PARSE_NUMBER else None)
+
+    def convert(v: Any) -> Any:
+        v = round(float(v or 0), 16) if is_float else int(v)
+        if clip_min is not None:
+            v = max(v, clip_min)
+        if clip_max is not None:
+            v = min(v, clip_max)
+        return zero if v == 0 else v
+
+    def number(val: Any) -> Any:
+        if type(val) in PARSE_NUMBER:
+            val = (val,)
+        elif type(val) not in (list, tuple):
+            return generic(val)
+
+        count = len(val)
+        new_val = []
+        for idx in range(size):
+            v = val[idx] if idx < count else pad[idx]
+            if type(v) not in PARSE_NUMBER:
+                return generic(val)
+            new_val.append(v)
+
+        try:
+            new_val = [convert(v) for v in new_val]
+        except Exception:
+            # parse_value reports the failure
+            return generic(val)
+
+        if size == 1:
+            return new_val[0]
+        if typ == EnumConvertType.COORD2D:
+            return {'x': new_val[0], 'y': new_val[1]}
+        return tuple(new_val)
+
+    return number
+
+def parse_converter(typ: EnumConvertType, default: Any,
+                    clip_min: Optional[float]=None, clip_max: Optional[float]=None,
+                    zero: int=0) -> Callable[[Any], Any]:
+    """The converter for this combination of arguments, built once per node input."""
+    try:
+        # types are part of the key, 1 and 1.0 do not convert the same
+        key = (typ, parse_freeze(default) if isinstance(default, (list, tuple)) else default,
+               type(default), clip_min, type(clip_min), clip_max, type(clip_max), zero, type(zero))
+        convert = PARSE_CONVERTER.get(key, None)
+    except TypeError:
+        # dict or tensor defaults, rare enough to build every time
+        return parse_converter_build(typ, default, clip_min, clip_max, zero)
+
+    if convert is None:
+        if len(PARSE_CONVERTER) > 4096:
+            PARSE_CONVERTER.clear()
+        convert = PARSE_CONVERTER[key] = parse_converter_build(typ, default, clip_min, clip_max, zero)
+    return convert
+
 def parse_param(data:dict, key:str, typ:EnumConvertType, default: Any,
                 clip_min: Optional[float]=None, clip_max: Optional[float]=None,
                 zero:int=0) -> List[Any]:
@@ -280,6 +408,11 @@ def parse_param(data:dict, key:str, typ:EnumConvertType, default: Any,
         #elif isinstance(val, (list,)):
         #    val = val[0]
 
+    convert = parse_converter(typ, default, clip_min, clip_max, zero)
+    # widget values, the bulk of the calls
+    if type(val) in PARSE_NUMBER or type(val) is bool:
+        return [convert(val)]
+
     if isinstance(val, (str,)):
         try: val = json.loads(val.replace("'", '"'))
         except json.JSONDecodeError: pass
@@ -293,9 +426,9 @@ def parse_param(data:dict, key:str, typ:EnumConvertType, default: Any,
                     mask = mask.unsqueeze(-1)
                 ret = torch.cat((image, mask), dim=-1)
             if ret.ndim > 3:
-                val = [t for t in ret]
+                val = list(ret.unbind(0))
             elif ret.ndim == 3:
-                val = [v.unsqueeze(-1) for v in ret]
+                val = list(ret.unsqueeze(-1).unbind(0))
         # vector patch....
         elif 'xyzw' in val:
             val = tuple(x for x in val["xyzw"])
@@ -311,12 +444,12 @@ def parse_param(data:dict, key:str, typ:EnumConvertType, default: Any,
         elif len(val) == 0:
             val = tuple()
     elif isinstance(val, (torch.Tensor,)):
-        # a batch of RGB(A)
+        # a batch of RGB(A), the frames are views into the one batch
         if val.ndim > 3:
-            val = [t for t in val]
+            val = list(val.unbind(0))
         # a batch of Grayscale
         else:
-            val = [t.unsqueeze(-1) for t in val]
+            val = list(val.unsqueeze(-1).unbind(0))
     elif isinstance(val, (list, tuple, set)):
         if isinstance(val, (tuple, set,)):
             val = list(val)
@@ -325,7 +458,7 @@ def parse_param(data:dict, key:str, typ:EnumConvertType, default: Any,
 
     if not isinstance(val, (list,)):
         val = [val]
-    return [parse_value(v, typ, default, clip_min, clip_max, zero) for v in val]
+    return [convert(v) for v in val]
 
 def path_next(pattern: str) -> str:
     """
@@ -390,3 +523,131 @@ def zip_longest_fill(*iterables: Any) -> Generator[Tuple[Any, ...], None, None]:
                         values[i] = current_value
 
             yield tuple(values)
+
+def zip_constant(params: List[Tuple[Any, ...]], *skip: int) -> bool:
+    """
+    Check if zipped parameters hold the same values for every entry.
+
+    Columns listed in `skip` (usually the image inputs) are not compared. A
+    single entry is never considered constant since there is no batch to run.
+    """
+    if len(params) < 2:
+        return False
+
+    first = params[0]
+    for idx, value in enumerate(first):
+        if idx in skip:
+            continue
+        for row in params[1:]:
+            other = row[idx]
+            # tensors only count as constant if they are the same object
+            if isinstance(value, torch.Tensor) or isinstance(other, torch.Tensor):
+                if other is not value:
+                    return False
+            elif other != value:
+                return False
+    return True
+
+_FRAME_POOL: Optional[ThreadPoolExecutor] = None
+_FRAME_LOCK = threading.Lock()
+_FRAME_LOCAL = threading.local()
+_FRAME_THREADSAFE: Optional[bool] = None
+
+def frame_threadsafe() -> bool:
+    """The numba kernels can only run from several threads at once on the tbb or
+    omp threading layer, the workqueue fallback aborts the process instead."""
+    global _FRAME_THREADSAFE
+    if _FRAME_THREADSAFE is None:
+        import importlib
+        import numba
+        layer = str(numba.config.THREADING_LAYER).lower()
+        pools = ["tbb"] if layer in ("tbb", "safe") else [] if layer == "workqueue" else ["tbb", "omp"]
+        _FRAME_THREADSAFE = False
+        for pool in pools:
+            try:
+                importlib.import_module(f"numba.np.ufunc.{pool}pool")
+                _FRAME_THREADSAFE = True
+                break
+            except Exception:
+                pass
+        if not _FRAME_THREADSAFE:
+            logger.warning(f"numba threading layer '{layer}' is not threadsafe, frames run one at a time")
+    return _FRAME_THREADSAFE
+
+def frame_executor(workers: int) -> ThreadPoolExecutor:
+    """Shared pool for frame_map, rebuilt if the worker count changes."""
+    global _FRAME_POOL
+    with _FRAME_LOCK:
+        if _FRAME_POOL is None or _FRAME_POOL._max_workers != workers:
+            if _FRAME_POOL is not None:
+                _FRAME_POOL.shutdown(wait=False)
+            _FRAME_POOL = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="jov_frame")
+        return _FRAME_POOL
+
+def frame_map(func: Callable[..., Any], params: List[Tuple[Any, ...]],
+              pbar: Any=None, workers: Optional[int]=None) -> List[Any]:
+    """
+    Call func(*param) for every entry of params, the results come back in the
+    same order as params.
+
+    The frames run on a shared pool of JOV_FRAME_WORKERS threads, cv2 and numpy
+    release the GIL for most of the per frame work. `pbar` is updated as each
+    frame finishes. With one worker, one frame, without a threadsafe numba
+    layer or when called from inside another frame_map the frames run one
+    after the other in this thread.
+    """
+    workers = JOV_FRAME_WORKERS if workers is None else workers
+    if workers < 2 or len(params) < 2 or getattr(_FRAME_LOCAL, "active", False) or \
+        not frame_threadsafe():
+        results = []
+        for idx, param in enumerate(params):
+            results.append(func(*param))
+            if pbar is not None:
+                pbar.update_absolute(idx + 1)
+        return results
+
+    def run(param: Tuple[Any, ...]) -> Any:
+        _FRAME_LOCAL.active = True
+        try:
+            return func(*param)
+        finally:
+            _FRAME_LOCAL.active = False
+
+    lock = threading.Lock()
+    done = [0]
+    error = []
+    futures: List[Future] = []
+
+    def finished(_: Future) -> None:
+        with lock:
+            done[0] += 1
+            count = done[0]
+        if pbar is None or error:
+            return
+        try:
+            pbar.update_absolute(count)
+        except Exception as e:
+            # an interrupt from the progress hook, stop what has not started
+            error.append(e)
+            for future in futures:
+                future.cancel()
+
+    pool = frame_executor(workers)
+    for param in params:
+        future = pool.submit(run, param)
+        futures.append(future)
+        future.add_done_callback(finished)
+
+    results = []
+    try:
+        for future in futures:
+            results.append(future.result())
+    except CancelledError:
+        pass
+    except Exception:
+        for future in futures:
+            future.cancel()
+        raise
+    if error:
+        raise error[0]
+    return results
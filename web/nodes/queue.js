@@ -27,6 +27,11 @@ app.registerExtension({
 
         function update_report(self) {
             self.widget_report.value = `[${self.data_index+1} / ${self.data_all.length}]\n${self.data_current}`;
+            const cache = self.data_cache;
+            if (cache) {
+                const mb = (cache.size / 1048576).toFixed(1);
+                self.widget_report.value += `\ncache ${cache.count} @ ${mb}MB | hit ${cache.hit} miss ${cache.miss} evict ${cache.evict}`;
+            }
             app.canvas.setDirty(true);
         }
 
@@ -75,6 +80,7 @@ app.registerExtension({
                 self.data_index = event.detail.i;
                 self.data_all  = event.detail.l;
                 self.data_current = event.detail.c;
+                self.data_cache = event.detail.cache;
                 update_report(self);
             }
 